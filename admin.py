@@ -1,11 +1,16 @@
 # app_mascotas/admin.py
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
+from django.forms.models import BaseInlineFormSet
+from django.utils import timezone
 from .models import (
     Usuario, Categoria, Tipo, Alimento, 
     Accesorio, Mascota, Pedido, Venta,
-    Carrito, ItemCarrito, DetallePedido
+    Carrito, ItemCarrito, DetallePedido, HistorialEstadoPedido, Trabajo,
+    PedidoArchivado, DetallePedidoArchivado
 )
+from . import pedidos as servicio_pedidos
+from .productos import resolver_productos
 
 # ==========================================
 # ADMIN PERSONALIZADO PARA USUARIO
@@ -94,8 +99,17 @@ class MascotaAdmin(admin.ModelAdmin):
 # ==========================================
 # ADMIN PARA CARRITO
 # ==========================================
+class LineasProductoFormSet(BaseInlineFormSet):
+    """Formset de renglones que carga sus productos con una consulta por tipo"""
+
+    def get_queryset(self):
+        if not hasattr(self, '_lineas'):
+            self._lineas = resolver_productos(super().get_queryset())
+        return self._lineas
+
 class ItemCarritoInline(admin.TabularInline):
     model = ItemCarrito
+    formset = LineasProductoFormSet
     extra = 0
     readonly_fields = ('fecha_agregado', 'subtotal')
     fields = ('alimento', 'accesorio', 'cantidad', 'subtotal')
@@ -116,18 +130,50 @@ class CarritoAdmin(admin.ModelAdmin):
 # ==========================================
 class DetallePedidoInline(admin.TabularInline):
     model = DetallePedido
+    formset = LineasProductoFormSet
     extra = 0
     readonly_fields = ('precio_unitario', 'subtotal')
     fields = ('alimento', 'accesorio', 'mascota', 'cantidad', 'precio_unitario', 'subtotal')
 
+class HistorialEstadoPedidoInline(admin.TabularInline):
+    model = HistorialEstadoPedido
+    extra = 0
+    can_delete = False
+    readonly_fields = ('estado_anterior', 'estado_nuevo', 'usuario', 'fecha')
+    ordering = ('fecha',)
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+def _accion_cambiar_estado(estado, etiqueta):
+    """Acción del listado que pasa los pedidos seleccionados a 'estado' con pedidos.cambiar_estado"""
+    def accion(modeladmin, request, queryset):
+        resultado = servicio_pedidos.cambiar_estado(
+            queryset.values_list('id', flat=True), estado, usuario=request.user
+        )
+        modeladmin.message_user(request, f"{len(resultado['actualizados'])} pedidos marcados como {etiqueta.lower()}")
+        if resultado['omitidos']:
+            modeladmin.message_user(
+                request,
+                f"{len(resultado['omitidos'])} pedidos no se cambiaron: "
+                + ', '.join(f"#{omitido['id']} ({omitido['motivo']})" for omitido in resultado['omitidos'][:10]),
+                messages.WARNING,
+            )
+    accion.__name__ = f'marcar_{estado}'
+    return admin.action(description=f'Marcar como {etiqueta.lower()}')(accion)
+
 class PedidoAdmin(admin.ModelAdmin):
     list_display = ('numero_pedido', 'usuario', 'fecha_pedido', 'estado', 'total')
     list_filter = ('estado', 'fecha_pedido')
     search_fields = ('numero_pedido', 'usuario__username', 'direccion_envio')
-    list_editable = ('estado',)
     ordering = ('-fecha_pedido',)
-    inlines = [DetallePedidoInline]
-    readonly_fields = ('numero_pedido', 'fecha_pedido', 'subtotal', 'iva', 'total')
+    inlines = [DetallePedidoInline, HistorialEstadoPedidoInline]
+    # El estado solo cambia con las acciones, que validan pedidos.TRANSICIONES y guardan el historial
+    readonly_fields = ('numero_pedido', 'fecha_pedido', 'estado', 'subtotal', 'iva', 'total')
+    actions = [
+        _accion_cambiar_estado(estado, etiqueta)
+        for estado, etiqueta in Pedido.ESTADO_CHOICES if estado != 'pendiente'
+    ]
     
     fieldsets = (
         ('Información del Pedido', {
@@ -145,6 +191,30 @@ class PedidoAdmin(admin.ModelAdmin):
         }),
     )
 
+class DetallePedidoArchivadoInline(admin.TabularInline):
+    model = DetallePedidoArchivado
+    extra = 0
+    can_delete = False
+    fields = ('alimento_id', 'accesorio_id', 'mascota_id', 'cantidad', 'precio_unitario', 'subtotal')
+    readonly_fields = fields
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+class PedidoArchivadoAdmin(admin.ModelAdmin):
+    """Solo lectura: los pedidos llegan aquí con el comando archivar_pedidos"""
+    list_display = ('numero_pedido', 'usuario', 'fecha_pedido', 'estado', 'total', 'fecha_archivado')
+    list_filter = ('estado',)
+    search_fields = ('numero_pedido', 'usuario__username')
+    ordering = ('-fecha_pedido',)
+    inlines = [DetallePedidoArchivadoInline]
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
 # ==========================================
 # ADMIN PARA VENTAS
 # ==========================================
@@ -155,6 +225,24 @@ class VentaAdmin(admin.ModelAdmin):
     ordering = ('-fecha_venta',)
     readonly_fields = ('fecha_venta',)
 
+# ==========================================
+# ADMIN PARA LA COLA DE TRABAJOS
+# ==========================================
+class TrabajoAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tarea', 'estado', 'intentos', 'ejecutar_despues', 'trabajador', 'fecha_actualizacion')
+    list_filter = ('estado', 'tarea')
+    search_fields = ('tarea', 'ultimo_error')
+    ordering = ('-id',)
+    readonly_fields = ('fecha_creacion', 'fecha_actualizacion', 'ultimo_error')
+    actions = ['reintentar']
+    
+    @admin.action(description='Reintentar los trabajos seleccionados')
+    def reintentar(self, request, queryset):
+        actualizados = queryset.exclude(estado='en_proceso').update(
+            estado='pendiente', intentos=0, ejecutar_despues=timezone.now(), bloqueado_hasta=None
+        )
+        self.message_user(request, f'{actualizados} trabajos reprogramados')
+
 # ==========================================
 # REGISTRO DE MODELOS EN EL ADMIN
 # ==========================================
@@ -166,7 +254,9 @@ admin.site.register(Accesorio, AccesorioAdmin)
 admin.site.register(Mascota, MascotaAdmin)
 admin.site.register(Carrito, CarritoAdmin)
 admin.site.register(Pedido, PedidoAdmin)
+admin.site.register(PedidoArchivado, PedidoArchivadoAdmin)
 admin.site.register(Venta, VentaAdmin)
+admin.site.register(Trabajo, TrabajoAdmin)
 
 # Los siguientes se registran sin admin personalizado (opcional)
 admin.site.register(ItemCarrito)
@@ -0,0 +1,162 @@
+# app_mascotas/api.py
+"""
+API JSON de solo lectura del catálogo (versión 1).
+
+Las respuestas se arman con filas de .values() del modelo de lectura
+ProductoCatalogo, sin instanciar modelos. Cada respuesta lleva un ETag fuerte
+calculado con fecha_actualizacion de las filas, de modo que un cliente que
+repite la petición con If-None-Match recibe un 304 sin cuerpo. El detalle
+lleva además Last-Modified; los listados no, porque borrar o despublicar un
+producto de la página no mueve la fecha más reciente de las filas que quedan
+y If-Modified-Since daría un 304 falso (el ETag sí cambia).
+"""
+import hashlib
+
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET
+
+from .forms import FiltroAlimentosForm
+from .models import Categoria, Tipo, Alimento, Accesorio, Mascota, ProductoCatalogo, FacetaCatalogo
+from .paginacion import paginar_keyset
+
+CAMPOS_LISTADO = (
+    'id', 'tipo_producto', 'producto_id', 'nombre', 'descripcion', 'precio', 'precio_original',
+    'stock', 'stock_reservado', 'imagen', 'categoria_id', 'categoria__nombre', 'tipo_id', 'tipo__nombre',
+    'destacado', 'fecha_actualizacion',
+)
+CAMPOS_DETALLE = {
+    'alimento': ('descripcion',),
+    'accesorio': ('descripcion',),
+    'mascota': ('descripcion', 'raza', 'edad'),
+}
+MODELOS_DETALLE = {'alimento': Alimento, 'accesorio': Accesorio, 'mascota': Mascota}
+ORDEN_LISTADO = ('nombre', 'id')
+
+
+# ==========================================
+# FUNCIONES DE AYUDA
+# ==========================================
+def calcular_etag(*partes):
+    """ETag fuerte a partir de las partes que determinan la representación"""
+    resumen = hashlib.sha256('|'.join(str(parte) for parte in partes).encode()).hexdigest()
+    return f'"{resumen[:40]}"'
+
+def respuesta_condicional(request, etag, ultima_modificacion, construir):
+    """
+    Devuelve 304 si el cliente ya tiene la versión actual; si no, llama a
+    construir() para armar el cuerpo y agrega los validadores a la respuesta.
+    """
+    marca_tiempo = int(ultima_modificacion.timestamp()) if ultima_modificacion else None
+    respuesta = get_conditional_response(request, etag=etag, last_modified=marca_tiempo)
+    if respuesta is None:
+        respuesta = JsonResponse(construir(), json_dumps_params={'ensure_ascii': False})
+    respuesta['ETag'] = etag
+    if marca_tiempo is not None:
+        respuesta['Last-Modified'] = http_date(marca_tiempo)
+    respuesta['Cache-Control'] = 'no-cache'
+    return respuesta
+
+def _url_imagen(nombre):
+    if not nombre:
+        return None
+    return ProductoCatalogo._meta.get_field('imagen').storage.url(nombre)
+
+def serializar_producto(fila):
+    """Convierte una fila de .values() del catálogo en el formato público de la API"""
+    return {
+        'tipo_producto': fila['tipo_producto'],
+        'id': fila['producto_id'],
+        'nombre': fila['nombre'],
+        'descripcion': fila['descripcion'],
+        'precio': fila['precio'],
+        'precio_original': fila['precio_original'],
+        'stock': fila['stock'],
+        'disponible': max(fila['stock'] - fila['stock_reservado'], 0),
+        'imagen': _url_imagen(fila['imagen']),
+        'categoria': {'id': fila['categoria_id'], 'nombre': fila['categoria__nombre']} if fila['categoria_id'] else None,
+        'tipo': {'id': fila['tipo_id'], 'nombre': fila['tipo__nombre']},
+        'destacado': fila['destacado'],
+        'actualizado': fila['fecha_actualizacion'],
+    }
+
+def _listado(request, queryset):
+    """Página keyset de productos con un ETag calculado a partir de sus filas (sin Last-Modified)"""
+    form_filtros = FiltroAlimentosForm(request.GET or None)
+    queryset = form_filtros.filtrar(queryset)
+    tipo_producto = request.GET.get('tipo_producto')
+    if tipo_producto in MODELOS_DETALLE:
+        queryset = queryset.filter(tipo_producto=tipo_producto)
+
+    pagina = paginar_keyset(request, queryset.values(*CAMPOS_LISTADO), ORDEN_LISTADO)
+    filas = pagina.objetos
+    etag = calcular_etag(
+        request.get_full_path(),
+        *((fila['id'], fila['fecha_actualizacion'].isoformat()) for fila in filas),
+        pagina.cursor_siguiente, pagina.cursor_anterior,
+    )
+
+    def construir():
+        return {
+            'resultados': [serializar_producto(fila) for fila in filas],
+            'siguiente': request.path + pagina.url_siguiente if pagina.tiene_siguiente else None,
+            'anterior': request.path + pagina.url_anterior if pagina.tiene_anterior else None,
+        }
+    return respuesta_condicional(request, etag, None, construir)
+
+
+# ==========================================
+# ENDPOINTS
+# ==========================================
+@require_GET
+def lista_productos(request):
+    """GET /api/v1/productos/?tipo_producto=&categoria=&tipo=&min_precio=&max_precio=&destacados=&cursor="""
+    return _listado(request, ProductoCatalogo.objects.filter(activo=True))
+
+@require_GET
+def productos_categoria(request, categoria_id, tipo_id=None):
+    """GET /api/v1/categorias/<id>/productos/ y /api/v1/categorias/<id>/tipos/<id>/productos/"""
+    categoria = get_object_or_404(Categoria, id=categoria_id)
+    queryset = ProductoCatalogo.objects.filter(activo=True, categoria=categoria)
+    if tipo_id is not None:
+        queryset = queryset.filter(tipo=get_object_or_404(Tipo, id=tipo_id))
+    return _listado(request, queryset)
+
+@require_GET
+def detalle_producto(request, tipo_producto, producto_id):
+    """GET /api/v1/productos/<tipo_producto>/<id>/"""
+    if tipo_producto not in MODELOS_DETALLE:
+        return JsonResponse({'error': 'Tipo de producto no válido'}, status=404)
+    fila = get_object_or_404(
+        ProductoCatalogo.objects.values(*CAMPOS_LISTADO),
+        tipo_producto=tipo_producto, producto_id=producto_id, activo=True,
+    )
+    etag = calcular_etag(tipo_producto, producto_id, fila['fecha_actualizacion'].isoformat())
+
+    def construir():
+        datos = serializar_producto(fila)
+        # La descripción completa y los campos propios salen del modelo de origen
+        datos.update(
+            MODELOS_DETALLE[tipo_producto].objects
+            .filter(id=producto_id)
+            .values(*CAMPOS_DETALLE[tipo_producto])
+            .first() or {}
+        )
+        return datos
+    return respuesta_condicional(request, etag, fila['fecha_actualizacion'], construir)
+
+@require_GET
+def lista_categorias(request):
+    """GET /api/v1/categorias/ con el total de productos activos de cada una"""
+    categorias = list(Categoria.objects.order_by('nombre', 'id').values('id', 'nombre', 'descripcion'))
+    totales = {}
+    for fila in FacetaCatalogo.objects.filter(activo=True).values('categoria_id', 'cantidad'):
+        totales[fila['categoria_id']] = totales.get(fila['categoria_id'], 0) + fila['cantidad']
+    for categoria in categorias:
+        categoria['total_productos'] = totales.get(categoria['id'], 0)
+
+    # Las categorías no tienen fecha de modificación: el ETag sale del contenido
+    etag = calcular_etag(*(sorted(categoria.items()) for categoria in categorias))
+    return respuesta_condicional(request, etag, None, lambda: {'resultados': categorias})
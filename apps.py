@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class AppMascotasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app_mascotas'
+
+    def ready(self):
+        from django.core.signals import request_started
+
+        from . import autocompletado, signals  # noqa: F401
+
+        # El índice de sugerencias se arma en segundo plano con la primera
+        # petición del proceso (no en ready(): migrate y los comandos no lo usan)
+        def calentar_autocompletado(sender, **kwargs):
+            request_started.disconnect(dispatch_uid='autocompletado_calentar')
+            autocompletado.calentar()
+
+        request_started.connect(calentar_autocompletado, dispatch_uid='autocompletado_calentar', weak=False)
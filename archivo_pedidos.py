@@ -0,0 +1,172 @@
+# app_mascotas/archivo_pedidos.py
+"""
+Archivo de pedidos viejos (tabla caliente / tabla fría).
+
+Los pedidos entregados o cancelados con más de PEDIDOS_ARCHIVAR_MESES meses
+se mueven de Pedido/DetallePedido a PedidoArchivado/DetallePedidoArchivado
+conservando sus ids; la Venta y el historial de estados viajan dentro de la
+fila archivada. Así Pedido solo guarda los pedidos recientes o abiertos y su
+tamaño (y el costo de los listados del admin) no crece con los años.
+
+archivar_pedidos() recorre los candidatos por lotes de ids, cada lote en su
+propia transacción corta: copia con bulk_create y borra los originales.
+
+Las vistas leen las dos tablas: historial_de() y ventas() dan los querysets
+para paginar_keyset(); buscar_pedido() y buscar_venta() buscan por id en la
+tabla caliente y después en el archivo. Las ventas archivadas se muestran con
+VentaArchivada, que tiene los mismos nombres que Venta.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import (
+    DetallePedido, DetallePedidoArchivado, HistorialEstadoPedido, Pedido, PedidoArchivado, Venta
+)
+
+ESTADOS_ARCHIVABLES = ('entregado', 'cancelado')
+CAMPOS_PEDIDO = (
+    'id', 'usuario_id', 'numero_pedido', 'fecha_pedido', 'estado',
+    'subtotal', 'iva', 'total', 'direccion_envio', 'notas',
+)
+CAMPOS_DETALLE = (
+    'id', 'pedido_id', 'alimento_id', 'accesorio_id', 'mascota_id', 'cantidad', 'precio_unitario', 'subtotal',
+    'categoria_id', 'tipo_id',
+)
+
+
+def pedidos_archivables(meses=None):
+    """Pedidos entregados o cancelados hechos hace más de 'meses' meses (de 30 días)"""
+    if meses is None:
+        meses = getattr(settings, 'PEDIDOS_ARCHIVAR_MESES', 6)
+    limite = timezone.now() - timedelta(days=30 * meses)
+    return Pedido.objects.filter(estado__in=ESTADOS_ARCHIVABLES, fecha_pedido__lt=limite)
+
+
+# ==========================================
+# ARCHIVAR
+# ==========================================
+def _copiar(pedidos):
+    """
+    Copia los pedidos (dicts de .values()) con su venta, historial y renglones
+    al archivo. Sin ignore_conflicts: si un id ya está archivado el INSERT
+    falla y el lote se revierte antes de borrar los originales.
+    """
+    ids = [pedido['id'] for pedido in pedidos]
+    ventas = {
+        venta.pop('pedido_id'): venta
+        for venta in Venta.objects.filter(pedido_id__in=ids).values(
+            'pedido_id', 'fecha_venta', 'metodo_pago', 'referencia_pago', 'vendedor_id', venta_id=F('id'),
+        )
+    }
+    historial = {}
+    for cambio in (
+        HistorialEstadoPedido.objects.filter(pedido_id__in=ids)
+        .values('pedido_id', 'estado_anterior', 'estado_nuevo', 'usuario_id', 'fecha').order_by('fecha', 'id')
+    ):
+        cambio['fecha'] = cambio['fecha'].isoformat()
+        historial.setdefault(cambio.pop('pedido_id'), []).append(cambio)
+
+    PedidoArchivado.objects.bulk_create(
+        [
+            PedidoArchivado(historial_estados=historial.get(pedido['id'], []), **ventas.get(pedido['id'], {}), **pedido)
+            for pedido in pedidos
+        ],
+    )
+    detalles = [
+        DetallePedidoArchivado(**detalle)
+        for detalle in DetallePedido.objects.filter(pedido_id__in=ids).values(*CAMPOS_DETALLE).order_by('id')
+    ]
+    DetallePedidoArchivado.objects.bulk_create(detalles, batch_size=1000)
+    return len(detalles)
+
+def archivar_pedidos(queryset, tamano_lote=500, simular=False):
+    """
+    Mueve al archivo los pedidos del queryset en lotes de 'tamano_lote' ids,
+    cada uno en una transacción corta. Genera un dict por lote con el rango
+    de ids, los pedidos y renglones movidos y la duración.
+    """
+    ultimo = 0
+    while True:
+        inicio = time.monotonic()
+        with transaction.atomic():
+            pedidos = list(
+                queryset.filter(id__gt=ultimo).select_for_update().order_by('id').values(*CAMPOS_PEDIDO)[:tamano_lote]
+            )
+            if not pedidos:
+                return
+            ids = [pedido['id'] for pedido in pedidos]
+            if simular:
+                renglones = DetallePedido.objects.filter(pedido_id__in=ids).count()
+            else:
+                renglones = _copiar(pedidos)
+                HistorialEstadoPedido.objects.filter(pedido_id__in=ids).delete()
+                Venta.objects.filter(pedido_id__in=ids).delete()
+                DetallePedido.objects.filter(pedido_id__in=ids).delete()
+                Pedido.objects.filter(id__in=ids).delete()
+        ultimo = ids[-1]
+        yield {
+            'desde': ids[0],
+            'hasta': ultimo,
+            'pedidos': len(ids),
+            'renglones': renglones,
+            'segundos': time.monotonic() - inicio,
+        }
+
+
+# ==========================================
+# LECTURA DE AMBAS TABLAS
+# ==========================================
+def historial_de(usuario):
+    """[pedidos recientes, pedidos archivados] del usuario, para paginar juntos"""
+    return [Pedido.objects.filter(usuario=usuario), PedidoArchivado.objects.filter(usuario=usuario)]
+
+def buscar_pedido(**filtros):
+    """El Pedido o, si ya se archivó, el PedidoArchivado que cumple 'filtros'; None si no existe"""
+    return Pedido.objects.filter(**filtros).first() or PedidoArchivado.objects.filter(**filtros).first()
+
+
+class VentaArchivada:
+    """La venta guardada en un PedidoArchivado, con los nombres de Venta (solo lectura)"""
+    archivada = True
+
+    def __init__(self, pedido):
+        self.pedido = pedido
+        self.id = self.pk = pedido.venta_id
+        self.fecha_venta = pedido.fecha_venta
+        self.metodo_pago = pedido.metodo_pago
+        self.referencia_pago = pedido.referencia_pago
+        self.vendedor_id = pedido.vendedor_id
+
+    @property
+    def vendedor(self):
+        return self.pedido.vendedor
+
+    def get_metodo_pago_display(self):
+        return self.pedido.get_metodo_pago_display()
+
+# Orden de ventas(): venta_id es el id de Venta en las dos tablas
+ORDEN_VENTAS = ('-fecha_venta', '-venta_id')
+
+def ventas():
+    """[ventas archivadas, ventas recientes] para paginar_keyset() con ORDEN_VENTAS"""
+    return [
+        PedidoArchivado.objects.filter(venta_id__isnull=False).select_related('usuario'),
+        Venta.objects.select_related('pedido__usuario').annotate(venta_id=F('id')),
+    ]
+
+def como_ventas(objetos):
+    """Envuelve en VentaArchivada los PedidoArchivado de una página de ventas()"""
+    return [VentaArchivada(objeto) if isinstance(objeto, PedidoArchivado) else objeto for objeto in objetos]
+
+def buscar_venta(venta_id):
+    """La Venta o, si su pedido ya se archivó, la VentaArchivada con ese id; None si no existe"""
+    venta = Venta.objects.select_related('pedido__usuario').filter(id=venta_id).first()
+    if venta is not None:
+        return venta
+    pedido = PedidoArchivado.objects.select_related('usuario').filter(venta_id=venta_id).first()
+    return VentaArchivada(pedido) if pedido else None
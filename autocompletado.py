@@ -0,0 +1,250 @@
+# app_mascotas/autocompletado.py
+"""
+Índice de prefijos en memoria para las sugerencias del buscador.
+
+Cada proceso guarda una lista ordenada de claves (texto normalizado a partir
+del inicio de cada palabra) y responde las sugerencias con bisect, sin tocar
+la base de datos por cada tecla. calentar() construye el índice en un hilo
+aparte (AppConfig.ready() la conecta a la primera petición del proceso), las
+señales de los productos lo mantienen al día y ese mismo hilo lo reconstruye
+cada AUTOCOMPLETAR_TTL segundos para recoger los cambios hechos por otros
+procesos. Ninguna consulta de sugerencias construye el índice: mientras el
+hilo trabaja se siguen sirviendo las listas anteriores, y los cambios que
+llegan por señales durante la reconstrucción se vuelven a aplicar al final.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+from .busqueda import esta_publicado, tipo_de
+from .models import Categoria, Alimento, Accesorio, Mascota
+from .texto import normalizar
+
+LARGO_CLAVE = 60
+MAX_POSICIONES = 4
+LARGO_MINIMO = 2
+
+_candado = threading.RLock()
+_claves = []         # [(clave, tipo, id)] ordenada
+_claves_de = {}      # (tipo, id) -> claves registradas
+_etiquetas = {}      # (tipo, id) -> texto que se muestra
+_razas = {}          # raza normalizada -> cantidad de mascotas disponibles
+_raza_de = {}        # ('mascota', id) -> raza normalizada
+_construido_en = None
+_reconstruyendo = False
+_pendientes = []     # [(función, instancia)] recibidos durante una reconstrucción
+_hilo = None
+
+
+# ==========================================
+# FUNCIONES DE AYUDA
+# ==========================================
+def _maximo_claves():
+    return getattr(settings, 'AUTOCOMPLETAR_MAX_CLAVES', 200000)
+
+def claves_para(texto):
+    """'Collar de cuero' -> ['collar de cuero', 'de cuero', 'cuero']"""
+    normalizado = normalizar(texto)
+    posiciones = [0] + [i + 1 for i, caracter in enumerate(normalizado) if caracter == ' ']
+    return [normalizado[posicion:][:LARGO_CLAVE] for posicion in posiciones[:MAX_POSICIONES]]
+
+def _registrar(tipo, objeto_id, etiqueta):
+    claves = claves_para(etiqueta)
+    if not claves or len(_claves) + len(claves) > _maximo_claves():
+        return
+    for clave in claves:
+        insort(_claves, (clave, tipo, objeto_id))
+    _claves_de[(tipo, objeto_id)] = claves
+    _etiquetas[(tipo, objeto_id)] = etiqueta
+
+def _quitar(tipo, objeto_id):
+    for clave in _claves_de.pop((tipo, objeto_id), ()):
+        entrada = (clave, tipo, objeto_id)
+        posicion = bisect_left(_claves, entrada)
+        if posicion < len(_claves) and _claves[posicion] == entrada:
+            del _claves[posicion]
+    _etiquetas.pop((tipo, objeto_id), None)
+
+def _sumar_raza(raza):
+    normalizada = normalizar(raza)
+    if not normalizada:
+        return None
+    _razas[normalizada] = _razas.get(normalizada, 0) + 1
+    if _razas[normalizada] == 1:
+        _registrar('raza', normalizada, raza.strip())
+    return normalizada
+
+def _restar_raza(normalizada):
+    _razas[normalizada] -= 1
+    if _razas[normalizada] <= 0:
+        del _razas[normalizada]
+        _quitar('raza', normalizada)
+
+
+# ==========================================
+# CONSTRUCCIÓN
+# ==========================================
+def construir():
+    """Carga el índice completo con una consulta por modelo y un solo ordenamiento"""
+    global _construido_en, _reconstruyendo
+    with _candado:
+        _reconstruyendo = True
+    entradas, claves_de, etiquetas, razas, raza_de = [], {}, {}, {}, {}
+    maximo = _maximo_claves()
+
+    def agregar(tipo, objeto_id, etiqueta):
+        claves = claves_para(etiqueta)
+        if not claves or len(entradas) + len(claves) > maximo:
+            return
+        entradas.extend((clave, tipo, objeto_id) for clave in claves)
+        claves_de[(tipo, objeto_id)] = claves
+        etiquetas[(tipo, objeto_id)] = etiqueta
+
+    try:
+        for categoria_id, nombre in Categoria.objects.values_list('id', 'nombre'):
+            agregar('categoria', categoria_id, nombre)
+        for tipo, modelo in (('alimento', Alimento), ('accesorio', Accesorio)):
+            for producto_id, nombre in modelo.objects.filter(activo=True).values_list('id', 'nombre'):
+                agregar(tipo, producto_id, nombre)
+        for mascota_id, nombre, raza in Mascota.objects.filter(estado='disponible').values_list('id', 'nombre', 'raza'):
+            agregar('mascota', mascota_id, nombre)
+            normalizada = normalizar(raza)
+            if normalizada:
+                raza_de[('mascota', mascota_id)] = normalizada
+                razas[normalizada] = razas.get(normalizada, 0) + 1
+                if razas[normalizada] == 1:
+                    agregar('raza', normalizada, raza.strip())
+    except BaseException:
+        with _candado:
+            _reconstruyendo = False
+            _pendientes.clear()
+        raise
+
+    entradas.sort()
+    with _candado:
+        _claves[:] = entradas
+        _claves_de.clear()
+        _claves_de.update(claves_de)
+        _etiquetas.clear()
+        _etiquetas.update(etiquetas)
+        _razas.clear()
+        _razas.update(razas)
+        _raza_de.clear()
+        _raza_de.update(raza_de)
+        _construido_en = time.monotonic()
+        _reconstruyendo = False
+        # Cambios que llegaron mientras se leía la base (pueden faltar en la lectura)
+        pendientes = _pendientes[:]
+        _pendientes.clear()
+        for funcion, instancia in pendientes:
+            funcion(instancia)
+    return len(entradas)
+
+def _mantener():
+    """Cuerpo del hilo: construye el índice y lo reconstruye cada AUTOCOMPLETAR_TTL segundos"""
+    while True:
+        vigencia = getattr(settings, 'AUTOCOMPLETAR_TTL', 600)
+        try:
+            construir()
+        except DatabaseError:
+            # Base todavía sin migrar o caída: se reintenta en un momento
+            vigencia = min(vigencia, 30) if vigencia else 30
+        finally:
+            connection.close()
+        if not vigencia:
+            return
+        time.sleep(vigencia)
+
+def calentar():
+    """Arranca (una sola vez por proceso) el hilo que construye y refresca el índice"""
+    global _hilo
+    with _candado:
+        if _hilo is not None:
+            return
+        _hilo = threading.Thread(target=_mantener, name='autocompletado', daemon=True)
+    _hilo.start()
+
+def _aplazar(funcion, instancia):
+    """True si hay una reconstrucción en curso; el cambio se aplica cuando termine"""
+    if _reconstruyendo:
+        _pendientes.append((funcion, instancia))
+        return True
+    return False
+
+
+# ==========================================
+# ACTUALIZACIÓN INCREMENTAL
+# ==========================================
+def producto_guardado(instancia):
+    with _candado:
+        if _aplazar(producto_guardado, instancia) or _construido_en is None:
+            return
+        tipo = tipo_de(instancia)
+        _quitar(tipo, instancia.id)
+        raza_anterior = _raza_de.pop((tipo, instancia.id), None)
+        if raza_anterior:
+            _restar_raza(raza_anterior)
+        if not esta_publicado(instancia):
+            return
+        _registrar(tipo, instancia.id, instancia.nombre)
+        if tipo == 'mascota':
+            normalizada = _sumar_raza(instancia.raza)
+            if normalizada:
+                _raza_de[(tipo, instancia.id)] = normalizada
+
+def producto_eliminado(instancia):
+    with _candado:
+        if _aplazar(producto_eliminado, instancia) or _construido_en is None:
+            return
+        tipo = tipo_de(instancia)
+        _quitar(tipo, instancia.id)
+        raza_anterior = _raza_de.pop((tipo, instancia.id), None)
+        if raza_anterior:
+            _restar_raza(raza_anterior)
+
+def categoria_guardada(categoria):
+    with _candado:
+        if _aplazar(categoria_guardada, categoria) or _construido_en is None:
+            return
+        _quitar('categoria', categoria.id)
+        _registrar('categoria', categoria.id, categoria.nombre)
+
+def categoria_eliminada(categoria):
+    with _candado:
+        if not _aplazar(categoria_eliminada, categoria) and _construido_en is not None:
+            _quitar('categoria', categoria.id)
+
+
+# ==========================================
+# CONSULTAS
+# ==========================================
+def sugerir(texto, limite=None):
+    """
+    Devuelve hasta 'limite' sugerencias [{'texto', 'tipo', 'id'}] cuyo nombre
+    tenga alguna palabra que empiece con el texto dado. Nunca consulta la
+    base: si el índice aún no está listo responde una lista vacía.
+    """
+    if limite is None:
+        limite = getattr(settings, 'AUTOCOMPLETAR_LIMITE', 8)
+    prefijo = normalizar(texto)[:LARGO_CLAVE]
+    if len(prefijo) < LARGO_MINIMO:
+        return []
+
+    calentar()
+    with _candado:
+        encontrados = []
+        posicion = bisect_left(_claves, (prefijo,))
+        while posicion < len(_claves) and len(encontrados) < limite:
+            clave, tipo, objeto_id = _claves[posicion]
+            if not clave.startswith(prefijo):
+                break
+            if (tipo, objeto_id) not in encontrados:
+                encontrados.append((tipo, objeto_id))
+            posicion += 1
+        return [
+            {'texto': _etiquetas[(tipo, objeto_id)], 'tipo': tipo, 'id': objeto_id}
+            for tipo, objeto_id in encontrados
+        ]
@@ -98,6 +98,27 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Con peticiones simultáneas: las transacciones toman el candado de
+        # escritura al empezar y esperan hasta 'timeout' segundos en lugar de
+        # fallar con "database is locked"
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # Las pruebas con hilos necesitan un archivo; la base en memoria
+        # compartida no espera el candado
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
+    }
+}
+
+# Caché local por proceso; con varios procesos conviene un backend compartido
+# (Redis o Memcached) para que la versión del catálogo sea la misma en todos
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'chofys-pets',
     }
 }
 
@@ -155,6 +176,62 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # IVA para México
 IVA_PORCENTAJE = 0.16  # 16%
 
+# Búsqueda de productos
+BUSQUEDA_MAX_RESULTADOS = 60
+BUSQUEDA_MIN_RESULTADOS = 3  # Con menos se intenta corregir la consulta
+BUSQUEDA_SIMILITUD_MINIMA = 0.3  # Similitud de trigramas (0 a 1)
+BUSQUEDA_CACHE_MAXIMO = 1000  # Consultas distintas guardadas por proceso
+BUSQUEDA_CACHE_TTL = 300  # segundos
+
+# Sugerencias del buscador (índice en memoria por proceso)
+AUTOCOMPLETAR_LIMITE = 8
+AUTOCOMPLETAR_MAX_CLAVES = 200000
+AUTOCOMPLETAR_TTL = 600  # segundos entre reconstrucciones en segundo plano (0 = solo al arrancar)
+
+# Paginación por cursor de los listados
+PAGINACION_TAMANO = 24
+PAGINACION_MAXIMO = 96
+
+# Productos relacionados precalculados por producto
+RELACIONADOS_CANTIDAD = 8
+
+# Resumen del carrito (navbar) guardado en la caché por usuario
+CARRITO_RESUMEN_TTL = 300  # segundos
+
+# Carrito de visitantes anónimos (cookie firmada)
+CARRITO_INVITADO_DIAS = 30
+
+# Limpieza de carritos (comando limpiar_carritos)
+CARRITO_INACTIVO_DIAS = 30  # carritos ya convertidos en pedido
+CARRITO_ABANDONADO_DIAS = 90  # carritos activos sin cambios
+
+# Reservas de stock de los renglones del carrito (comando liberar_reservas)
+RESERVA_STOCK_TTL = 900  # segundos
+
+# Cola de trabajos en segundo plano (comando run_jobs)
+TRABAJOS_BLOQUEO = 300  # segundos antes de que otro worker retome un trabajo
+TRABAJOS_REINTENTO_BASE = 30  # segundos; se duplica en cada intento
+TRABAJOS_REINTENTO_MAXIMO = 3600
+TRABAJOS_CONSERVAR_DIAS = 7  # los completados se purgan al iniciar run_jobs
+
+# Claves de idempotencia de checkout y pago (comando purgar_idempotencia)
+IDEMPOTENCIA_TTL = 86400  # segundos
+IDEMPOTENCIA_ESPERA = 5.0  # segundos que un reintento espera a la petición original
+
+# Archivo de pedidos entregados/cancelados (comando archivar_pedidos)
+PEDIDOS_ARCHIVAR_MESES = 6
+
+# Resúmenes de ventas de la página de reportes (comando actualizar_resumenes)
+REPORTES_MARGEN = 300  # segundos; las ventas más recientes esperan a la siguiente corrida
+
+# Correo (los envía run_jobs); en desarrollo se imprime en la consola
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = "Chofys Pet's <no-responder@chofyspets.com>"
+
+# Caché de fragmentos del catálogo (página de inicio)
+CACHE_FRAGMENTOS_TTL = 300  # segundos
+CACHE_FRAGMENTOS_ESPERA = 2.0  # segundos máximos esperando a otro proceso
+
 # Configurar modelo de usuario personalizado
 AUTH_USER_MODEL = 'app_mascotas.Usuario'
 
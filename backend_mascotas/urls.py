@@ -7,6 +7,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('app_mascotas.urls_cliente')),  # Tienda cliente (raíz)
     path('administracion/', include('app_mascotas.urls')),  # Panel admin
+    path('api/v1/', include('app_mascotas.urls_api')),  # API JSON del catálogo
 ]
 
 if settings.DEBUG:
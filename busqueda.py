@@ -0,0 +1,205 @@
+# app_mascotas/busqueda.py
+"""
+Índice de búsqueda de texto completo para alimentos, accesorios y mascotas.
+
+En SQLite se usa una tabla virtual FTS5 (creada en la migración 0003) con
+ranking BM25. El rowid de cada documento codifica el tipo de producto y su id,
+así que actualizar o borrar un producto del índice es una búsqueda por llave.
+En otros motores se vuelve a la búsqueda con icontains.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from .models import Alimento, Accesorio, Mascota
+
+TABLA_INDICE = 'app_mascotas_indice_busqueda'
+
+# Código de cada tipo de producto dentro del rowid: rowid = id * 4 + código
+CODIGOS_TIPO = {'alimento': 1, 'accesorio': 2, 'mascota': 3}
+TIPOS_POR_CODIGO = {codigo: tipo for tipo, codigo in CODIGOS_TIPO.items()}
+MODELOS_TIPO = {'alimento': Alimento, 'accesorio': Accesorio, 'mascota': Mascota}
+
+# Pesos BM25 por columna: nombre, descripcion, etiquetas
+PESOS_BM25 = (10.0, 1.0, 4.0)
+
+MAX_TERMINOS = 10
+
+
+# ==========================================
+# FUNCIONES DE AYUDA
+# ==========================================
+def indice_disponible():
+    """El índice FTS5 solo existe en SQLite"""
+    return connection.vendor == 'sqlite'
+
+def tipo_de(instancia):
+    """Devuelve 'alimento', 'accesorio' o 'mascota' según el modelo"""
+    for tipo, modelo in MODELOS_TIPO.items():
+        if isinstance(instancia, modelo):
+            return tipo
+    return None
+
+def rowid_de(tipo_producto, producto_id):
+    return producto_id * 4 + CODIGOS_TIPO[tipo_producto]
+
+def esta_publicado(instancia):
+    """Solo se indexan los productos que la tienda muestra"""
+    if isinstance(instancia, Mascota):
+        return instancia.estado == 'disponible'
+    return instancia.activo
+
+def documento_de(instancia):
+    """Arma la fila (rowid, nombre, descripcion, etiquetas) del índice"""
+    tipo_producto = tipo_de(instancia)
+    if tipo_producto == 'mascota':
+        etiquetas = f"{instancia.raza} {instancia.tipo.nombre}"
+    else:
+        etiquetas = f"{instancia.categoria.nombre} {instancia.tipo.nombre}"
+    return (
+        rowid_de(tipo_producto, instancia.id),
+        instancia.nombre,
+        instancia.descripcion or '',
+        etiquetas,
+    )
+
+def construir_consulta_fts(texto):
+    """Convierte el texto del usuario en una consulta FTS5 segura (prefijos con AND)"""
+    terminos = re.findall(r'\w+', texto.lower())[:MAX_TERMINOS]
+    return ' '.join(f'"{termino}"*' for termino in terminos)
+
+
+# ==========================================
+# MANTENIMIENTO DEL ÍNDICE
+# ==========================================
+def indexar(instancia):
+    """Inserta o reemplaza un producto en el índice (lo quita si no está publicado)"""
+    if not indice_disponible():
+        return
+    tipo_producto = tipo_de(instancia)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {TABLA_INDICE} WHERE rowid = %s",
+            [rowid_de(tipo_producto, instancia.id)]
+        )
+        if esta_publicado(instancia):
+            cursor.execute(
+                f"INSERT INTO {TABLA_INDICE} (rowid, nombre, descripcion, etiquetas) "
+                f"VALUES (%s, %s, %s, %s)",
+                documento_de(instancia)
+            )
+
+def desindexar(instancia):
+    """Quita un producto del índice"""
+    if not indice_disponible():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {TABLA_INDICE} WHERE rowid = %s",
+            [rowid_de(tipo_de(instancia), instancia.id)]
+        )
+
+def indexar_lote(queryset, tamano_lote=1000):
+    """Reindexa todos los productos de un queryset en lotes"""
+    if not indice_disponible():
+        return 0
+    total = 0
+    borrar, insertar = [], []
+    queryset = queryset.select_related('tipo')
+    if queryset.model is not Mascota:
+        queryset = queryset.select_related('categoria')
+
+    def volcar():
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {TABLA_INDICE} WHERE rowid = %s", borrar)
+            if insertar:
+                cursor.executemany(
+                    f"INSERT INTO {TABLA_INDICE} (rowid, nombre, descripcion, etiquetas) "
+                    f"VALUES (%s, %s, %s, %s)",
+                    insertar
+                )
+        borrar.clear()
+        insertar.clear()
+
+    for instancia in queryset.iterator(chunk_size=tamano_lote):
+        documento = documento_de(instancia)
+        borrar.append([documento[0]])
+        if esta_publicado(instancia):
+            insertar.append(documento)
+            total += 1
+        if len(borrar) >= tamano_lote:
+            volcar()
+    if borrar:
+        volcar()
+    return total
+
+def reconstruir_indice(tamano_lote=1000):
+    """Vacía el índice y lo vuelve a llenar con todo el catálogo publicado"""
+    if not indice_disponible():
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA_INDICE}")
+    totales = {}
+    for tipo_producto, modelo in MODELOS_TIPO.items():
+        totales[tipo_producto] = indexar_lote(modelo.objects.all(), tamano_lote)
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLA_INDICE} ({TABLA_INDICE}) VALUES ('optimize')")
+    return totales
+
+
+# ==========================================
+# CONSULTAS
+# ==========================================
+def buscar(texto, limite=None):
+    """
+    Busca en el catálogo publicado y devuelve una lista de
+    (tipo_producto, producto_id, puntaje) ordenada por relevancia.
+    """
+    if limite is None:
+        limite = getattr(settings, 'BUSQUEDA_MAX_RESULTADOS', 60)
+    if not indice_disponible():
+        return buscar_sin_indice(texto, limite)
+
+    consulta = construir_consulta_fts(texto)
+    if not consulta:
+        return []
+
+    pesos = ', '.join(str(peso) for peso in PESOS_BM25)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, bm25({TABLA_INDICE}, {pesos}) AS rango "
+            f"FROM {TABLA_INDICE} WHERE {TABLA_INDICE} MATCH %s "
+            f"ORDER BY rango LIMIT %s",
+            [consulta, limite]
+        )
+        filas = cursor.fetchall()
+
+    return [
+        (TIPOS_POR_CODIGO[rowid % 4], rowid // 4, -rango)
+        for rowid, rango in filas
+    ]
+
+def buscar_sin_indice(texto, limite):
+    """Búsqueda con icontains para motores sin FTS5"""
+    filtro_producto = (
+        Q(nombre__icontains=texto) |
+        Q(descripcion__icontains=texto) |
+        Q(categoria__nombre__icontains=texto)
+    )
+    filtro_mascota = (
+        Q(nombre__icontains=texto) |
+        Q(raza__icontains=texto) |
+        Q(descripcion__icontains=texto)
+    )
+    consultas = [
+        ('alimento', Alimento.objects.filter(filtro_producto, activo=True)),
+        ('accesorio', Accesorio.objects.filter(filtro_producto, activo=True)),
+        ('mascota', Mascota.objects.filter(filtro_mascota, estado='disponible')),
+    ]
+    resultados = []
+    for tipo_producto, queryset in consultas:
+        ids = queryset.values_list('id', flat=True)[:limite]
+        resultados.extend((tipo_producto, producto_id, 0.0) for producto_id in ids)
+    return resultados[:limite]
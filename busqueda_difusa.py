@@ -0,0 +1,144 @@
+# app_mascotas/busqueda_difusa.py
+"""
+Búsqueda tolerante a errores de escritura con un índice de trigramas.
+
+El vocabulario se arma con las palabras de los nombres de alimentos y
+accesorios, las razas de las mascotas y los nombres de categorías y tipos. Para
+cada palabra de la consulta que no está en el vocabulario se buscan candidatas
+que compartan trigramas (filtradas por índice en la base de datos) y se
+ordenan por similitud de Jaccard, igual que pg_trgm. La consulta corregida se
+vuelve a pasar por la búsqueda normal.
+"""
+from django.conf import settings
+from django.db.models import Count, F, FloatField, ExpressionWrapper
+
+from .models import Categoria, Tipo, Alimento, Accesorio, Mascota, PalabraBusqueda, TrigramaPalabra
+from .texto import palabras
+
+LARGO_MINIMO = 3
+MAX_CANDIDATAS = 5
+
+
+# ==========================================
+# FUNCIONES DE AYUDA
+# ==========================================
+def trigramas(palabra):
+    """Trigramas con relleno de espacios: 'gato' -> {'  g', ' ga', 'gat', 'ato', 'to '}"""
+    relleno = f'  {palabra} '
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+def palabras_de(*textos):
+    return {
+        palabra[:100]
+        for texto in textos
+        for palabra in palabras(texto)
+        if len(palabra) >= LARGO_MINIMO and not palabra.isdigit()
+    }
+
+def textos_de(instancia):
+    """Textos de una instancia que alimentan el vocabulario"""
+    if isinstance(instancia, Mascota):
+        return [instancia.raza]
+    return [instancia.nombre]
+
+
+# ==========================================
+# MANTENIMIENTO DEL VOCABULARIO
+# ==========================================
+def registrar_palabras(nuevas):
+    """Agrega al vocabulario las palabras que todavía no existen (tres consultas en total)"""
+    nuevas = set(nuevas)
+    if not nuevas:
+        return 0
+    existentes = set(PalabraBusqueda.objects.filter(texto__in=nuevas).values_list('texto', flat=True))
+    faltantes = sorted(nuevas - existentes)
+    if not faltantes:
+        return 0
+
+    PalabraBusqueda.objects.bulk_create(
+        [PalabraBusqueda(texto=palabra, num_trigramas=len(trigramas(palabra))) for palabra in faltantes],
+        ignore_conflicts=True,
+    )
+    ids = dict(PalabraBusqueda.objects.filter(texto__in=faltantes).values_list('texto', 'id'))
+    TrigramaPalabra.objects.bulk_create(
+        [
+            TrigramaPalabra(trigrama=trigrama, palabra_id=ids[palabra])
+            for palabra in faltantes if palabra in ids
+            for trigrama in trigramas(palabra)
+        ],
+        batch_size=1000,
+    )
+    return len(faltantes)
+
+def registrar_instancia(instancia):
+    registrar_palabras(palabras_de(*textos_de(instancia)))
+
+def reconstruir_vocabulario():
+    """
+    Vuelve a armar el vocabulario desde cero. Las palabras de productos que ya
+    no existen solo se eliminan aquí; mientras tanto no estorban porque la
+    búsqueda normal no les encuentra resultados.
+    """
+    PalabraBusqueda.objects.all().delete()
+    vocabulario = set()
+    for modelo in (Alimento, Accesorio):
+        for nombre in modelo.objects.values_list('nombre', flat=True).iterator():
+            vocabulario |= palabras_de(nombre)
+    for raza in Mascota.objects.values_list('raza', flat=True).iterator():
+        vocabulario |= palabras_de(raza)
+    for modelo in (Categoria, Tipo):
+        for nombre in modelo.objects.values_list('nombre', flat=True):
+            vocabulario |= palabras_de(nombre)
+    return registrar_palabras(vocabulario)
+
+
+# ==========================================
+# CONSULTAS
+# ==========================================
+def similares(palabra, limite=MAX_CANDIDATAS):
+    """
+    Palabras del vocabulario parecidas a 'palabra' como [(texto, similitud)].
+    El índice de trigramas preselecciona las candidatas y la similitud
+    |A ∩ B| / |A ∪ B| se calcula y ordena en SQL.
+    """
+    propios = trigramas(palabra)
+    umbral = getattr(settings, 'BUSQUEDA_SIMILITUD_MINIMA', 0.3)
+    # Con similitud >= umbral el tamaño de la otra palabra queda acotado
+    minimo, maximo = int(len(propios) * umbral), int(len(propios) / umbral) + 1
+
+    candidatas = (
+        TrigramaPalabra.objects
+        .filter(trigrama__in=propios, palabra__num_trigramas__range=(minimo, maximo))
+        .values('palabra__texto', 'palabra__num_trigramas')
+        .annotate(comunes=Count('id'))
+        .annotate(similitud=ExpressionWrapper(
+            F('comunes') * 1.0 / (len(propios) + F('palabra__num_trigramas') - F('comunes')),
+            output_field=FloatField(),
+        ))
+        .filter(similitud__gte=umbral)
+        .order_by('-similitud', 'palabra__texto')[:limite]
+    )
+    return [(fila['palabra__texto'], fila['similitud']) for fila in candidatas]
+
+def corregir_consulta(texto):
+    """
+    Reemplaza cada palabra desconocida por la más parecida del vocabulario y
+    descarta las que no se parecen a ninguna. Devuelve la consulta corregida
+    o None si no hubo nada que corregir.
+    """
+    terminos = palabras(texto)
+    conocidas = set(
+        PalabraBusqueda.objects.filter(texto__in=terminos).values_list('texto', flat=True)
+    )
+    corregidos = []
+    for termino in terminos:
+        if termino in conocidas or len(termino) < LARGO_MINIMO or termino.isdigit():
+            corregidos.append(termino)
+            continue
+        candidatas = similares(termino, limite=1)
+        if candidatas:
+            corregidos.append(candidatas[0][0])
+
+    if not corregidos or corregidos == terminos:
+        return None
+    return ' '.join(corregidos)
@@ -0,0 +1,144 @@
+# app_mascotas/cache_busqueda.py
+"""
+Caché de resultados de búsqueda.
+
+Las consultas se normalizan (minúsculas, sin acentos, espacios colapsados y
+sin palabras vacías) para que "Croquetas  para PERRO" y "croquetas perro"
+compartan la misma entrada. Cada entrada guarda solo los pares
+(tipo_producto, producto_id) ya ordenados por relevancia, así que la página
+siempre muestra precios y existencias actuales. Las entradas pertenecen a una
+generación: la versión del catálogo de cache_catalogo, que las señales
+incrementan con cualquier cambio de producto.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from . import busqueda, busqueda_difusa
+from .cache_catalogo import version_catalogo
+from .texto import palabras
+
+PALABRAS_VACIAS = {
+    'a', 'al', 'con', 'de', 'del', 'el', 'en', 'la', 'las', 'lo', 'los',
+    'o', 'para', 'por', 'su', 'sus', 'un', 'una', 'unos', 'unas', 'y',
+}
+
+
+# ==========================================
+# NORMALIZACIÓN
+# ==========================================
+def normalizar_consulta(texto):
+    """'Croquetas  para PERRO' -> 'croquetas perro'"""
+    return ' '.join(palabra for palabra in palabras(texto) if palabra not in PALABRAS_VACIAS)
+
+
+# ==========================================
+# LRU CON VENCIMIENTO
+# ==========================================
+class CacheLRU:
+    """LRU acotado por número de entradas, con vencimiento y contadores"""
+
+    def __init__(self, maximo, duracion):
+        self.maximo = maximo
+        self.duracion = duracion
+        self._entradas = OrderedDict()  # llave -> (guardado_en, valor)
+        self._candado = threading.Lock()
+        self._generacion = None
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self.invalidaciones = 0
+
+    def _revisar_generacion(self, generacion):
+        if generacion != self._generacion:
+            if self._entradas:
+                self.invalidaciones += 1
+            self._entradas.clear()
+            self._generacion = generacion
+
+    def obtener(self, llave, generacion):
+        with self._candado:
+            self._revisar_generacion(generacion)
+            entrada = self._entradas.get(llave)
+            if entrada is None or time.monotonic() - entrada[0] > self.duracion:
+                if entrada is not None:
+                    del self._entradas[llave]
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(llave)
+            self.aciertos += 1
+            return entrada[1]
+
+    def guardar(self, llave, valor, generacion):
+        with self._candado:
+            self._revisar_generacion(generacion)
+            self._entradas[llave] = (time.monotonic(), valor)
+            self._entradas.move_to_end(llave)
+            while len(self._entradas) > self.maximo:
+                self._entradas.popitem(last=False)
+                self.expulsiones += 1
+
+    def limpiar(self):
+        with self._candado:
+            self._entradas.clear()
+
+    def estadisticas(self):
+        with self._candado:
+            consultas = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._entradas),
+                'maximo': self.maximo,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else 0.0,
+                'expulsiones': self.expulsiones,
+                'invalidaciones': self.invalidaciones,
+                'generacion': self._generacion,
+            }
+
+
+_cache = CacheLRU(
+    maximo=getattr(settings, 'BUSQUEDA_CACHE_MAXIMO', 1000),
+    duracion=getattr(settings, 'BUSQUEDA_CACHE_TTL', 300),
+)
+
+
+# ==========================================
+# BÚSQUEDA CON CACHÉ
+# ==========================================
+def _ejecutar(consulta):
+    """Búsqueda exacta y, si hay pocos resultados, la corregida por trigramas"""
+    encontrados = [(tipo_producto, producto_id) for tipo_producto, producto_id, _puntaje in busqueda.buscar(consulta)]
+    consulta_corregida = None
+
+    if len(encontrados) < getattr(settings, 'BUSQUEDA_MIN_RESULTADOS', 3):
+        consulta_corregida = busqueda_difusa.corregir_consulta(consulta)
+        if consulta_corregida:
+            for tipo_producto, producto_id, _puntaje in busqueda.buscar(consulta_corregida):
+                if (tipo_producto, producto_id) not in encontrados:
+                    encontrados.append((tipo_producto, producto_id))
+    return tuple(encontrados), consulta_corregida
+
+def buscar(texto):
+    """
+    Devuelve (pares, consulta_corregida) para el texto del usuario, donde
+    'pares' son los (tipo_producto, producto_id) ordenados por relevancia.
+    """
+    consulta = normalizar_consulta(texto)
+    if not consulta:
+        return (), None
+
+    generacion = version_catalogo()
+    resultado = _cache.obtener(consulta, generacion)
+    if resultado is None:
+        resultado = _ejecutar(consulta)
+        _cache.guardar(consulta, resultado, generacion)
+    return resultado
+
+def estadisticas():
+    return _cache.estadisticas()
+
+def limpiar():
+    _cache.limpiar()
@@ -0,0 +1,74 @@
+# app_mascotas/cache_catalogo.py
+"""
+Caché de fragmentos del catálogo con versión e invalidación por señales.
+
+Todas las llaves llevan la versión actual del catálogo; las señales de los
+productos y categorías la incrementan, así que después de cualquier cambio
+las llaves viejas simplemente dejan de leerse. Para evitar la estampida al
+invalidar, solo el proceso que consigue el candado regenera el fragmento; los
+demás sirven la última copia generada mientras tanto.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+LLAVE_VERSION = 'catalogo:version'
+
+
+# ==========================================
+# VERSIÓN DEL CATÁLOGO
+# ==========================================
+def version_catalogo():
+    version = cache.get(LLAVE_VERSION)
+    if version is None:
+        cache.add(LLAVE_VERSION, 1, timeout=None)
+        version = cache.get(LLAVE_VERSION, 1)
+    return version
+
+def invalidar_catalogo():
+    """Incrementa la versión; todos los fragmentos quedan vencidos"""
+    try:
+        cache.incr(LLAVE_VERSION)
+    except ValueError:
+        cache.add(LLAVE_VERSION, 2, timeout=None)
+
+
+# ==========================================
+# FRAGMENTOS
+# ==========================================
+def fragmento(nombre, generar):
+    """
+    Devuelve el fragmento 'nombre' de la versión actual del catálogo,
+    llamando a generar() solo si no está en caché.
+    """
+    duracion = getattr(settings, 'CACHE_FRAGMENTOS_TTL', 300)
+    espera_maxima = getattr(settings, 'CACHE_FRAGMENTOS_ESPERA', 2.0)
+    llave = f'catalogo:{nombre}:v{version_catalogo()}'
+    llave_candado = f'{llave}:candado'
+    llave_ultimo = f'catalogo:{nombre}:ultimo'
+
+    contenido = cache.get(llave)
+    if contenido is not None:
+        return contenido
+
+    limite = time.monotonic() + espera_maxima
+    while not cache.add(llave_candado, 1, timeout=int(espera_maxima) + 10):
+        # Otro proceso lo está regenerando: servir la copia anterior si existe
+        ultimo = cache.get(llave_ultimo)
+        if ultimo is not None:
+            return ultimo
+        if time.monotonic() > limite:
+            return generar()
+        time.sleep(0.05)
+        contenido = cache.get(llave)
+        if contenido is not None:
+            return contenido
+
+    try:
+        contenido = generar()
+        cache.set(llave, contenido, timeout=duracion)
+        cache.set(llave_ultimo, contenido, timeout=None)
+    finally:
+        cache.delete(llave_candado)
+    return contenido
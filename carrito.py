@@ -0,0 +1,507 @@
+# app_mascotas/carrito.py
+"""
+Servicios del carrito de compras.
+
+Carrito guarda num_items (renglones) y subtotal. ItemCarrito.save() y
+ItemCarrito.delete() los ajustan con un UPDATE ... SET subtotal = subtotal + X
+dentro de la misma transacción, donde X usa el precio actual leído en la misma
+sentencia; los cambios de precio y el borrado de productos ajustan los
+carritos activos que los contienen. Los carritos inactivos (ya convertidos en
+pedido) conservan los totales que tenían. Las operaciones en bloque sobre
+ItemCarrito deben llamar a ajustar_totales() o correr reconciliar_totales().
+
+Agregar productos usa INSERT ... ON CONFLICT DO UPDATE SET cantidad =
+cantidad + n sobre las restricciones únicas (carrito, alimento) y
+(carrito, accesorio): una sola sentencia, correcta aunque lleguen dos
+peticiones a la vez.
+
+El resumen del navbar se lee de esos totales y se guarda en la caché por
+usuario; invalidar_resumen() lo descarta.
+
+Los visitantes anónimos llevan su carrito en una cookie firmada
+("a12:2,c5:1" = alimento 12 x2, accesorio 5 x1), así navegar y agregar
+productos no escribe nada en la base de datos ni en la sesión. Al iniciar
+sesión o registrarse el contenido se fusiona con el Carrito del usuario.
+
+Cada renglón de un carrito de usuario reserva sus unidades (ver
+reservas.py): agregar o cambiar cantidades lanza StockInsuficiente y no
+cambia nada si el producto no alcanza.
+"""
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, F, Max, Min, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Now
+from django.utils import timezone
+
+from . import reservas
+from .models import Carrito, CarritoArchivado, ItemCarrito, Alimento, Accesorio, ReservaStock
+
+LLAVE_RESUMEN = 'carrito:resumen:{}'
+CENTAVOS = Decimal('0.01')
+MODELOS_ITEM = {'alimento': Alimento, 'accesorio': Accesorio}
+
+COOKIE_INVITADO = 'carrito_invitado'
+SAL_INVITADO = 'app_mascotas.carrito'
+PREFIJOS_INVITADO = {'a': 'alimento', 'c': 'accesorio'}
+CODIGOS_INVITADO = {'alimento': 0, 'accesorio': 1}
+MAX_RENGLONES_INVITADO = 50
+MAX_CANTIDAD_INVITADO = 999
+
+
+# ==========================================
+# FUNCIONES DE AYUDA
+# ==========================================
+def precio_item():
+    """Precio unitario del renglón, venga de un alimento o de un accesorio"""
+    return Coalesce(F('alimento__precio'), F('accesorio__precio'))
+
+def _decimal():
+    return DecimalField(max_digits=12, decimal_places=2)
+
+def subtotal_item():
+    return Sum(F('cantidad') * precio_item(), output_field=_decimal())
+
+def _precio_actual(campo, producto_id):
+    """Subconsulta con el precio vigente del producto (0 si ya no existe)"""
+    precio = MODELOS_ITEM[campo].objects.filter(pk=producto_id).values('precio')[:1]
+    return Coalesce(Subquery(precio, output_field=_decimal()), Value(Decimal('0')), output_field=_decimal())
+
+def _por_carrito(queryset, agregado):
+    """Subconsulta correlacionada con un agregado de los renglones de cada carrito"""
+    return Subquery(
+        queryset.filter(carrito=OuterRef('pk')).order_by()
+        .values('carrito').annotate(valor=agregado).values('valor')
+    )
+
+def iva_de(subtotal):
+    porcentaje = Decimal(str(getattr(settings, 'IVA_PORCENTAJE', 0.16)))
+    return (subtotal * porcentaje).quantize(CENTAVOS)
+
+
+# ==========================================
+# RESUMEN DEL CARRITO
+# ==========================================
+def calcular_resumen(usuario_id):
+    """Renglones y subtotal del carrito activo con una sola consulta"""
+    datos = Carrito.objects.filter(usuario_id=usuario_id, activo=True).aggregate(
+        total_items=Sum('num_items'), subtotal=Sum('subtotal'),
+    )
+    subtotal = (datos['subtotal'] or Decimal('0')).quantize(CENTAVOS)
+    return {'total_items': datos['total_items'] or 0, 'subtotal': subtotal}
+
+def resumen_carrito(usuario_id):
+    """
+    Resumen del carrito desde la caché: {'total_items', 'subtotal', 'iva', 'total'}
+    """
+    llave = LLAVE_RESUMEN.format(usuario_id)
+    resumen = cache.get(llave)
+    if resumen is None:
+        resumen = calcular_resumen(usuario_id)
+        cache.set(llave, resumen, timeout=getattr(settings, 'CARRITO_RESUMEN_TTL', 300))
+    iva = iva_de(resumen['subtotal'])
+    return {**resumen, 'iva': iva, 'total': resumen['subtotal'] + iva}
+
+def invalidar_resumen(*usuario_ids):
+    cache.delete_many([LLAVE_RESUMEN.format(usuario_id) for usuario_id in usuario_ids])
+
+def invalidar_por_producto(campo, producto_id):
+    """Invalida los resúmenes de los carritos activos que tienen el producto"""
+    usuario_ids = set(
+        ItemCarrito.objects.filter(carrito__activo=True, **{f'{campo}_id': producto_id})
+        .values_list('carrito__usuario_id', flat=True)
+    )
+    if usuario_ids:
+        invalidar_resumen(*usuario_ids)
+
+
+# ==========================================
+# TOTALES GUARDADOS
+# ==========================================
+def _producto_de(renglon):
+    _carrito_id, alimento_id, accesorio_id, _cantidad = renglon
+    if alimento_id:
+        return 'alimento', alimento_id
+    if accesorio_id:
+        return 'accesorio', accesorio_id
+    return None
+
+def ajustar_totales(anterior, actual):
+    """
+    Aplica a los carritos la diferencia entre dos estados de un renglón
+    (carrito_id, alimento_id, accesorio_id, cantidad); None significa que el
+    renglón no existía o ya no existe. Cada carrito se actualiza con un solo
+    UPDATE con F(), así dos peticiones simultáneas no se pisan.
+    """
+    cambios = {}  # carrito_id -> [renglones, {producto: cantidad}]
+    for renglon, signo in ((anterior, -1), (actual, 1)):
+        if renglon is None:
+            continue
+        cambio = cambios.setdefault(renglon[0], [0, {}])
+        cambio[0] += signo
+        producto = _producto_de(renglon)
+        if producto:
+            cambio[1][producto] = cambio[1].get(producto, 0) + signo * renglon[3]
+
+    for carrito_id, (renglones, cantidades) in cambios.items():
+        importe = Value(Decimal('0'), output_field=_decimal())
+        for (campo, producto_id), cantidad in cantidades.items():
+            if cantidad:
+                importe = importe + Value(cantidad, output_field=_decimal()) * _precio_actual(campo, producto_id)
+        valores = {'subtotal': F('subtotal') + importe, 'fecha_actualizacion': Now()}
+        if renglones:
+            valores['num_items'] = F('num_items') + renglones
+        Carrito.objects.filter(pk=carrito_id).update(**valores)
+
+def repreciar_producto(campo, producto_id, diferencia):
+    """Suma diferencia x cantidad al subtotal de los carritos activos con el producto"""
+    renglones = ItemCarrito.objects.filter(**{f'{campo}_id': producto_id})
+    Carrito.objects.filter(activo=True, **{f'items__{campo}_id': producto_id}).update(
+        subtotal=F('subtotal') + _por_carrito(renglones, Sum('cantidad')) * Value(diferencia, output_field=_decimal())
+    )
+
+def quitar_producto(campo, producto_id):
+    """Descuenta de los carritos activos los renglones de un producto que se va a eliminar"""
+    renglones = ItemCarrito.objects.filter(**{f'{campo}_id': producto_id})
+    Carrito.objects.filter(activo=True, **{f'items__{campo}_id': producto_id}).update(
+        num_items=F('num_items') - _por_carrito(renglones, Count('id')),
+        subtotal=F('subtotal') - _por_carrito(renglones, subtotal_item()),
+    )
+
+def recalcular_totales(*carrito_ids):
+    """Recalcula desde los renglones los totales de los carritos indicados (un UPDATE)"""
+    renglones = ItemCarrito.objects.all()
+    Carrito.objects.filter(id__in=carrito_ids).update(
+        num_items=Coalesce(_por_carrito(renglones, Count('id')), 0),
+        subtotal=Coalesce(_por_carrito(renglones, subtotal_item()), Value(Decimal('0')), output_field=_decimal()),
+        fecha_actualizacion=Now(),
+    )
+
+def reconciliar_totales(corregir=True, tamano_lote=1000):
+    """
+    Recalcula en bloque los totales de los carritos activos y devuelve las
+    diferencias encontradas como dicts (carrito_id, usuario_id, guardado y
+    real). Con corregir=True además guarda los valores reales.
+    """
+    carritos = (
+        Carrito.objects.filter(activo=True)
+        .annotate(
+            items_real=Coalesce(_por_carrito(ItemCarrito.objects.all(), Count('id')), 0),
+            subtotal_real=Coalesce(_por_carrito(ItemCarrito.objects.all(), subtotal_item()), Value(Decimal('0')), output_field=_decimal()),
+        )
+        .values('id', 'usuario_id', 'num_items', 'subtotal', 'items_real', 'subtotal_real')
+        .order_by('id')
+    )
+    diferencias, lote = [], []
+    for fila in carritos.iterator(chunk_size=tamano_lote):
+        subtotal_real = Decimal(str(fila['subtotal_real'])).quantize(CENTAVOS)
+        if fila['num_items'] == fila['items_real'] and fila['subtotal'] == subtotal_real:
+            continue
+        diferencias.append({
+            'carrito_id': fila['id'],
+            'usuario_id': fila['usuario_id'],
+            'num_items': fila['num_items'],
+            'items_real': fila['items_real'],
+            'subtotal': fila['subtotal'],
+            'subtotal_real': subtotal_real,
+        })
+        lote.append(Carrito(id=fila['id'], num_items=fila['items_real'], subtotal=subtotal_real))
+
+    if corregir and lote:
+        Carrito.objects.bulk_update(lote, ['num_items', 'subtotal'], batch_size=tamano_lote)
+        invalidar_resumen(*{diferencia['usuario_id'] for diferencia in diferencias})
+    return diferencias
+
+
+# ==========================================
+# ESCRITURA DE RENGLONES
+# ==========================================
+def _ids_producto(campo, producto_id):
+    """(alimento_id, accesorio_id) de un renglón"""
+    return (producto_id, None) if campo == 'alimento' else (None, producto_id)
+
+def _producto_de_item(item):
+    return _producto_de((item.carrito_id, item.alimento_id, item.accesorio_id, item.cantidad))
+
+def _filtro_reservas(items):
+    """Q que selecciona las reservas de los productos de 'items'"""
+    filtro = Q(pk__in=[])
+    for item in items:
+        campo, producto_id = _producto_de_item(item)
+        filtro |= Q(tipo_producto=campo, producto_id=producto_id)
+    return filtro
+
+def carrito_activo(usuario):
+    """Carrito activo del usuario; la restricción carrito_activo_unico evita duplicados"""
+    carrito, _creado = Carrito.objects.get_or_create(usuario=usuario, activo=True)
+    return carrito
+
+def sumar_renglones(carrito_id, campo, cantidades):
+    """
+    Suma {producto_id: cantidad} a los renglones del carrito con un solo
+    INSERT ... ON CONFLICT DO UPDATE (la misma sentencia en SQLite y
+    PostgreSQL). Devuelve {producto_id: cantidad_resultante}; si es igual a la
+    cantidad pedida el renglón es nuevo.
+    """
+    if not cantidades:
+        return {}
+    nombre = connection.ops.quote_name
+    tabla = nombre(ItemCarrito._meta.db_table)
+    columna = nombre(ItemCarrito._meta.get_field(campo).column)
+    carrito_col = nombre(ItemCarrito._meta.get_field('carrito').column)
+    cantidad_col = nombre('cantidad')
+    ahora = connection.ops.adapt_datetimefield_value(timezone.now())
+
+    valores = ', '.join(['(%s, %s, %s, %s)'] * len(cantidades))
+    parametros = []
+    for producto_id, cantidad in cantidades.items():
+        parametros += [carrito_id, producto_id, cantidad, ahora]
+    sql = (
+        f'INSERT INTO {tabla} ({carrito_col}, {columna}, {cantidad_col}, {nombre("fecha_agregado")}) '
+        f'VALUES {valores} '
+        f'ON CONFLICT ({carrito_col}, {columna}) '
+        f'DO UPDATE SET {cantidad_col} = {tabla}.{cantidad_col} + excluded.{cantidad_col} '
+        f'RETURNING {columna}, {cantidad_col}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, parametros)
+        return dict(cursor.fetchall())
+
+def agregar_item(usuario, campo, producto_id, cantidad):
+    """
+    Agrega 'cantidad' del producto al carrito activo del usuario, reserva el
+    stock y ajusta los totales guardados. Devuelve la cantidad resultante del
+    renglón; con StockInsuficiente no queda nada agregado.
+    """
+    carrito = carrito_activo(usuario)
+    with transaction.atomic():
+        resultante = sumar_renglones(carrito.id, campo, {producto_id: cantidad})[producto_id]
+        reservas.reservar(carrito.id, campo, producto_id, resultante)
+        anterior = None
+        if resultante != cantidad:
+            anterior = (carrito.id, *_ids_producto(campo, producto_id), resultante - cantidad)
+        ajustar_totales(anterior, (carrito.id, *_ids_producto(campo, producto_id), resultante))
+    invalidar_resumen(usuario.id)
+    return resultante
+
+def actualizar_renglones(usuario, cambios):
+    """
+    Aplica {item_id: cantidad} al carrito activo del usuario en una sola
+    transacción: un DELETE ... IN para las cantidades <= 0, un bulk_update
+    para el resto y un UPDATE para los totales; las reservas de stock siguen
+    a las cantidades nuevas. Los ids que no pertenecen al carrito se ignoran.
+    Devuelve (renglones_restantes, ids_eliminados); con StockInsuficiente no
+    se aplica ningún cambio.
+    """
+    with transaction.atomic():
+        items = list(
+            ItemCarrito.objects
+            .filter(carrito__usuario=usuario, carrito__activo=True, id__in=cambios)
+            .select_related('alimento', 'accesorio')
+        )
+        eliminados = [item.id for item in items if cambios[item.id] <= 0]
+        restantes = [item for item in items if cambios[item.id] > 0]
+        modificados = [item for item in restantes if item.cantidad != cambios[item.id]]
+        for item in modificados:
+            item.cantidad = cambios[item.id]
+            reservas.reservar(item.carrito_id, *_producto_de_item(item), item.cantidad)
+
+        if eliminados:
+            reservas.liberar(ReservaStock.objects.filter(
+                _filtro_reservas([item for item in items if item.id in eliminados]),
+                carrito_id=items[0].carrito_id,
+            ))
+            ItemCarrito.objects.filter(id__in=eliminados).delete()
+        if modificados:
+            ItemCarrito.objects.bulk_update(modificados, ['cantidad'])
+        if eliminados or modificados:
+            recalcular_totales(items[0].carrito_id)
+    if eliminados or modificados:
+        invalidar_resumen(usuario.id)
+    return restantes, eliminados
+
+
+# ==========================================
+# CARRITO DE INVITADOS (COOKIE FIRMADA)
+# ==========================================
+def leer_carrito_invitado(request):
+    """Contenido de la cookie como {(tipo_producto, producto_id): cantidad}; {} si falta o es inválida"""
+    valor = request.get_signed_cookie(COOKIE_INVITADO, default='', salt=SAL_INVITADO)
+    contenido = {}
+    for parte in valor.split(',')[:MAX_RENGLONES_INVITADO]:
+        llave, _, cantidad = parte.partition(':')
+        campo = PREFIJOS_INVITADO.get(llave[:1])
+        if not campo or not llave[1:].isdigit() or not cantidad.isdigit():
+            continue
+        cantidad = min(int(cantidad), MAX_CANTIDAD_INVITADO)
+        if cantidad > 0:
+            contenido[(campo, int(llave[1:]))] = cantidad
+    return contenido
+
+def guardar_carrito_invitado(respuesta, contenido):
+    """Escribe el contenido en la cookie firmada (o la borra si quedó vacío)"""
+    if not contenido:
+        respuesta.delete_cookie(COOKIE_INVITADO)
+        return respuesta
+    prefijos = {campo: prefijo for prefijo, campo in PREFIJOS_INVITADO.items()}
+    valor = ','.join(
+        f'{prefijos[campo]}{producto_id}:{cantidad}'
+        for (campo, producto_id), cantidad in list(contenido.items())[:MAX_RENGLONES_INVITADO]
+    )
+    respuesta.set_signed_cookie(
+        COOKIE_INVITADO, valor, salt=SAL_INVITADO, httponly=True, samesite='Lax',
+        max_age=getattr(settings, 'CARRITO_INVITADO_DIAS', 30) * 24 * 60 * 60,
+    )
+    return respuesta
+
+def id_item_invitado(campo, producto_id):
+    """Id entero estable para los formularios del carrito de un invitado"""
+    return producto_id * len(CODIGOS_INVITADO) + CODIGOS_INVITADO[campo]
+
+def llave_item_invitado(item_id):
+    """Inverso de id_item_invitado()"""
+    producto_id, codigo = divmod(int(item_id), len(CODIGOS_INVITADO))
+    campo = next(campo for campo, valor in CODIGOS_INVITADO.items() if valor == codigo)
+    return campo, producto_id
+
+def items_invitado(contenido):
+    """
+    ItemCarrito sin guardar para mostrar el carrito de un invitado, con una
+    consulta por tipo de producto. Los productos inactivos o eliminados se omiten.
+    """
+    productos = {}
+    for campo, modelo in MODELOS_ITEM.items():
+        ids = [producto_id for (tipo, producto_id) in contenido if tipo == campo]
+        if ids:
+            productos.update(((campo, objeto.id), objeto) for objeto in modelo.objects.filter(id__in=ids, activo=True))
+    items = []
+    for (campo, producto_id), cantidad in contenido.items():
+        producto = productos.get((campo, producto_id))
+        if producto is not None:
+            items.append(ItemCarrito(
+                id=id_item_invitado(campo, producto_id), cantidad=cantidad, **{campo: producto}
+            ))
+    return items
+
+def _reservar_hasta(carrito_id, campo, producto_id, cantidad):
+    """Reserva 'cantidad' o, si no alcanza, lo disponible y recorta el renglón"""
+    try:
+        reservas.reservar(carrito_id, campo, producto_id, cantidad)
+    except reservas.StockInsuficiente as error:
+        reservas.reservar(carrito_id, campo, producto_id, error.disponible)
+        renglones = ItemCarrito.objects.filter(carrito_id=carrito_id, **{campo: producto_id})
+        if error.disponible > 0:
+            renglones.update(cantidad=error.disponible)
+        else:
+            renglones.delete()
+
+def fusionar_carrito_invitado(usuario, contenido):
+    """
+    Pasa el carrito del invitado al Carrito activo del usuario con un
+    INSERT ... ON CONFLICT por tipo de producto: los renglones que ya existen
+    suman la cantidad y los nuevos se insertan. Los renglones que no alcanzan
+    el stock se recortan a lo disponible y los que ya no se pueden reservar
+    (producto desactivado mientras tanto) se quitan. Devuelve cuántos
+    renglones se fusionaron.
+    """
+    if not contenido:
+        return 0
+    carrito = carrito_activo(usuario)
+    fusionados = 0
+    with transaction.atomic():
+        for campo, modelo in MODELOS_ITEM.items():
+            pedidos = {producto_id: cantidad for (tipo, producto_id), cantidad in contenido.items() if tipo == campo}
+            if not pedidos:
+                continue
+            validos = modelo.objects.filter(id__in=pedidos, activo=True).values_list('id', flat=True)
+            resultantes = sumar_renglones(carrito.id, campo, {producto_id: pedidos[producto_id] for producto_id in validos})
+            for producto_id, cantidad in resultantes.items():
+                try:
+                    _reservar_hasta(carrito.id, campo, producto_id, cantidad)
+                except reservas.StockInsuficiente:
+                    # No debe fallar el login: el renglón se quita con su reserva
+                    reservas.reservar(carrito.id, campo, producto_id, 0)
+                    ItemCarrito.objects.filter(carrito_id=carrito.id, **{campo: producto_id}).delete()
+            fusionados += len(resultantes)
+        if fusionados:
+            recalcular_totales(carrito.id)
+    invalidar_resumen(usuario.id)
+    return fusionados
+
+
+# ==========================================
+# LIMPIEZA DE CARRITOS VIEJOS
+# ==========================================
+def carritos_viejos(dias_inactivos=None, dias_abandonados=None):
+    """
+    Carritos inactivos (ya convertidos en pedido) sin cambios en
+    'dias_inactivos' y carritos activos sin cambios en 'dias_abandonados'.
+    """
+    if dias_inactivos is None:
+        dias_inactivos = getattr(settings, 'CARRITO_INACTIVO_DIAS', 30)
+    if dias_abandonados is None:
+        dias_abandonados = getattr(settings, 'CARRITO_ABANDONADO_DIAS', 90)
+    ahora = timezone.now()
+    return Carrito.objects.filter(
+        Q(activo=False, fecha_actualizacion__lt=ahora - timedelta(days=dias_inactivos))
+        | Q(activo=True, fecha_actualizacion__lt=ahora - timedelta(days=dias_abandonados))
+    )
+
+def _archivar(carritos):
+    """
+    Copia los carritos (dicts de .values()) y sus renglones a CarritoArchivado.
+    Sin ignore_conflicts: si un id ya está archivado el INSERT falla y el
+    lote se revierte antes de borrar los originales.
+    """
+    renglones = {}
+    for fila in (
+        ItemCarrito.objects.filter(carrito_id__in=[carrito['id'] for carrito in carritos])
+        .values('carrito_id', 'alimento_id', 'accesorio_id', 'cantidad').order_by('id')
+    ):
+        renglones.setdefault(fila.pop('carrito_id'), []).append(fila)
+    CarritoArchivado.objects.bulk_create(
+        [CarritoArchivado(items=renglones.get(carrito['id'], []), **carrito) for carrito in carritos],
+    )
+
+def limpiar_carritos(queryset, tamano_lote=1000, archivar=False, simular=False):
+    """
+    Elimina (o archiva y elimina) los carritos del queryset recorriendo la
+    tabla por rangos de id de 'tamano_lote'. Cada rango es una transacción
+    corta, así la tabla nunca queda bloqueada mucho tiempo. Genera un dict
+    por lote con el rango, los carritos y renglones eliminados y la duración.
+    """
+    limites = Carrito.objects.aggregate(minimo=Min('id'), maximo=Max('id'))
+    if limites['minimo'] is None:
+        return
+    campos = ('id', 'usuario_id', 'fecha_creacion', 'fecha_actualizacion', 'activo', 'num_items', 'subtotal')
+
+    for desde in range(limites['minimo'], limites['maximo'] + 1, tamano_lote):
+        hasta = desde + tamano_lote
+        inicio = time.monotonic()
+        with transaction.atomic():
+            carritos = list(queryset.filter(id__gte=desde, id__lt=hasta).select_for_update().values(*campos))
+            if not carritos:
+                continue
+            ids = [carrito['id'] for carrito in carritos]
+            if simular:
+                renglones = ItemCarrito.objects.filter(carrito_id__in=ids).count()
+            else:
+                reservas.liberar(ReservaStock.objects.filter(carrito_id__in=ids))
+                if archivar:
+                    _archivar(carritos)
+                renglones = ItemCarrito.objects.filter(carrito_id__in=ids).delete()[0]
+                Carrito.objects.filter(id__in=ids).delete()
+        activos = {carrito['usuario_id'] for carrito in carritos if carrito['activo']}
+        if activos and not simular:
+            invalidar_resumen(*activos)
+        yield {
+            'desde': desde,
+            'hasta': hasta - 1,
+            'carritos': len(ids),
+            'renglones': renglones,
+            'segundos': time.monotonic() - inicio,
+        }
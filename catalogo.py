@@ -0,0 +1,103 @@
+# app_mascotas/catalogo.py
+"""
+Mantenimiento y consultas del modelo de lectura ProductoCatalogo.
+
+Cada alimento, accesorio y mascota tiene una fila en ProductoCatalogo con los
+datos que necesitan las tarjetas de la tienda. Las señales la actualizan en
+cada escritura y reconstruir_catalogo() la rehace en bloque.
+"""
+from django.db.models import Q
+from django.utils import timezone
+
+from .busqueda import esta_publicado, tipo_de
+from .models import Alimento, Accesorio, Mascota, ProductoCatalogo
+
+MODELOS_CATALOGO = {'alimento': Alimento, 'accesorio': Accesorio, 'mascota': Mascota}
+LARGO_DESCRIPCION = 200
+
+
+# ==========================================
+# MANTENIMIENTO
+# ==========================================
+def fila_de(instancia):
+    """Valores de la fila de catálogo de un producto"""
+    tipo_producto = tipo_de(instancia)
+    es_mascota = tipo_producto == 'mascota'
+    return {
+        'nombre': instancia.nombre,
+        'descripcion': (instancia.descripcion or '')[:LARGO_DESCRIPCION],
+        'precio': instancia.precio,
+        'precio_original': None if es_mascota else instancia.precio_original,
+        # Cada mascota es única: hay una si está disponible
+        'stock': int(esta_publicado(instancia)) if es_mascota else instancia.stock,
+        'imagen': instancia.imagen.name if instancia.imagen else None,
+        'categoria_id': None if es_mascota else instancia.categoria_id,
+        'tipo_id': instancia.tipo_id,
+        'activo': esta_publicado(instancia),
+        'destacado': False if es_mascota else instancia.destacado,
+        'fecha_creacion': instancia.fecha_creacion,
+    }
+
+def sincronizar(instancia):
+    """Crea o actualiza la fila de catálogo del producto"""
+    ProductoCatalogo.objects.update_or_create(
+        tipo_producto=tipo_de(instancia),
+        producto_id=instancia.id,
+        defaults=fila_de(instancia),
+    )
+
+def eliminar(instancia):
+    ProductoCatalogo.objects.filter(tipo_producto=tipo_de(instancia), producto_id=instancia.id).delete()
+
+def marcar_modificados(**filtros):
+    """Actualiza fecha_actualizacion de las filas que cumplen los filtros (un UPDATE)"""
+    return ProductoCatalogo.objects.filter(**filtros).update(fecha_actualizacion=timezone.now())
+
+def reconstruir_catalogo(tamano_lote=1000):
+    """Vacía el catálogo y lo vuelve a llenar con bulk_create por lotes"""
+    ProductoCatalogo.objects.all().delete()
+    totales = {}
+    for tipo_producto, modelo in MODELOS_CATALOGO.items():
+        lote = []
+        totales[tipo_producto] = 0
+        for instancia in modelo.objects.order_by('id').iterator(chunk_size=tamano_lote):
+            lote.append(ProductoCatalogo(
+                tipo_producto=tipo_producto, producto_id=instancia.id,
+                stock_reservado=getattr(instancia, 'stock_reservado', 0), **fila_de(instancia)
+            ))
+            if len(lote) >= tamano_lote:
+                ProductoCatalogo.objects.bulk_create(lote)
+                totales[tipo_producto] += len(lote)
+                lote = []
+        if lote:
+            ProductoCatalogo.objects.bulk_create(lote)
+            totales[tipo_producto] += len(lote)
+    return totales
+
+
+# ==========================================
+# CONSULTAS
+# ==========================================
+def productos_publicados():
+    """Queryset base de los listados mixtos de la tienda"""
+    return ProductoCatalogo.objects.filter(activo=True).select_related('categoria', 'tipo')
+
+def cargar(pares):
+    """
+    Carga con una sola consulta las filas de catálogo de una lista de
+    (tipo_producto, producto_id) y las devuelve en el mismo orden.
+    """
+    ids_por_tipo = {}
+    for tipo_producto, producto_id in pares:
+        ids_por_tipo.setdefault(tipo_producto, []).append(producto_id)
+    if not ids_por_tipo:
+        return []
+
+    filtro = Q()
+    for tipo_producto, ids in ids_por_tipo.items():
+        filtro |= Q(tipo_producto=tipo_producto, producto_id__in=ids)
+    filas = {
+        (fila.tipo_producto, fila.producto_id): fila
+        for fila in productos_publicados().filter(filtro)
+    }
+    return [filas[par] for par in pares if par in filas]
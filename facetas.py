@@ -0,0 +1,155 @@
+# app_mascotas/facetas.py
+"""
+Facetas del catálogo: cuántos productos y qué rango de precios hay por
+(tipo de producto, categoría, tipo, activo).
+
+La tabla FacetaCatalogo se mantiene de forma incremental desde las señales
+de Alimento y Accesorio, así las barras de filtros leen unas cuantas filas
+en lugar de hacer DISTINCT sobre todo el catálogo en cada página.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, Min, Max, F
+from django.db.models.functions import Least, Greatest
+
+from .models import Alimento, Accesorio, FacetaCatalogo
+
+MODELOS_FACETA = {'alimento': Alimento, 'accesorio': Accesorio}
+CAMPOS_ESTADO = ('categoria_id', 'tipo_id', 'activo', 'precio')
+
+
+# ==========================================
+# MANTENIMIENTO INCREMENTAL
+# ==========================================
+def tipo_producto_de(instancia):
+    for tipo_producto, modelo in MODELOS_FACETA.items():
+        if isinstance(instancia, modelo):
+            return tipo_producto
+    return None
+
+def estado_de(instancia):
+    """Valores de la instancia que afectan a las facetas"""
+    estado = {campo: getattr(instancia, campo) for campo in CAMPOS_ESTADO}
+    estado['precio'] = Decimal(str(estado['precio']))
+    return estado
+
+def _grupo(tipo_producto, estado):
+    return {
+        'tipo_producto': tipo_producto,
+        'categoria_id': estado['categoria_id'],
+        'tipo_id': estado['tipo_id'],
+        'activo': estado['activo'],
+    }
+
+def recalcular_grupo(tipo_producto, categoria_id, tipo_id, activo):
+    """Recalcula una faceta desde la tabla de productos (un agregado por índice)"""
+    resumen = MODELOS_FACETA[tipo_producto].objects.filter(
+        categoria_id=categoria_id, tipo_id=tipo_id, activo=activo
+    ).aggregate(cantidad=Count('id'), precio_min=Min('precio'), precio_max=Max('precio'))
+
+    grupo = {
+        'tipo_producto': tipo_producto,
+        'categoria_id': categoria_id,
+        'tipo_id': tipo_id,
+        'activo': activo,
+    }
+    if resumen['cantidad']:
+        FacetaCatalogo.objects.update_or_create(defaults=resumen, **grupo)
+    else:
+        FacetaCatalogo.objects.filter(**grupo).delete()
+
+def _agregar(tipo_producto, estado):
+    """Suma un producto a su grupo ampliando el rango de precios si hace falta"""
+    grupo = _grupo(tipo_producto, estado)
+    precio = estado['precio']
+    actualizadas = FacetaCatalogo.objects.filter(**grupo).update(
+        cantidad=F('cantidad') + 1,
+        precio_min=Least('precio_min', precio),
+        precio_max=Greatest('precio_max', precio),
+    )
+    if not actualizadas:
+        recalcular_grupo(**grupo)
+
+def _quitar(tipo_producto, estado):
+    """Resta un producto de su grupo; si era el extremo del rango se recalcula"""
+    grupo = _grupo(tipo_producto, estado)
+    faceta = FacetaCatalogo.objects.filter(**grupo).first()
+    if faceta is None:
+        return
+    if faceta.cantidad <= 1 or estado['precio'] in (faceta.precio_min, faceta.precio_max):
+        recalcular_grupo(**grupo)
+    else:
+        FacetaCatalogo.objects.filter(pk=faceta.pk).update(cantidad=F('cantidad') - 1)
+
+def producto_guardado(instancia, estado_anterior=None):
+    """Aplica a las facetas el alta o el cambio de un producto"""
+    tipo_producto = tipo_producto_de(instancia)
+    estado = estado_de(instancia)
+    if estado_anterior is None:
+        _agregar(tipo_producto, estado)
+        return
+    if estado_anterior == estado:
+        return
+    if _grupo(tipo_producto, estado_anterior) == _grupo(tipo_producto, estado):
+        # Mismo grupo, solo cambió el precio
+        faceta = FacetaCatalogo.objects.filter(**_grupo(tipo_producto, estado)).first()
+        if faceta and estado_anterior['precio'] not in (faceta.precio_min, faceta.precio_max):
+            FacetaCatalogo.objects.filter(pk=faceta.pk).update(
+                precio_min=Least('precio_min', estado['precio']),
+                precio_max=Greatest('precio_max', estado['precio']),
+            )
+        else:
+            recalcular_grupo(**_grupo(tipo_producto, estado))
+        return
+    _quitar(tipo_producto, estado_anterior)
+    _agregar(tipo_producto, estado)
+
+def producto_eliminado(instancia):
+    _quitar(tipo_producto_de(instancia), estado_de(instancia))
+
+def reconstruir_facetas():
+    """Vacía y vuelve a calcular todas las facetas con un GROUP BY por modelo"""
+    FacetaCatalogo.objects.all().delete()
+    facetas = []
+    for tipo_producto, modelo in MODELOS_FACETA.items():
+        grupos = (
+            modelo.objects.order_by()
+            .values('categoria_id', 'tipo_id', 'activo')
+            .annotate(cantidad=Count('id'), precio_min=Min('precio'), precio_max=Max('precio'))
+        )
+        facetas.extend(FacetaCatalogo(tipo_producto=tipo_producto, **grupo) for grupo in grupos)
+    FacetaCatalogo.objects.bulk_create(facetas, batch_size=500)
+    return len(facetas)
+
+
+# ==========================================
+# CONSULTAS
+# ==========================================
+def facetas_de(tipo_producto):
+    """
+    Categorías y tipos con productos activos para la barra de filtros, cada uno
+    con su atributo 'total', más el rango global de precios. Una sola consulta.
+    """
+    filas = (
+        FacetaCatalogo.objects
+        .filter(tipo_producto=tipo_producto, activo=True, cantidad__gt=0)
+        .select_related('categoria', 'tipo')
+    )
+
+    categorias, tipos = {}, {}
+    precio_min = precio_max = None
+    for faceta in filas:
+        for registro, objeto in ((categorias, faceta.categoria), (tipos, faceta.tipo)):
+            objeto = registro.setdefault(objeto.id, objeto)
+            objeto.total = getattr(objeto, 'total', 0) + faceta.cantidad
+        if precio_min is None or faceta.precio_min < precio_min:
+            precio_min = faceta.precio_min
+        if precio_max is None or faceta.precio_max > precio_max:
+            precio_max = faceta.precio_max
+
+    return {
+        'categorias': sorted(categorias.values(), key=lambda categoria: categoria.nombre),
+        'tipos': sorted(tipos.values(), key=lambda tipo: tipo.nombre),
+        'precio_min': precio_min,
+        'precio_max': precio_max,
+    }
@@ -1,9 +1,12 @@
 # app_mascotas/forms.py
+import datetime
+
 from django import forms
+from django.utils import timezone
 from django.contrib.auth.forms import UserCreationForm
 from .models import (
     Usuario, Categoria, Tipo, Alimento, 
-    Accesorio, Mascota, Pedido, Venta
+    Accesorio, Mascota, Pedido, Venta, ResumenVentas
 )
 
 # ==========================================
@@ -246,4 +249,80 @@ class FiltroAlimentosForm(forms.Form):
             if field_name != 'destacados':
                 field.widget.attrs['class'] = 'form-control'
             else:
-                field.widget.attrs['class'] = 'form-check-input'
\ No newline at end of file
+                field.widget.attrs['class'] = 'form-check-input'
+
+    def filtrar(self, queryset):
+        """Aplica en SQL los filtros válidos sobre un queryset de alimentos o accesorios"""
+        if not self.is_bound:
+            return queryset
+        self.is_valid()
+        datos = self.cleaned_data
+
+        if datos.get('categoria'):
+            queryset = queryset.filter(categoria=datos['categoria'])
+        if datos.get('tipo'):
+            queryset = queryset.filter(tipo=datos['tipo'])
+        if datos.get('min_precio') is not None:
+            queryset = queryset.filter(precio__gte=datos['min_precio'])
+        if datos.get('max_precio') is not None:
+            queryset = queryset.filter(precio__lte=datos['max_precio'])
+        if datos.get('destacados'):
+            queryset = queryset.filter(destacado=True)
+        return queryset
+
+class FiltroPedidosForm(forms.Form):
+    """Filtros del historial de pedidos del cliente (mis_pedidos)"""
+    desde = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    hasta = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    estado = forms.ChoiceField(
+        required=False,
+        choices=[('', 'Todos los estados')] + Pedido.ESTADO_CHOICES
+    )
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field in self.fields.values():
+            field.widget.attrs['class'] = 'form-control'
+
+    def filtrar(self, queryset):
+        """
+        Aplica los filtros como rangos sobre fecha_pedido (no fecha_pedido__date)
+        para que los resuelva el índice (usuario, fecha_pedido).
+        """
+        if not self.is_bound:
+            return queryset
+        self.is_valid()
+        datos = self.cleaned_data
+
+        if datos.get('desde'):
+            inicio = datetime.datetime.combine(datos['desde'], datetime.time.min)
+            queryset = queryset.filter(fecha_pedido__gte=timezone.make_aware(inicio))
+        if datos.get('hasta'):
+            fin = datetime.datetime.combine(datos['hasta'] + datetime.timedelta(days=1), datetime.time.min)
+            queryset = queryset.filter(fecha_pedido__lt=timezone.make_aware(fin))
+        if datos.get('estado'):
+            queryset = queryset.filter(estado=datos['estado'])
+        return queryset
+
+class FiltroReportesForm(forms.Form):
+    """Rango, agrupación y desglose de la página de reportes"""
+    desde = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    hasta = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    periodo = forms.ChoiceField(required=False, choices=ResumenVentas.PERIODO_CHOICES, initial='mes')
+    dimension = forms.ChoiceField(
+        required=False,
+        choices=[opcion for opcion in ResumenVentas.DIMENSION_CHOICES if opcion[0] != 'total'],
+        initial='producto',
+    )
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field in self.fields.values():
+            field.widget.attrs['class'] = 'form-control'
+
+    def valores(self):
+        """(periodo, dimension, desde, hasta); por omisión los últimos 12 meses agrupados por mes"""
+        datos = self.cleaned_data if self.is_bound and self.is_valid() else {}
+        hasta = datos.get('hasta') or timezone.localdate()
+        desde = datos.get('desde') or (hasta.replace(day=1) - datetime.timedelta(days=335)).replace(day=1)
+        return datos.get('periodo') or 'mes', datos.get('dimension') or 'producto', min(desde, hasta), hasta
\ No newline at end of file
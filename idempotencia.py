@@ -0,0 +1,149 @@
+# app_mascotas/idempotencia.py
+"""
+Claves de idempotencia para las vistas POST que crean cosas (checkout, pago).
+
+El cliente manda una clave por intento de operación: el encabezado
+Idempotency-Key o el campo oculto 'clave_idempotencia' que la plantilla
+renderiza con nueva_clave(). La primera petición con esa clave guarda una
+fila 'en_proceso', ejecuta la vista y guarda su respuesta; los reintentos y
+los dobles envíos cuestan una sola consulta por el índice único
+(usuario, alcance, clave) y reciben la misma respuesta sin volver a ejecutar
+la vista. Si la primera todavía se está procesando, el reintento espera un
+poco a que termine y, si no, responde 409.
+
+Las claves vencen a los IDEMPOTENCIA_TTL segundos; el comando
+purgar_idempotencia las borra por lotes.
+"""
+import time
+import uuid
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, HttpResponseBadRequest
+from django.utils import timezone
+
+from .models import ClaveIdempotencia
+
+ENCABEZADO = 'Idempotency-Key'
+CAMPO_FORMULARIO = 'clave_idempotencia'
+LARGO_MAXIMO = 64
+MAX_CUERPO_GUARDADO = 64 * 1024
+
+
+def nueva_clave():
+    """Clave para el campo oculto del formulario; una por cada vez que se muestra"""
+    return uuid.uuid4().hex
+
+def clave_de(request):
+    return (request.headers.get(ENCABEZADO) or request.POST.get(CAMPO_FORMULARIO) or '').strip()
+
+
+# ==========================================
+# RESPUESTAS GUARDADAS
+# ==========================================
+def _guardable(respuesta):
+    """Redirecciones y respuestas completas pequeñas; los errores 5xx no se guardan"""
+    return (
+        respuesta.status_code < 500
+        and not respuesta.streaming
+        and len(respuesta.content) <= MAX_CUERPO_GUARDADO
+    )
+
+def _repetir(registro):
+    respuesta = HttpResponse(
+        registro.cuerpo, status=registro.codigo_estado, content_type=registro.tipo_contenido or None
+    )
+    if registro.ubicacion:
+        respuesta['Location'] = registro.ubicacion
+    respuesta['Idempotent-Replayed'] = 'true'
+    return respuesta
+
+def _en_proceso():
+    respuesta = HttpResponse('La solicitud anterior con esta clave todavía se está procesando', status=409)
+    respuesta['Retry-After'] = '1'
+    return respuesta
+
+def _esperar(filtro):
+    """Relee la clave hasta que la primera petición termine o se acabe la espera"""
+    limite = time.monotonic() + getattr(settings, 'IDEMPOTENCIA_ESPERA', 5.0)
+    while time.monotonic() < limite:
+        time.sleep(0.2)
+        registro = ClaveIdempotencia.objects.filter(**filtro).first()
+        if registro is None:
+            return None
+        if registro.estado == 'completada':
+            return _repetir(registro)
+    return _en_proceso()
+
+
+# ==========================================
+# DECORADOR
+# ==========================================
+def idempotente(alcance):
+    """
+    Hace idempotente una vista POST de usuarios autenticados. Sin clave, o
+    con GET, la vista se ejecuta como siempre.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            clave = clave_de(request) if request.method == 'POST' else ''
+            if not clave or not request.user.is_authenticated:
+                return vista(request, *args, **kwargs)
+            if len(clave) > LARGO_MAXIMO:
+                return HttpResponseBadRequest(f'{ENCABEZADO} admite hasta {LARGO_MAXIMO} caracteres')
+
+            filtro = {'usuario_id': request.user.id, 'alcance': alcance, 'clave': clave}
+            ahora = timezone.now()
+            registro = ClaveIdempotencia.objects.filter(**filtro).first()
+            if registro is not None and registro.expira > ahora:
+                if registro.estado == 'completada':
+                    return _repetir(registro)
+                return _esperar(filtro) or _en_proceso()
+            if registro is not None:
+                registro.delete()
+
+            try:
+                with transaction.atomic():
+                    registro = ClaveIdempotencia.objects.create(
+                        expira=ahora + timedelta(seconds=getattr(settings, 'IDEMPOTENCIA_TTL', 86400)), **filtro
+                    )
+            except IntegrityError:
+                # Otra petición con la misma clave entró entre la lectura y el INSERT
+                return _esperar(filtro) or _en_proceso()
+
+            try:
+                respuesta = vista(request, *args, **kwargs)
+            except Exception:
+                registro.delete()
+                raise
+            if not _guardable(respuesta):
+                registro.delete()
+                return respuesta
+            ClaveIdempotencia.objects.filter(id=registro.id).update(
+                estado='completada',
+                codigo_estado=respuesta.status_code,
+                tipo_contenido=respuesta.get('Content-Type', ''),
+                ubicacion=respuesta.get('Location', ''),
+                cuerpo=respuesta.content.decode(respuesta.charset or 'utf-8', errors='replace'),
+            )
+            return respuesta
+        return envoltura
+    return decorador
+
+
+# ==========================================
+# LIMPIEZA
+# ==========================================
+def purgar_vencidas(tamano_lote=1000):
+    """Borra las claves vencidas en lotes de 'tamano_lote' (una transacción corta cada uno); genera cuántas borró"""
+    while True:
+        ids = list(
+            ClaveIdempotencia.objects.filter(expira__lte=timezone.now())
+            .order_by('expira').values_list('id', flat=True)[:tamano_lote]
+        )
+        if not ids:
+            return
+        yield ClaveIdempotencia.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,37 @@
+# app_mascotas/management/commands/actualizar_resumenes.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_mascotas import reportes_ventas
+
+
+class Command(BaseCommand):
+    help = 'Suma las ventas nuevas (desde la última marca) a los resúmenes diarios y mensuales de la página de reportes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=1000,
+            help='Ventas que se procesan en cada transacción (default: 1000)'
+        )
+        parser.add_argument(
+            '--reconstruir', action='store_true',
+            help='Borra los resúmenes y los recalcula desde cero, incluidas las ventas archivadas'
+        )
+
+    def handle(self, *args, **options):
+        if options['reconstruir']:
+            lotes = reportes_ventas.reconstruir(options['lote'])
+        else:
+            lotes = reportes_ventas.actualizar(options['lote'])
+
+        inicio = time.monotonic()
+        total = 0
+        for lote in lotes:
+            total += lote['ventas']
+            marca = f"hasta {lote['marca']:%Y-%m-%d %H:%M:%S}" if lote['marca'] else 'archivadas'
+            self.stdout.write(f"{lote['ventas']} ventas ({marca}) en {lote['segundos']:.3f}s")
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Ventas procesadas: {total} en {time.monotonic() - inicio:.2f}s'
+        ))
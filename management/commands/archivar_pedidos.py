@@ -0,0 +1,52 @@
+# app_mascotas/management/commands/archivar_pedidos.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_mascotas import archivo_pedidos
+
+
+class Command(BaseCommand):
+    help = 'Mueve por lotes los pedidos entregados y cancelados más viejos que el plazo configurado a las tablas de archivo'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses', type=int, default=None,
+            help='Antigüedad mínima de los pedidos a archivar (default: PEDIDOS_ARCHIVAR_MESES)'
+        )
+        parser.add_argument(
+            '--lote', type=int, default=500,
+            help='Pedidos que se mueven en cada transacción (default: 500)'
+        )
+        parser.add_argument(
+            '--pausa', type=float, default=0.0,
+            help='Segundos de espera entre lotes para no acaparar la base de datos (default: 0)'
+        )
+        parser.add_argument(
+            '--simular', action='store_true',
+            help='Solo cuenta lo que se archivaría, sin modificar nada'
+        )
+
+    def handle(self, *args, **options):
+        lotes = archivo_pedidos.archivar_pedidos(
+            archivo_pedidos.pedidos_archivables(options['meses']),
+            tamano_lote=options['lote'], simular=options['simular'],
+        )
+
+        inicio = time.monotonic()
+        total_pedidos = total_renglones = 0
+        for lote in lotes:
+            total_pedidos += lote['pedidos']
+            total_renglones += lote['renglones']
+            self.stdout.write(
+                f"Ids {lote['desde']}-{lote['hasta']}: {lote['pedidos']} pedidos, "
+                f"{lote['renglones']} renglones en {lote['segundos']:.3f}s"
+            )
+            if options['pausa']:
+                time.sleep(options['pausa'])
+
+        accion = 'por archivar' if options['simular'] else 'archivados'
+        self.stdout.write(self.style.SUCCESS(
+            f'Pedidos {accion}: {total_pedidos} ({total_renglones} renglones) '
+            f'en {time.monotonic() - inicio:.2f}s'
+        ))
@@ -0,0 +1,26 @@
+# app_mascotas/management/commands/calcular_relacionados.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app_mascotas import relacionados
+
+
+class Command(BaseCommand):
+    help = 'Recalcula en lote los productos relacionados de todo el catálogo publicado'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=1000,
+            help='Cantidad de filas que se insertan por lote (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        with transaction.atomic():
+            total = relacionados.recalcular_todos(tamano_lote=options['lote'])
+        duracion = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'Relacionados calculados para {total} productos en {duracion:.2f}s'
+        ))
@@ -0,0 +1,42 @@
+# app_mascotas/management/commands/liberar_reservas.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_mascotas import reservas
+
+
+class Command(BaseCommand):
+    help = 'Libera por lotes las reservas de stock vencidas de los carritos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=1000,
+            help='Cantidad de reservas que se liberan por transacción (default: 1000)'
+        )
+        parser.add_argument(
+            '--pausa', type=float, default=0.0,
+            help='Segundos de espera entre lotes (default: 0)'
+        )
+        parser.add_argument(
+            '--reconciliar', action='store_true',
+            help='Además recalcula stock_reservado de los productos desde las reservas vigentes'
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        total = 0
+        for liberadas in reservas.liberar_vencidas(tamano_lote=options['lote']):
+            total += liberadas
+            self.stdout.write(f'Lote: {liberadas} reservas liberadas')
+            if options['pausa']:
+                time.sleep(options['pausa'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Reservas vencidas liberadas: {total} en {time.monotonic() - inicio:.2f}s'
+        ))
+
+        if options['reconciliar']:
+            corregidos = reservas.reconciliar_reservados()
+            for tipo_producto, cantidad in corregidos.items():
+                estilo = self.style.WARNING if cantidad else self.style.SUCCESS
+                self.stdout.write(estilo(f'{tipo_producto}: {cantidad} productos corregidos'))
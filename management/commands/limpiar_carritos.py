@@ -0,0 +1,60 @@
+# app_mascotas/management/commands/limpiar_carritos.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_mascotas import carrito
+
+
+class Command(BaseCommand):
+    help = 'Elimina (o archiva) por lotes los carritos inactivos y abandonados más viejos que el plazo configurado'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias-inactivos', type=int, default=None,
+            help='Antigüedad mínima de los carritos ya convertidos en pedido (default: CARRITO_INACTIVO_DIAS)'
+        )
+        parser.add_argument(
+            '--dias-abandonados', type=int, default=None,
+            help='Antigüedad mínima de los carritos activos sin cambios (default: CARRITO_ABANDONADO_DIAS)'
+        )
+        parser.add_argument(
+            '--lote', type=int, default=1000,
+            help='Tamaño del rango de ids que se procesa en cada transacción (default: 1000)'
+        )
+        parser.add_argument(
+            '--pausa', type=float, default=0.0,
+            help='Segundos de espera entre lotes para no acaparar la base de datos (default: 0)'
+        )
+        parser.add_argument(
+            '--archivar', action='store_true',
+            help='Guarda una copia de cada carrito en CarritoArchivado antes de eliminarlo'
+        )
+        parser.add_argument(
+            '--simular', action='store_true',
+            help='Solo cuenta lo que se eliminaría, sin modificar nada'
+        )
+
+    def handle(self, *args, **options):
+        queryset = carrito.carritos_viejos(options['dias_inactivos'], options['dias_abandonados'])
+        lotes = carrito.limpiar_carritos(
+            queryset, tamano_lote=options['lote'], archivar=options['archivar'], simular=options['simular'],
+        )
+
+        inicio = time.monotonic()
+        total_carritos = total_renglones = 0
+        for lote in lotes:
+            total_carritos += lote['carritos']
+            total_renglones += lote['renglones']
+            self.stdout.write(
+                f"Ids {lote['desde']}-{lote['hasta']}: {lote['carritos']} carritos, "
+                f"{lote['renglones']} renglones en {lote['segundos']:.3f}s"
+            )
+            if options['pausa']:
+                time.sleep(options['pausa'])
+
+        accion = 'por eliminar' if options['simular'] else ('archivados' if options['archivar'] else 'eliminados')
+        self.stdout.write(self.style.SUCCESS(
+            f'Carritos {accion}: {total_carritos} ({total_renglones} renglones) '
+            f'en {time.monotonic() - inicio:.2f}s'
+        ))
@@ -0,0 +1,32 @@
+# app_mascotas/management/commands/purgar_idempotencia.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_mascotas import idempotencia
+
+
+class Command(BaseCommand):
+    help = 'Borra por lotes las claves de idempotencia vencidas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=1000,
+            help='Cantidad de claves que se borran por transacción (default: 1000)'
+        )
+        parser.add_argument(
+            '--pausa', type=float, default=0.0,
+            help='Segundos de espera entre lotes (default: 0)'
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        total = 0
+        for borradas in idempotencia.purgar_vencidas(tamano_lote=options['lote']):
+            total += borradas
+            self.stdout.write(f'Lote: {borradas} claves borradas')
+            if options['pausa']:
+                time.sleep(options['pausa'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Claves de idempotencia vencidas borradas: {total} en {time.monotonic() - inicio:.2f}s'
+        ))
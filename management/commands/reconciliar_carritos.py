@@ -0,0 +1,37 @@
+# app_mascotas/management/commands/reconciliar_carritos.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app_mascotas import carrito
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los totales guardados de los carritos activos y reporta las diferencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--solo-reportar', action='store_true',
+            help='Muestra las diferencias sin corregirlas'
+        )
+        parser.add_argument(
+            '--lote', type=int, default=1000,
+            help='Cantidad de carritos que se leen y corrigen por lote (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        corregir = not options['solo_reportar']
+        with transaction.atomic():
+            diferencias = carrito.reconciliar_totales(corregir=corregir, tamano_lote=options['lote'])
+
+        for diferencia in diferencias:
+            self.stdout.write(
+                f"Carrito {diferencia['carrito_id']} (usuario {diferencia['usuario_id']}): "
+                f"items {diferencia['num_items']} -> {diferencia['items_real']}, "
+                f"subtotal {diferencia['subtotal']} -> {diferencia['subtotal_real']}"
+            )
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS('Todos los carritos activos están al día'))
+        elif corregir:
+            self.stdout.write(self.style.WARNING(f'Carritos corregidos: {len(diferencias)}'))
+        else:
+            self.stdout.write(self.style.WARNING(f'Carritos con diferencias: {len(diferencias)} (sin corregir)'))
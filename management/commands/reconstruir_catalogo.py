@@ -0,0 +1,29 @@
+# app_mascotas/management/commands/reconstruir_catalogo.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app_mascotas import catalogo
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye en bloque la tabla ProductoCatalogo a partir de alimentos, accesorios y mascotas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=1000,
+            help='Cantidad de filas que se insertan por lote (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        with transaction.atomic():
+            totales = catalogo.reconstruir_catalogo(tamano_lote=options['lote'])
+        duracion = time.monotonic() - inicio
+
+        for tipo_producto, total in totales.items():
+            self.stdout.write(f'  {tipo_producto}: {total} filas')
+        self.stdout.write(self.style.SUCCESS(
+            f'Catálogo reconstruido: {sum(totales.values())} filas en {duracion:.2f}s'
+        ))
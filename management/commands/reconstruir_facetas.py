@@ -0,0 +1,14 @@
+# app_mascotas/management/commands/reconstruir_facetas.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app_mascotas import facetas
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero la tabla de facetas del catálogo (conteos y rangos de precio)'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = facetas.reconstruir_facetas()
+        self.stdout.write(self.style.SUCCESS(f'Facetas reconstruidas: {total} grupos'))
@@ -0,0 +1,33 @@
+# app_mascotas/management/commands/reconstruir_indice_busqueda.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_mascotas import busqueda
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye en bloque el índice de búsqueda de texto completo del catálogo'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=1000,
+            help='Cantidad de productos que se escriben por lote (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        if not busqueda.indice_disponible():
+            self.stdout.write(self.style.WARNING(
+                'El índice FTS5 solo está disponible en SQLite; la búsqueda usa icontains.'
+            ))
+            return
+
+        inicio = time.monotonic()
+        totales = busqueda.reconstruir_indice(tamano_lote=options['lote'])
+        duracion = time.monotonic() - inicio
+
+        for tipo_producto, total in totales.items():
+            self.stdout.write(f'  {tipo_producto}: {total} documentos')
+        self.stdout.write(self.style.SUCCESS(
+            f'Índice reconstruido: {sum(totales.values())} documentos en {duracion:.2f}s'
+        ))
@@ -0,0 +1,14 @@
+# app_mascotas/management/commands/reconstruir_vocabulario.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app_mascotas import busqueda_difusa
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el vocabulario y el índice de trigramas de la búsqueda tolerante a errores'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = busqueda_difusa.reconstruir_vocabulario()
+        self.stdout.write(self.style.SUCCESS(f'Vocabulario reconstruido: {total} palabras'))
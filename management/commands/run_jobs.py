@@ -0,0 +1,76 @@
+# app_mascotas/management/commands/run_jobs.py
+import os
+import socket
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from app_mascotas import trabajos
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta los trabajos en segundo plano de la cola (tabla Trabajo) con reintentos y espera exponencial'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hilos', type=int, default=1,
+            help='Cantidad de workers en paralelo, cada uno con su conexión (default: 1)'
+        )
+        parser.add_argument(
+            '--lote', type=int, default=10,
+            help='Trabajos que toma cada worker por vez (default: 10)'
+        )
+        parser.add_argument(
+            '--intervalo', type=float, default=1.0,
+            help='Segundos de espera cuando no hay trabajos listos (default: 1)'
+        )
+        parser.add_argument(
+            '--una-vez', action='store_true',
+            help='Termina cuando ya no quedan trabajos listos en lugar de seguir esperando'
+        )
+
+    def handle(self, *args, **options):
+        purgados = trabajos.purgar_completados()
+        if purgados:
+            self.stdout.write(f'Trabajos completados purgados: {purgados}')
+
+        detener = threading.Event()
+        contadores = {'completados': 0, 'fallidos': 0}
+        candado = threading.Lock()
+        prefijo = f'{socket.gethostname()}:{os.getpid()}'
+
+        def worker(numero):
+            try:
+                ciclo = trabajos.trabajar(
+                    f'{prefijo}:{numero}', tamano_lote=options['lote'], intervalo=options['intervalo'],
+                    una_vez=options['una_vez'], detener=detener,
+                )
+                for trabajo, exito in ciclo:
+                    with candado:
+                        contadores['completados' if exito else 'fallidos'] += 1
+                    if exito:
+                        self.stdout.write(f'[{numero}] {trabajo.tarea} #{trabajo.id} completado')
+                    else:
+                        self.stdout.write(self.style.WARNING(
+                            f'[{numero}] {trabajo.tarea} #{trabajo.id} {trabajo.estado} (intento {trabajo.intentos})'
+                        ))
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=worker, args=(numero,), daemon=True) for numero in range(options['hilos'])]
+        for hilo in hilos:
+            hilo.start()
+        try:
+            while any(hilo.is_alive() for hilo in hilos):
+                for hilo in hilos:
+                    hilo.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stdout.write('Deteniendo workers...')
+            detener.set()
+            for hilo in hilos:
+                hilo.join()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Trabajos completados: {contadores['completados']}, con error: {contadores['fallidos']}"
+        ))
@@ -0,0 +1,60 @@
+from django.db import migrations
+
+TABLA_INDICE = 'app_mascotas_indice_busqueda'
+CODIGOS_TIPO = {'alimento': 1, 'accesorio': 2, 'mascota': 3}
+
+
+def crear_indice(apps, schema_editor):
+    """Crea la tabla FTS5 y la llena con el catálogo publicado (solo SQLite)"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_INDICE} USING fts5("
+        "nombre, descripcion, etiquetas, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+
+    filas = []
+    for nombre_modelo in ('Alimento', 'Accesorio'):
+        modelo = apps.get_model('app_mascotas', nombre_modelo)
+        codigo = CODIGOS_TIPO[nombre_modelo.lower()]
+        for producto in modelo.objects.filter(activo=True).select_related('categoria', 'tipo'):
+            filas.append((
+                producto.id * 4 + codigo,
+                producto.nombre,
+                producto.descripcion or '',
+                f"{producto.categoria.nombre} {producto.tipo.nombre}",
+            ))
+    Mascota = apps.get_model('app_mascotas', 'Mascota')
+    for mascota in Mascota.objects.filter(estado='disponible').select_related('tipo'):
+        filas.append((
+            mascota.id * 4 + CODIGOS_TIPO['mascota'],
+            mascota.nombre,
+            mascota.descripcion or '',
+            f"{mascota.raza} {mascota.tipo.nombre}",
+        ))
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {TABLA_INDICE} (rowid, nombre, descripcion, etiquetas) "
+            "VALUES (%s, %s, %s, %s)",
+            filas
+        )
+
+
+def eliminar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {TABLA_INDICE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_mascotas', '0002_categoria_cantidad_alter_categoria_nombre'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_mascotas', '0003_indice_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='accesorio',
+            index=models.Index(fields=['activo', 'nombre', 'id'], name='accesorio_listado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alimento',
+            index=models.Index(fields=['activo', 'nombre', 'id'], name='alimento_listado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mascota',
+            index=models.Index(fields=['estado', 'fecha_creacion', 'id'], name='mascota_listado_idx'),
+        ),
+    ]
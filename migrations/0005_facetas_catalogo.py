@@ -0,0 +1,74 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+
+
+def llenar_facetas(apps, schema_editor):
+    """Calcula las facetas iniciales con un GROUP BY por modelo"""
+    FacetaCatalogo = apps.get_model('app_mascotas', 'FacetaCatalogo')
+    facetas = []
+    for nombre_modelo in ('Alimento', 'Accesorio'):
+        modelo = apps.get_model('app_mascotas', nombre_modelo)
+        grupos = (
+            modelo.objects.order_by()
+            .values('categoria_id', 'tipo_id', 'activo')
+            .annotate(cantidad=Count('id'), precio_min=Min('precio'), precio_max=Max('precio'))
+        )
+        facetas.extend(
+            FacetaCatalogo(tipo_producto=nombre_modelo.lower(), **grupo) for grupo in grupos
+        )
+    FacetaCatalogo.objects.bulk_create(facetas, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_mascotas', '0004_indices_listados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetaCatalogo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_producto', models.CharField(choices=[('alimento', 'Alimento'), ('accesorio', 'Accesorio')], max_length=10)),
+                ('activo', models.BooleanField(default=True)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('precio_min', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('precio_max', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+            ],
+            options={
+                'verbose_name': 'Faceta del catálogo',
+                'verbose_name_plural': 'Facetas del catálogo',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='accesorio',
+            index=models.Index(fields=['categoria', 'tipo', 'activo'], name='accesorio_faceta_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alimento',
+            index=models.Index(fields=['categoria', 'tipo', 'activo'], name='alimento_faceta_idx'),
+        ),
+        migrations.AddField(
+            model_name='facetacatalogo',
+            name='categoria',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='facetas', to='app_mascotas.categoria'),
+        ),
+        migrations.AddField(
+            model_name='facetacatalogo',
+            name='tipo',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='facetas', to='app_mascotas.tipo'),
+        ),
+        migrations.AddIndex(
+            model_name='facetacatalogo',
+            index=models.Index(fields=['tipo_producto', 'activo'], name='faceta_listado_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='facetacatalogo',
+            constraint=models.UniqueConstraint(fields=('tipo_producto', 'categoria', 'tipo', 'activo'), name='faceta_catalogo_unica'),
+        ),
+        migrations.RunPython(llenar_facetas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def llenar_catalogo(apps, schema_editor):
+    """Copia alimentos, accesorios y mascotas al modelo de lectura"""
+    ProductoCatalogo = apps.get_model('app_mascotas', 'ProductoCatalogo')
+    filas = []
+    for nombre_modelo in ('Alimento', 'Accesorio'):
+        modelo = apps.get_model('app_mascotas', nombre_modelo)
+        for producto in modelo.objects.all():
+            filas.append(ProductoCatalogo(
+                tipo_producto=nombre_modelo.lower(),
+                producto_id=producto.id,
+                nombre=producto.nombre,
+                descripcion=(producto.descripcion or '')[:200],
+                precio=producto.precio,
+                precio_original=producto.precio_original,
+                stock=producto.stock,
+                imagen=producto.imagen.name or None,
+                categoria_id=producto.categoria_id,
+                tipo_id=producto.tipo_id,
+                activo=producto.activo,
+                destacado=producto.destacado,
+                fecha_creacion=producto.fecha_creacion,
+            ))
+    Mascota = apps.get_model('app_mascotas', 'Mascota')
+    for mascota in Mascota.objects.all():
+        disponible = mascota.estado == 'disponible'
+        filas.append(ProductoCatalogo(
+            tipo_producto='mascota',
+            producto_id=mascota.id,
+            nombre=mascota.nombre,
+            descripcion=(mascota.descripcion or '')[:200],
+            precio=mascota.precio,
+            stock=int(disponible),
+            imagen=mascota.imagen.name or None,
+            tipo_id=mascota.tipo_id,
+            activo=disponible,
+            fecha_creacion=mascota.fecha_creacion,
+        ))
+    ProductoCatalogo.objects.bulk_create(filas, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_mascotas', '0005_facetas_catalogo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductoCatalogo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_producto', models.CharField(choices=[('alimento', 'Alimento'), ('accesorio', 'Accesorio'), ('mascota', 'Mascota')], max_length=10)),
+                ('producto_id', models.PositiveIntegerField()),
+                ('nombre', models.CharField(max_length=200)),
+                ('descripcion', models.CharField(blank=True, max_length=200)),
+                ('precio', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('precio_original', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('stock', models.IntegerField(default=0)),
+                ('imagen', models.ImageField(blank=True, null=True, upload_to='catalogo/')),
+                ('activo', models.BooleanField(default=True)),
+                ('destacado', models.BooleanField(default=False)),
+                ('fecha_creacion', models.DateTimeField()),
+                ('categoria', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='catalogo', to='app_mascotas.categoria')),
+                ('tipo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='catalogo', to='app_mascotas.tipo')),
+            ],
+            options={
+                'verbose_name': 'Producto del catálogo',
+                'verbose_name_plural': 'Productos del catálogo',
+                'indexes': [models.Index(fields=['activo', 'nombre', 'id'], name='catalogo_listado_idx'), models.Index(fields=['categoria', 'activo', 'nombre', 'id'], name='catalogo_categoria_idx'), models.Index(fields=['tipo_producto', 'activo', 'nombre', 'id'], name='catalogo_tipo_producto_idx')],
+                'constraints': [models.UniqueConstraint(fields=('tipo_producto', 'producto_id'), name='producto_catalogo_unico')],
+            },
+        ),
+        migrations.RunPython(llenar_catalogo, migrations.RunPython.noop),
+    ]
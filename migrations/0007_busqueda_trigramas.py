@@ -0,0 +1,80 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:02
+
+import django.db.models.deletion
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+
+def _palabras(texto):
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(caracter for caracter in texto if not unicodedata.combining(caracter))
+    return {
+        palabra[:100] for palabra in re.findall(r'\w+', texto.lower())
+        if len(palabra) >= 3 and not palabra.isdigit()
+    }
+
+def _trigramas(palabra):
+    relleno = f'  {palabra} '
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+def llenar_vocabulario(apps, schema_editor):
+    """Arma el vocabulario inicial con nombres, razas, categorías y tipos"""
+    PalabraBusqueda = apps.get_model('app_mascotas', 'PalabraBusqueda')
+    TrigramaPalabra = apps.get_model('app_mascotas', 'TrigramaPalabra')
+
+    vocabulario = set()
+    for nombre_modelo, campo in (('Alimento', 'nombre'), ('Accesorio', 'nombre'),
+                                 ('Mascota', 'raza'), ('Categoria', 'nombre'), ('Tipo', 'nombre')):
+        modelo = apps.get_model('app_mascotas', nombre_modelo)
+        for texto in modelo.objects.values_list(campo, flat=True):
+            vocabulario |= _palabras(texto)
+
+    PalabraBusqueda.objects.bulk_create(
+        [PalabraBusqueda(texto=palabra, num_trigramas=len(_trigramas(palabra))) for palabra in sorted(vocabulario)],
+        batch_size=500,
+    )
+    TrigramaPalabra.objects.bulk_create(
+        [
+            TrigramaPalabra(trigrama=trigrama, palabra_id=palabra_id)
+            for palabra_id, texto in PalabraBusqueda.objects.values_list('id', 'texto')
+            for trigrama in _trigramas(texto)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_mascotas', '0006_producto_catalogo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PalabraBusqueda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('texto', models.CharField(max_length=100, unique=True)),
+                ('num_trigramas', models.PositiveSmallIntegerField()),
+            ],
+            options={
+                'verbose_name': 'Palabra de búsqueda',
+                'verbose_name_plural': 'Palabras de búsqueda',
+            },
+        ),
+        migrations.CreateModel(
+            name='TrigramaPalabra',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigrama', models.CharField(max_length=3)),
+                ('palabra', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigramas', to='app_mascotas.palabrabusqueda')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['trigrama', 'palabra'], name='trigrama_palabra_idx')],
+            },
+        ),
+        migrations.RunPython(llenar_vocabulario, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_mascotas', '0007_busqueda_trigramas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productocatalogo',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_mascotas', '0008_catalogo_fecha_actualizacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelacionadosProducto',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='relacionados', serialize=False, to='app_mascotas.productocatalogo')),
+                ('vecinos', models.JSONField(default=list)),
+                ('fecha_calculo', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Productos relacionados',
+                'verbose_name_plural': 'Productos relacionados',
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:10
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def llenar_totales(apps, schema_editor):
+    """Calcula los totales de cada carrito con un solo UPDATE correlacionado"""
+    Carrito = apps.get_model('app_mascotas', 'Carrito')
+    ItemCarrito = apps.get_model('app_mascotas', 'ItemCarrito')
+    decimal = DecimalField(max_digits=12, decimal_places=2)
+    renglones = ItemCarrito.objects.filter(carrito=OuterRef('pk')).order_by().values('carrito')
+    importe = Sum(F('cantidad') * Coalesce(F('alimento__precio'), F('accesorio__precio')), output_field=decimal)
+    Carrito.objects.update(
+        num_items=Coalesce(Subquery(renglones.annotate(valor=Count('id')).values('valor')), 0),
+        subtotal=Coalesce(Subquery(renglones.annotate(valor=importe).values('valor')), Value(0), output_field=decimal),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_mascotas', '0009_productos_relacionados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carrito',
+            name='num_items',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='carrito',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(llenar_totales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:13
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, Min, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fusionar_duplicados(apps, schema_editor):
+    """
+    Antes de crear las restricciones: deja un solo carrito activo por usuario
+    (el más antiguo recibe los renglones de los demás) y junta los renglones
+    repetidos de un mismo producto sumando sus cantidades.
+    """
+    Carrito = apps.get_model('app_mascotas', 'Carrito')
+    ItemCarrito = apps.get_model('app_mascotas', 'ItemCarrito')
+    tocados = set()
+
+    repetidos = (
+        Carrito.objects.filter(activo=True).values('usuario_id')
+        .annotate(total=Count('id'), conservar=Min('id')).filter(total__gt=1)
+    )
+    for grupo in repetidos:
+        sobrantes = Carrito.objects.filter(usuario_id=grupo['usuario_id'], activo=True).exclude(id=grupo['conservar'])
+        ItemCarrito.objects.filter(carrito__in=sobrantes).update(carrito_id=grupo['conservar'])
+        sobrantes.update(activo=False, num_items=0, subtotal=0)
+        tocados.add(grupo['conservar'])
+
+    for campo in ('alimento_id', 'accesorio_id'):
+        repetidos = (
+            ItemCarrito.objects.filter(**{f'{campo}__isnull': False}).values('carrito_id', campo)
+            .annotate(total=Count('id'), conservar=Min('id'), cantidad=Sum('cantidad')).filter(total__gt=1)
+        )
+        for grupo in repetidos:
+            ItemCarrito.objects.filter(id=grupo['conservar']).update(cantidad=grupo['cantidad'])
+            ItemCarrito.objects.filter(carrito_id=grupo['carrito_id'], **{campo: grupo[campo]}).exclude(id=grupo['conservar']).delete()
+            tocados.add(grupo['carrito_id'])
+
+    if tocados:
+        decimal = DecimalField(max_digits=12, decimal_places=2)
+        renglones = ItemCarrito.objects.filter(carrito=OuterRef('pk')).order_by().values('carrito')
+        importe = Sum(F('cantidad') * Coalesce(F('alimento__precio'), F('accesorio__precio')), output_field=decimal)
+        Carrito.objects.filter(id__in=tocados).update(
+            num_items=Coalesce(Subquery(renglones.annotate(valor=Count('id')).values('valor')), 0),
+            subtotal=Coalesce(Subquery(renglones.annotate(valor=importe).values('valor')), Value(0), output_field=decimal),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_mascotas', '0010_carrito_totales'),
+    ]
+
+    operations = [
+        migrations.RunPython(fusionar_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='carrito',
+            constraint=models.UniqueConstraint(condition=models.Q(('activo', True)), fields=('usuario',), name='carrito_activo_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='itemcarrito',
+            constraint=models.UniqueConstraint(fields=('carrito', 'alimento'), name='item_carrito_alimento_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='itemcarrito',
+            constraint=models.UniqueConstraint(fields=('carrito', 'accesorio'), name='item_carrito_accesorio_unico'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_mascotas', '0011_carrito_restricciones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarritoArchivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('fecha_creacion', models.DateTimeField()),
+                ('fecha_actualizacion', models.DateTimeField()),
+                ('activo', models.BooleanField()),
+                ('num_items', models.PositiveIntegerField(default=0)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('items', models.JSONField(default=list)),
+                ('fecha_archivado', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Carrito archivado',
+                'verbose_name_plural': 'Carritos archivados',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='carrito',
+            index=models.Index(fields=['activo', 'fecha_actualizacion'], name='carrito_limpieza_idx'),
+        ),
+        migrations.AddField(
+            model_name='carritoarchivado',
+            name='usuario',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='carritos_archivados', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_mascotas', '0012_carritos_archivados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accesorio',
+            name='stock_reservado',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='alimento',
+            name='stock_reservado',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='productocatalogo',
+            name='stock_reservado',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ReservaStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_producto', models.CharField(choices=[('alimento', 'Alimento'), ('accesorio', 'Accesorio')], max_length=10)),
+                ('producto_id', models.PositiveIntegerField()),
+                ('cantidad', models.PositiveIntegerField()),
+                ('expira', models.DateTimeField()),
+                ('carrito', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='app_mascotas.carrito')),
+            ],
+            options={
+                'verbose_name': 'Reserva de stock',
+                'verbose_name_plural': 'Reservas de stock',
+                'indexes': [models.Index(fields=['expira'], name='reserva_stock_expira_idx'), models.Index(fields=['tipo_producto', 'producto_id', 'expira'], name='reserva_stock_producto_idx')],
+                'constraints': [models.UniqueConstraint(fields=('carrito', 'tipo_producto', 'producto_id'), name='reserva_stock_unica')],
+            },
+        ),
+    ]
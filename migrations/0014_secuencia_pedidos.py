@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:24
+
+from django.db import migrations, models
+
+
+def iniciar_secuencia(apps, schema_editor):
+    """Los números nuevos continúan después de los pedidos existentes"""
+    Pedido = apps.get_model('app_mascotas', 'Pedido')
+    Secuencia = apps.get_model('app_mascotas', 'Secuencia')
+    Secuencia.objects.create(nombre='pedido', valor=Pedido.objects.count())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_mascotas', '0013_reservas_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Secuencia',
+            fields=[
+                ('nombre', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('valor', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(iniciar_secuencia, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_mascotas', '0016_claves_idempotencia'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['usuario', 'fecha_pedido', 'id'], name='pedido_usuario_fecha_idx'),
+        ),
+    ]
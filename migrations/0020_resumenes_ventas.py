@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_mascotas', '0019_pedidos_archivados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarcaResumen',
+            fields=[
+                ('nombre', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('fecha', models.DateTimeField(blank=True, null=True)),
+                ('ultimo_id', models.BigIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResumenVentas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.CharField(choices=[('dia', 'Día'), ('mes', 'Mes')], max_length=3)),
+                ('fecha', models.DateField()),
+                ('dimension', models.CharField(choices=[('total', 'Total'), ('metodo_pago', 'Método de pago'), ('categoria', 'Categoría'), ('tipo', 'Tipo'), ('producto', 'Producto')], max_length=20)),
+                ('clave', models.CharField(blank=True, max_length=40)),
+                ('etiqueta', models.CharField(blank=True, max_length=200)),
+                ('pedidos', models.PositiveIntegerField(default=0)),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('iva', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Resumen de ventas',
+                'verbose_name_plural': 'Resúmenes de ventas',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['fecha_venta', 'id'], name='venta_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resumenventas',
+            index=models.Index(fields=['periodo', 'dimension', 'fecha'], name='resumen_ventas_rango_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='resumenventas',
+            constraint=models.UniqueConstraint(fields=('periodo', 'dimension', 'clave', 'fecha'), name='resumen_ventas_unico'),
+        ),
+    ]
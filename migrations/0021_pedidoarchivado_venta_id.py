@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_mascotas', '0020_resumenes_ventas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedidoarchivado',
+            name='venta_id',
+            field=models.BigIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='pedidoarchivado',
+            index=models.Index(fields=['fecha_venta', 'venta_id'], name='pedido_arch_venta_idx'),
+        ),
+    ]
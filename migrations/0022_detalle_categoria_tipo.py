@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copiar_clasificacion(apps, schema_editor):
+    """Llena categoria/tipo de los renglones existentes con los del producto actual"""
+    for nombre_detalle in ('DetallePedido', 'DetallePedidoArchivado'):
+        detalle = apps.get_model('app_mascotas', nombre_detalle)
+        for campo, nombre_modelo, columnas in (
+            ('alimento', 'Alimento', ('categoria_id', 'tipo_id')),
+            ('accesorio', 'Accesorio', ('categoria_id', 'tipo_id')),
+            ('mascota', 'Mascota', ('tipo_id',)),
+        ):
+            producto = apps.get_model('app_mascotas', nombre_modelo).objects.filter(id=OuterRef(f'{campo}_id'))
+            detalle.objects.filter(**{f'{campo}_id__isnull': False}).update(**{
+                columna: Subquery(producto.values(columna)[:1]) for columna in columnas
+            })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_mascotas', '0021_pedidoarchivado_venta_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='detallepedido',
+            name='categoria',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app_mascotas.categoria'),
+        ),
+        migrations.AddField(
+            model_name='detallepedido',
+            name='tipo',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app_mascotas.tipo'),
+        ),
+        migrations.AddField(
+            model_name='detallepedidoarchivado',
+            name='categoria',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='app_mascotas.categoria'),
+        ),
+        migrations.AddField(
+            model_name='detallepedidoarchivado',
+            name='tipo',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='app_mascotas.tipo'),
+        ),
+        migrations.RunPython(copiar_clasificacion, migrations.RunPython.noop),
+    ]
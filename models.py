@@ -1,6 +1,7 @@
 # app_mascotas/models.py
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 
 # ==========================================
 # MODELO DE USUARIO PERSONALIZADO
@@ -50,7 +51,25 @@ class Tipo(models.Model):
 # ==========================================
 # MODELOS DE PRODUCTOS
 # ==========================================
-class Alimento(models.Model):
+class StockReservadoMixin:
+    """
+    stock_reservado lo mantiene reservas.py con UPDATE ... F(); save() de una
+    instancia ya guardada no lo escribe para no pisar reservas más recientes.
+    """
+    
+    @property
+    def disponible(self):
+        return max(self.stock - self.stock_reservado, 0)
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name != 'stock_reservado'
+            ]
+        super().save(*args, **kwargs)
+
+class Alimento(StockReservadoMixin, models.Model):
     nombre = models.CharField(max_length=200)
     categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE, related_name='alimentos')
     tipo = models.ForeignKey(Tipo, on_delete=models.CASCADE, related_name='alimentos')
@@ -58,6 +77,7 @@ class Alimento(models.Model):
     precio = models.DecimalField(max_digits=10, decimal_places=2)
     precio_original = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     stock = models.IntegerField(default=0)
+    stock_reservado = models.PositiveIntegerField(default=0, editable=False)  # Reservas vigentes de carritos
     imagen = models.ImageField(upload_to='alimentos/', blank=True, null=True)
     destacado = models.BooleanField(default=False)
     activo = models.BooleanField(default=True)
@@ -68,6 +88,12 @@ class Alimento(models.Model):
         verbose_name = "Alimento"
         verbose_name_plural = "Alimentos"
         ordering = ['nombre']
+        indexes = [
+            # Paginación por cursor de la tienda (activo, nombre, id)
+            models.Index(fields=['activo', 'nombre', 'id'], name='alimento_listado_idx'),
+            # Recalcular un grupo de facetas (categoria, tipo, activo)
+            models.Index(fields=['categoria', 'tipo', 'activo'], name='alimento_faceta_idx'),
+        ]
     
     def __str__(self):
         return self.nombre
@@ -80,7 +106,7 @@ class Alimento(models.Model):
             return int(((self.precio_original - self.precio) / self.precio_original) * 100)
         return 0
 
-class Accesorio(models.Model):
+class Accesorio(StockReservadoMixin, models.Model):
     nombre = models.CharField(max_length=200)
     categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE, related_name='accesorios')
     tipo = models.ForeignKey(Tipo, on_delete=models.CASCADE, related_name='accesorios')
@@ -88,11 +114,18 @@ class Accesorio(models.Model):
     precio = models.DecimalField(max_digits=10, decimal_places=2)
     precio_original = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     stock = models.IntegerField(default=0)
+    stock_reservado = models.PositiveIntegerField(default=0, editable=False)
     imagen = models.ImageField(upload_to='accesorios/', blank=True, null=True)
     destacado = models.BooleanField(default=False)
     activo = models.BooleanField(default=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['activo', 'nombre', 'id'], name='accesorio_listado_idx'),
+            models.Index(fields=['categoria', 'tipo', 'activo'], name='accesorio_faceta_idx'),
+        ]
+    
     def __str__(self):
         return self.nombre
 
@@ -116,9 +149,147 @@ class Mascota(models.Model):
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='disponible')
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'fecha_creacion', 'id'], name='mascota_listado_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.nombre} - {self.raza}"
 
+# ==========================================
+# MODELOS DE RESUMEN DEL CATÁLOGO
+# ==========================================
+class FacetaCatalogo(models.Model):
+    """Conteo y rango de precios por (tipo de producto, categoría, tipo, activo)"""
+    TIPO_PRODUCTO_CHOICES = [
+        ('alimento', 'Alimento'),
+        ('accesorio', 'Accesorio'),
+    ]
+    
+    tipo_producto = models.CharField(max_length=10, choices=TIPO_PRODUCTO_CHOICES)
+    categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE, related_name='facetas')
+    tipo = models.ForeignKey(Tipo, on_delete=models.CASCADE, related_name='facetas')
+    activo = models.BooleanField(default=True)
+    cantidad = models.IntegerField(default=0)
+    precio_min = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    precio_max = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    
+    class Meta:
+        verbose_name = "Faceta del catálogo"
+        verbose_name_plural = "Facetas del catálogo"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tipo_producto', 'categoria', 'tipo', 'activo'],
+                name='faceta_catalogo_unica',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['tipo_producto', 'activo'], name='faceta_listado_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.tipo_producto}: {self.categoria} / {self.tipo} ({self.cantidad})"
+
+class ProductoCatalogo(models.Model):
+    """
+    Modelo de lectura desnormalizado: una fila por alimento, accesorio o mascota
+    para listar, ordenar y paginar los tres tipos con una sola consulta.
+    Se mantiene desde signals.py; la fuente de verdad son los modelos de producto.
+    """
+    TIPO_PRODUCTO_CHOICES = [
+        ('alimento', 'Alimento'),
+        ('accesorio', 'Accesorio'),
+        ('mascota', 'Mascota'),
+    ]
+    
+    tipo_producto = models.CharField(max_length=10, choices=TIPO_PRODUCTO_CHOICES)
+    producto_id = models.PositiveIntegerField()
+    nombre = models.CharField(max_length=200)
+    descripcion = models.CharField(max_length=200, blank=True)  # Recortada para las tarjetas
+    precio = models.DecimalField(max_digits=10, decimal_places=2)
+    precio_original = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    stock = models.IntegerField(default=0)
+    stock_reservado = models.PositiveIntegerField(default=0)  # Copia de la del producto (reservas.py)
+    imagen = models.ImageField(upload_to='catalogo/', blank=True, null=True)
+    categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE, related_name='catalogo', blank=True, null=True)
+    tipo = models.ForeignKey(Tipo, on_delete=models.CASCADE, related_name='catalogo')
+    activo = models.BooleanField(default=True)
+    destacado = models.BooleanField(default=False)
+    fecha_creacion = models.DateTimeField()
+    fecha_actualizacion = models.DateTimeField(auto_now=True)  # Validadores HTTP de la API
+    
+    class Meta:
+        verbose_name = "Producto del catálogo"
+        verbose_name_plural = "Productos del catálogo"
+        constraints = [
+            models.UniqueConstraint(fields=['tipo_producto', 'producto_id'], name='producto_catalogo_unico'),
+        ]
+        indexes = [
+            # Listados mixtos: todo el catálogo, por categoría y por tipo de producto
+            models.Index(fields=['activo', 'nombre', 'id'], name='catalogo_listado_idx'),
+            models.Index(fields=['categoria', 'activo', 'nombre', 'id'], name='catalogo_categoria_idx'),
+            models.Index(fields=['tipo_producto', 'activo', 'nombre', 'id'], name='catalogo_tipo_producto_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.tipo_producto} {self.producto_id}: {self.nombre}"
+    
+    @property
+    def disponible(self):
+        return max(self.stock - self.stock_reservado, 0)
+    
+    def tiene_descuento(self):
+        return self.precio_original and self.precio < self.precio_original
+    
+    def porcentaje_descuento(self):
+        if self.tiene_descuento():
+            return int(((self.precio_original - self.precio) / self.precio_original) * 100)
+        return 0
+
+class RelacionadosProducto(models.Model):
+    """Vecinos precalculados de cada producto del catálogo (ids de ProductoCatalogo por puntaje)"""
+    producto = models.OneToOneField(
+        ProductoCatalogo, on_delete=models.CASCADE, primary_key=True, related_name='relacionados'
+    )
+    vecinos = models.JSONField(default=list)
+    fecha_calculo = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Productos relacionados"
+        verbose_name_plural = "Productos relacionados"
+    
+    def __str__(self):
+        return f"{self.producto}: {len(self.vecinos)} relacionados"
+
+# ==========================================
+# MODELOS DE BÚSQUEDA
+# ==========================================
+class PalabraBusqueda(models.Model):
+    """Vocabulario del catálogo (nombres, razas y categorías) para corregir errores de escritura"""
+    texto = models.CharField(max_length=100, unique=True)
+    num_trigramas = models.PositiveSmallIntegerField()
+    
+    class Meta:
+        verbose_name = "Palabra de búsqueda"
+        verbose_name_plural = "Palabras de búsqueda"
+    
+    def __str__(self):
+        return self.texto
+
+class TrigramaPalabra(models.Model):
+    """Índice invertido trigrama -> palabra del vocabulario"""
+    trigrama = models.CharField(max_length=3)
+    palabra = models.ForeignKey(PalabraBusqueda, on_delete=models.CASCADE, related_name='trigramas')
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['trigrama', 'palabra'], name='trigrama_palabra_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.trigrama} -> {self.palabra_id}"
+
 # ==========================================
 # MODELOS DE VENTAS
 # ==========================================
@@ -127,18 +298,28 @@ class Carrito(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
     activo = models.BooleanField(default=True)
+    # Totales guardados: los mantiene ItemCarrito con UPDATE ... F() (ver carrito.py)
+    num_items = models.PositiveIntegerField(default=0, editable=False)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    
+    class Meta:
+        constraints = [
+            # Un solo carrito activo por usuario: get_or_create(usuario=..., activo=True) no duplica
+            models.UniqueConstraint(fields=['usuario'], condition=models.Q(activo=True), name='carrito_activo_unico'),
+        ]
+        indexes = [
+            # Búsqueda de carritos viejos de limpiar_carritos
+            models.Index(fields=['activo', 'fecha_actualizacion'], name='carrito_limpieza_idx'),
+        ]
     
     def __str__(self):
         return f"Carrito de {self.usuario.username}"
     
     def total(self):
-        total = 0
-        for item in self.items.all():
-            total += item.subtotal()
-        return total
+        return self.subtotal
     
     def cantidad_items(self):
-        return self.items.count()
+        return self.num_items
 
 class ItemCarrito(models.Model):
     carrito = models.ForeignKey(Carrito, on_delete=models.CASCADE, related_name='items')
@@ -147,6 +328,13 @@ class ItemCarrito(models.Model):
     cantidad = models.IntegerField(default=1)
     fecha_agregado = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        constraints = [
+            # Destino de los INSERT ... ON CONFLICT de carrito.agregar_item()
+            models.UniqueConstraint(fields=['carrito', 'alimento'], name='item_carrito_alimento_unico'),
+            models.UniqueConstraint(fields=['carrito', 'accesorio'], name='item_carrito_accesorio_unico'),
+        ]
+    
     def subtotal(self):
         if self.alimento:
             return self.alimento.precio * self.cantidad
@@ -156,6 +344,104 @@ class ItemCarrito(models.Model):
     
     def producto(self):
         return self.alimento or self.accesorio
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        if not instancia.get_deferred_fields():
+            instancia._guardado = instancia._renglon()
+        return instancia
+    
+    def _renglon(self):
+        return (self.carrito_id, self.alimento_id, self.accesorio_id, self.cantidad)
+    
+    def _renglon_guardado(self):
+        """Estado del renglón en la base de datos antes de este cambio"""
+        if self._state.adding:
+            return None
+        guardado = getattr(self, '_guardado', None)
+        if guardado is None:
+            guardado = (
+                ItemCarrito.objects.filter(pk=self.pk)
+                .values_list('carrito_id', 'alimento_id', 'accesorio_id', 'cantidad').first()
+            )
+        return guardado
+    
+    def save(self, *args, **kwargs):
+        from .carrito import ajustar_totales  # carrito.py importa este módulo
+        anterior = self._renglon_guardado()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            actual = self._renglon()
+            if actual != anterior:
+                ajustar_totales(anterior, actual)
+        self._guardado = actual
+        self._invalidar_resumen(anterior)
+    
+    def delete(self, *args, **kwargs):
+        from .carrito import ajustar_totales
+        anterior = self._renglon_guardado()
+        with transaction.atomic():
+            resultado = super().delete(*args, **kwargs)
+            ajustar_totales(anterior, None)
+        self._guardado = None
+        self._invalidar_resumen(anterior)
+        return resultado
+    
+    def _invalidar_resumen(self, anterior=None):
+        from .carrito import invalidar_resumen
+        usuario_ids = {self.carrito.usuario_id}
+        if anterior and anterior[0] != self.carrito_id:
+            usuario_ids.update(Carrito.objects.filter(id=anterior[0]).values_list('usuario_id', flat=True))
+        invalidar_resumen(*usuario_ids)
+
+class ReservaStock(models.Model):
+    """Unidades apartadas por un renglón del carrito hasta 'expira' (ver reservas.py)"""
+    TIPO_CHOICES = [
+        ('alimento', 'Alimento'),
+        ('accesorio', 'Accesorio'),
+    ]
+    
+    carrito = models.ForeignKey(Carrito, on_delete=models.CASCADE, related_name='reservas')
+    tipo_producto = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    producto_id = models.PositiveIntegerField()
+    cantidad = models.PositiveIntegerField()
+    expira = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = "Reserva de stock"
+        verbose_name_plural = "Reservas de stock"
+        constraints = [
+            models.UniqueConstraint(fields=['carrito', 'tipo_producto', 'producto_id'], name='reserva_stock_unica'),
+        ]
+        indexes = [
+            # Barrido de reservas vencidas
+            models.Index(fields=['expira'], name='reserva_stock_expira_idx'),
+            # Vencidas de un producto y suma por producto (reconciliar_reservados)
+            models.Index(fields=['tipo_producto', 'producto_id', 'expira'], name='reserva_stock_producto_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.tipo_producto} {self.producto_id} x{self.cantidad} (carrito {self.carrito_id})"
+
+class CarritoArchivado(models.Model):
+    """Copia compacta de un carrito eliminado por limpiar_carritos --archivar (conserva el id)"""
+    id = models.BigIntegerField(primary_key=True)
+    usuario = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, related_name='carritos_archivados')
+    fecha_creacion = models.DateTimeField()
+    fecha_actualizacion = models.DateTimeField()
+    activo = models.BooleanField()
+    num_items = models.PositiveIntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    items = models.JSONField(default=list)  # [{'alimento_id', 'accesorio_id', 'cantidad'}]
+    fecha_archivado = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Carrito archivado"
+        verbose_name_plural = "Carritos archivados"
+    
+    def __str__(self):
+        return f"Carrito archivado {self.id}"
 
 class Pedido(models.Model):
     ESTADO_CHOICES = [
@@ -176,6 +462,12 @@ class Pedido(models.Model):
     direccion_envio = models.TextField()
     notas = models.TextField(blank=True, null=True)
     
+    class Meta:
+        indexes = [
+            # Historial del cliente (mis_pedidos): filtro por usuario y orden/rango por fecha
+            models.Index(fields=['usuario', 'fecha_pedido', 'id'], name='pedido_usuario_fecha_idx'),
+        ]
+    
     def __str__(self):
         return f"Pedido {self.numero_pedido} - {self.usuario.username}"
     
@@ -183,6 +475,14 @@ class Pedido(models.Model):
         import uuid
         return f"PED-{uuid.uuid4().hex[:8].upper()}"
 
+class Secuencia(models.Model):
+    """Contadores con nombre; pedidos.siguiente_valor() los incrementa con un solo UPDATE atómico"""
+    nombre = models.CharField(max_length=50, primary_key=True)
+    valor = models.BigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.nombre}: {self.valor}"
+
 class DetallePedido(models.Model):
     pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE, related_name='detalles')
     alimento = models.ForeignKey(Alimento, on_delete=models.CASCADE, null=True, blank=True)
@@ -191,10 +491,38 @@ class DetallePedido(models.Model):
     cantidad = models.IntegerField(default=1)
     precio_unitario = models.DecimalField(max_digits=10, decimal_places=2)
     subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+    # Categoría y tipo del producto al hacer el pedido (los reportes agrupan por estos)
+    categoria = models.ForeignKey(Categoria, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    tipo = models.ForeignKey(Tipo, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    
+    def __str__(self):
+        return f"{self.producto()} x{self.cantidad}"
+    
+    def producto(self):
+        return self.alimento or self.accesorio or self.mascota
+    
+    def save(self, *args, **kwargs):
+        # Renglones capturados en el admin: tomar la clasificación actual del producto
+        producto = self.producto()
+        if self._state.adding and self.tipo_id is None and producto is not None:
+            self.categoria_id = getattr(producto, 'categoria_id', None)
+            self.tipo_id = producto.tipo_id
+        super().save(*args, **kwargs)
+
+class HistorialEstadoPedido(models.Model):
+    """Un renglón por cambio de estado; pedidos.cambiar_estado() los inserta con bulk_create"""
+    pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE, related_name='historial_estados')
+    estado_anterior = models.CharField(max_length=20, choices=Pedido.ESTADO_CHOICES)
+    estado_nuevo = models.CharField(max_length=20, choices=Pedido.ESTADO_CHOICES)
+    usuario = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    fecha = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = "Cambio de estado de pedido"
+        verbose_name_plural = "Historial de estados de pedidos"
     
     def __str__(self):
-        producto = self.alimento or self.accesorio or self.mascota
-        return f"{producto} x{self.cantidad}"
+        return f"{self.pedido_id}: {self.estado_anterior} -> {self.estado_nuevo}"
 
 class Venta(models.Model):
     METODO_PAGO_CHOICES = [
@@ -209,5 +537,216 @@ class Venta(models.Model):
     referencia_pago = models.CharField(max_length=100, blank=True, null=True)
     vendedor = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, related_name='ventas_realizadas')
     
+    class Meta:
+        indexes = [
+            # Ventas nuevas desde la marca de los resúmenes (reportes_ventas.actualizar)
+            models.Index(fields=['fecha_venta', 'id'], name='venta_fecha_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Venta {self.id} - {self.pedido.numero_pedido}"
+
+# ==========================================
+# PEDIDOS ARCHIVADOS
+# ==========================================
+class PedidoArchivado(models.Model):
+    """
+    Pedido entregado o cancelado que archivar_pedidos sacó de la tabla Pedido
+    (conserva el id y el número). La Venta y el historial de estados se
+    guardan en la misma fila.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='pedidos_archivados')
+    numero_pedido = models.CharField(max_length=20, unique=True)
+    fecha_pedido = models.DateTimeField()
+    estado = models.CharField(max_length=20, choices=Pedido.ESTADO_CHOICES)
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+    iva = models.DecimalField(max_digits=10, decimal_places=2)
+    total = models.DecimalField(max_digits=10, decimal_places=2)
+    direccion_envio = models.TextField()
+    notas = models.TextField(blank=True, null=True)
+    # Datos de la Venta, si la hubo (venta_id es el id que tenía en Venta)
+    venta_id = models.BigIntegerField(null=True, blank=True, unique=True)
+    fecha_venta = models.DateTimeField(null=True, blank=True)
+    metodo_pago = models.CharField(max_length=20, choices=Venta.METODO_PAGO_CHOICES, blank=True)
+    referencia_pago = models.CharField(max_length=100, blank=True, null=True)
+    vendedor = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    historial_estados = models.JSONField(default=list)  # [{'estado_anterior', 'estado_nuevo', 'usuario_id', 'fecha'}]
+    fecha_archivado = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Pedido archivado"
+        verbose_name_plural = "Pedidos archivados"
+        indexes = [
+            # Mismo índice que Pedido para el historial del cliente
+            models.Index(fields=['usuario', 'fecha_pedido', 'id'], name='pedido_arch_usuario_fecha_idx'),
+            # Listado de ventas (ver_ventas) junto con la tabla Venta
+            models.Index(fields=['fecha_venta', 'venta_id'], name='pedido_arch_venta_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Pedido archivado {self.numero_pedido}"
+
+class DetallePedidoArchivado(models.Model):
+    """Renglón de un PedidoArchivado (conserva el id del DetallePedido)"""
+    id = models.BigIntegerField(primary_key=True)
+    pedido = models.ForeignKey(PedidoArchivado, on_delete=models.CASCADE, related_name='detalles')
+    # Sin llave foránea en la base: borrar un producto no debe borrar la historia
+    alimento = models.ForeignKey(
+        Alimento, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+'
+    )
+    accesorio = models.ForeignKey(
+        Accesorio, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+'
+    )
+    mascota = models.ForeignKey(
+        Mascota, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+'
+    )
+    cantidad = models.IntegerField(default=1)
+    precio_unitario = models.DecimalField(max_digits=10, decimal_places=2)
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+    categoria = models.ForeignKey(
+        Categoria, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+'
+    )
+    tipo = models.ForeignKey(
+        Tipo, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+'
+    )
+    
+    def __str__(self):
+        return f"{self.producto()} x{self.cantidad}"
+    
+    def producto(self):
+        # Un producto borrado deja el id sin fila: se muestra como None
+        for campo in ('alimento', 'accesorio', 'mascota'):
+            if getattr(self, f'{campo}_id') is not None:
+                try:
+                    return getattr(self, campo)
+                except models.ObjectDoesNotExist:
+                    return None
+        return None
+
+# ==========================================
+# RESÚMENES DE VENTAS (REPORTES)
+# ==========================================
+class ResumenVentas(models.Model):
+    """
+    Totales de ventas por día o por mes y por dimensión. Los mantiene
+    reportes_ventas.actualizar() a partir de las ventas (de Venta y de los
+    pedidos archivados); la vista de reportes solo
+    lee esta tabla.
+    """
+    PERIODO_CHOICES = [
+        ('dia', 'Día'),
+        ('mes', 'Mes'),
+    ]
+    DIMENSION_CHOICES = [
+        ('total', 'Total'),
+        ('metodo_pago', 'Método de pago'),
+        ('categoria', 'Categoría'),
+        ('tipo', 'Tipo'),
+        ('producto', 'Producto'),
+    ]
+    
+    periodo = models.CharField(max_length=3, choices=PERIODO_CHOICES)
+    fecha = models.DateField()  # El día, o el día 1 del mes
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    clave = models.CharField(max_length=40, blank=True)  # '' en total; método, id o 'alimento:12'
+    etiqueta = models.CharField(max_length=200, blank=True)
+    pedidos = models.PositiveIntegerField(default=0)
+    unidades = models.PositiveIntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    iva = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        verbose_name = "Resumen de ventas"
+        verbose_name_plural = "Resúmenes de ventas"
+        constraints = [
+            models.UniqueConstraint(fields=['periodo', 'dimension', 'clave', 'fecha'], name='resumen_ventas_unico'),
+        ]
+        indexes = [
+            # Series y rankings de un rango de fechas
+            models.Index(fields=['periodo', 'dimension', 'fecha'], name='resumen_ventas_rango_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.periodo} {self.fecha} {self.dimension} {self.clave}: {self.total}"
+    
+    @property
+    def ticket_promedio(self):
+        return self.total / self.pedidos if self.pedidos else 0
+
+class MarcaResumen(models.Model):
+    """Hasta dónde se procesaron las ventas: (fecha_venta, id) de la última incluida"""
+    nombre = models.CharField(max_length=50, primary_key=True)
+    fecha = models.DateTimeField(null=True, blank=True)
+    ultimo_id = models.BigIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.nombre}: {self.fecha} ({self.ultimo_id})"
+
+# ==========================================
+# CLAVES DE IDEMPOTENCIA
+# ==========================================
+class ClaveIdempotencia(models.Model):
+    """Resultado de una petición POST por clave, para responder igual a los reintentos (ver idempotencia.py)"""
+    ESTADO_CHOICES = [
+        ('en_proceso', 'En proceso'),
+        ('completada', 'Completada'),
+    ]
+    
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='claves_idempotencia')
+    alcance = models.CharField(max_length=50)  # Vista protegida, p. ej. 'checkout'
+    clave = models.CharField(max_length=64)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='en_proceso')
+    codigo_estado = models.PositiveSmallIntegerField(null=True, blank=True)
+    tipo_contenido = models.CharField(max_length=100, blank=True)
+    ubicacion = models.CharField(max_length=500, blank=True)  # Encabezado Location de las redirecciones
+    cuerpo = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    expira = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        verbose_name = "Clave de idempotencia"
+        verbose_name_plural = "Claves de idempotencia"
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'alcance', 'clave'], name='clave_idempotencia_unica'),
+        ]
+    
+    def __str__(self):
+        return f"{self.alcance}:{self.clave} ({self.estado})"
+
+# ==========================================
+# COLA DE TRABAJOS EN SEGUNDO PLANO
+# ==========================================
+class Trabajo(models.Model):
+    """Tarea pendiente para el worker run_jobs (ver trabajos.py)"""
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En proceso'),
+        ('completado', 'Completado'),
+        ('fallido', 'Fallido'),
+    ]
+    
+    tarea = models.CharField(max_length=200)  # Ruta de la función, p. ej. app_mascotas.pedidos.enviar_confirmacion
+    argumentos = models.JSONField(default=dict, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
+    intentos = models.PositiveIntegerField(default=0)
+    max_intentos = models.PositiveIntegerField(default=5)
+    ejecutar_despues = models.DateTimeField(default=timezone.now)
+    bloqueado_hasta = models.DateTimeField(null=True, blank=True)  # Si el worker muere, otro lo retoma después
+    trabajador = models.CharField(max_length=100, blank=True)
+    ultimo_error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Trabajo"
+        verbose_name_plural = "Trabajos"
+        indexes = [
+            # Búsqueda de trabajos listos para ejecutar
+            models.Index(fields=['estado', 'ejecutar_despues'], name='trabajo_listo_idx'),
+        ]
+    
     def __str__(self):
-        return f"Venta {self.id} - {self.pedido.numero_pedido}"
\ No newline at end of file
+        return f"{self.tarea} ({self.estado})"
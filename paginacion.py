@@ -0,0 +1,181 @@
+# app_mascotas/paginacion.py
+"""
+Paginación por cursor (keyset) para los listados de la tienda.
+
+En lugar de OFFSET, cada página se pide a partir de los valores de orden del
+último (o primer) elemento de la página anterior, así el costo de cada página
+es O(tamaño de página) sin importar qué tan profundo se navegue. Los cursores
+viajan firmados en la URL para que no se puedan manipular.
+
+paginar_keyset() también acepta una lista de querysets con los mismos campos
+de orden (p. ej. pedidos recientes y archivados): pide la página a cada uno y
+mezcla los resultados en Python.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+SAL_CURSOR = 'app_mascotas.paginacion'
+
+
+# ==========================================
+# FUNCIONES DE AYUDA
+# ==========================================
+def tamano_pagina(request):
+    """Lee ?por_pagina= respetando el máximo configurado"""
+    por_defecto = getattr(settings, 'PAGINACION_TAMANO', 24)
+    maximo = getattr(settings, 'PAGINACION_MAXIMO', 96)
+    try:
+        tamano = int(request.GET.get('por_pagina', por_defecto))
+    except (TypeError, ValueError):
+        tamano = por_defecto
+    return max(1, min(tamano, maximo))
+
+def _campos(orden):
+    """Convierte ('-fecha', 'id') en [('fecha', True), ('id', False)] (True = descendente)"""
+    return [(campo.lstrip('-'), campo.startswith('-')) for campo in orden]
+
+def _invertir(orden):
+    return [campo[1:] if campo.startswith('-') else f'-{campo}' for campo in orden]
+
+def _valor(objeto, campo):
+    if isinstance(objeto, dict):
+        return objeto[campo]
+    return getattr(objeto, campo)
+
+def _serializar(valor):
+    """Fechas y decimales viajan como texto dentro del cursor"""
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+def codificar_cursor(orden, objeto, direccion):
+    """Genera el token firmado que apunta a 'objeto' en la dirección dada ('s' o 'a')"""
+    valores = [_serializar(_valor(objeto, campo)) for campo, _descendente in _campos(orden)]
+    return signing.dumps([direccion, valores], salt=SAL_CURSOR, compress=True)
+
+def decodificar_cursor(modelo, orden, token):
+    """Devuelve (direccion, valores) o (None, None) si el token no es válido"""
+    try:
+        direccion, valores = signing.loads(token, salt=SAL_CURSOR)
+        campos = _campos(orden)
+        if direccion not in ('s', 'a') or len(valores) != len(campos):
+            return None, None
+        valores = [
+            modelo._meta.get_field(campo).to_python(valor)
+            for (campo, _descendente), valor in zip(campos, valores)
+        ]
+        return direccion, valores
+    except (signing.BadSignature, ValueError, TypeError, ValidationError, FieldDoesNotExist):
+        return None, None
+
+def filtro_despues_de(orden, valores):
+    """
+    Condición keyset para los registros que van después de 'valores'
+    en el orden dado: (a > x) OR (a = x AND b > y) OR ...
+    """
+    condicion = Q()
+    prefijo = {}
+    for (campo, descendente), valor in zip(_campos(orden), valores):
+        operador = 'lt' if descendente else 'gt'
+        condicion |= Q(**prefijo, **{f'{campo}__{operador}': valor})
+        prefijo[campo] = valor
+    return condicion
+
+def _primeros(querysets, orden, condicion, cantidad):
+    """Los primeros 'cantidad' registros en 'orden' de uno o varios querysets"""
+    filas = []
+    for queryset in querysets:
+        if condicion is not None:
+            queryset = queryset.filter(condicion)
+        filas += queryset.order_by(*orden)[:cantidad]
+    if len(querysets) > 1:
+        # Ordenamientos estables del último campo al primero
+        for campo, descendente in reversed(_campos(orden)):
+            filas.sort(key=lambda fila: _valor(fila, campo), reverse=descendente)
+    return filas[:cantidad]
+
+
+# ==========================================
+# PÁGINA
+# ==========================================
+class PaginaKeyset:
+    def __init__(self, request, parametro, objetos, cursor_siguiente, cursor_anterior, tamano):
+        self.request = request
+        self.parametro = parametro
+        self.objetos = objetos
+        self.cursor_siguiente = cursor_siguiente
+        self.cursor_anterior = cursor_anterior
+        self.tamano = tamano
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+    def __bool__(self):
+        return bool(self.objetos)
+
+    @property
+    def tiene_siguiente(self):
+        return self.cursor_siguiente is not None
+
+    @property
+    def tiene_anterior(self):
+        return self.cursor_anterior is not None
+
+    def _url(self, cursor):
+        parametros = self.request.GET.copy()
+        parametros[self.parametro] = cursor
+        return f'?{parametros.urlencode()}'
+
+    @property
+    def url_siguiente(self):
+        return self._url(self.cursor_siguiente) if self.tiene_siguiente else ''
+
+    @property
+    def url_anterior(self):
+        return self._url(self.cursor_anterior) if self.tiene_anterior else ''
+
+
+def paginar_keyset(request, queryset, orden, parametro='cursor', tamano=None):
+    """
+    Devuelve la PaginaKeyset pedida en request.GET[parametro].
+
+    'orden' debe terminar en un campo único (normalmente 'id') para que el
+    orden sea estable, p. ej. ('nombre', 'id') o ('-fecha_creacion', '-id').
+    'queryset' puede ser una lista de querysets; el campo único debe serlo
+    también entre ellos.
+    """
+    querysets = list(queryset) if isinstance(queryset, (list, tuple)) else [queryset]
+    modelo = querysets[0].model
+    tamano = tamano or tamano_pagina(request)
+    direccion, valores = decodificar_cursor(modelo, orden, request.GET.get(parametro, ''))
+
+    if direccion == 'a':
+        # Página anterior: se recorre en orden inverso y se voltea el resultado
+        filas = _primeros(querysets, _invertir(orden), filtro_despues_de(_invertir(orden), valores), tamano + 1)
+        hay_mas = len(filas) > tamano
+        objetos = list(reversed(filas[:tamano]))
+        hay_siguiente, hay_anterior = True, hay_mas
+    else:
+        condicion = filtro_despues_de(orden, valores) if direccion == 's' else None
+        filas = _primeros(querysets, orden, condicion, tamano + 1)
+        hay_mas = len(filas) > tamano
+        objetos = filas[:tamano]
+        hay_siguiente, hay_anterior = hay_mas, direccion == 's'
+
+    cursor_siguiente = cursor_anterior = None
+    if objetos:
+        if hay_siguiente:
+            cursor_siguiente = codificar_cursor(orden, objetos[-1], 's')
+        if hay_anterior:
+            cursor_anterior = codificar_cursor(orden, objetos[0], 'a')
+
+    return PaginaKeyset(request, parametro, objetos, cursor_siguiente, cursor_anterior, tamano)
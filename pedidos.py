@@ -0,0 +1,260 @@
+# app_mascotas/pedidos.py
+"""
+Creación de pedidos a partir del carrito.
+
+crear_pedido() corre en una sola transacción y cuesta el mismo número de
+consultas sin importar cuántos renglones tenga el carrito: bloquea el carrito
+y los productos (SELECT ... FOR UPDATE, una consulta por tipo), descuenta el
+stock con un UPDATE condicional por tipo, consume las reservas del carrito,
+toma el número de pedido de Secuencia e inserta todos los DetallePedido con
+bulk_create(). Si algún producto no alcanza se lanza StockInsuficiente y no
+queda nada escrito.
+
+Los efectos posteriores (correo de confirmación, registro de la Venta) se
+encolan en trabajos.py dentro de la misma transacción y los ejecuta el
+worker run_jobs, fuera de la petición.
+
+cambiar_estado() mueve muchos pedidos a la vez siguiendo TRANSICIONES: un
+UPDATE ... WHERE estado = origen por cada estado de origen permitido y un
+bulk_create del historial.
+"""
+from decimal import Decimal
+
+from django.core.mail import send_mail
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest, Now
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from . import trabajos
+from .carrito import CENTAVOS, invalidar_resumen, iva_de
+from .models import (
+    Carrito, DetallePedido, HistorialEstadoPedido, Pedido, ProductoCatalogo, ReservaStock, Secuencia, Venta
+)
+from .productos import resolver_productos
+from .reservas import MODELOS_RESERVA, StockInsuficiente
+
+
+# Estados a los que puede pasar un pedido desde cada estado
+TRANSICIONES = {
+    'pendiente': ('procesando', 'enviado', 'cancelado'),
+    'procesando': ('enviado', 'cancelado'),
+    'enviado': ('entregado',),
+    'entregado': (),
+    'cancelado': (),
+}
+MAX_PEDIDOS_POR_CAMBIO = 5000
+
+
+class CarritoVacio(Exception):
+    """El usuario no tiene carrito activo o no tiene renglones"""
+
+
+class TransicionInvalida(Exception):
+    """Estado destino desconocido o demasiados pedidos en un solo cambio"""
+
+
+# ==========================================
+# NÚMEROS DE PEDIDO
+# ==========================================
+def siguiente_valor(nombre):
+    """
+    Incrementa y devuelve el contador 'nombre' con un solo INSERT ... ON
+    CONFLICT DO UPDATE ... RETURNING: dos transacciones nunca reciben el mismo
+    valor y no hace falta contar filas.
+    """
+    nombre_sql = connection.ops.quote_name
+    tabla = nombre_sql(Secuencia._meta.db_table)
+    valor = nombre_sql('valor')
+    sql = (
+        f'INSERT INTO {tabla} ({nombre_sql("nombre")}, {valor}) VALUES (%s, 1) '
+        f'ON CONFLICT ({nombre_sql("nombre")}) DO UPDATE SET {valor} = {tabla}.{valor} + 1 '
+        f'RETURNING {valor}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [nombre])
+        return cursor.fetchone()[0]
+
+def numero_pedido():
+    return f"PED-{timezone.localdate():%Y%m%d}-{siguiente_valor('pedido'):06d}"
+
+
+# ==========================================
+# CHECKOUT
+# ==========================================
+def _descontar_stock(campo, cantidades, reservadas):
+    """
+    Descuenta {producto_id: cantidad} del stock y las reservas propias de
+    stock_reservado con un UPDATE por tabla. El WHERE exige que cada producto
+    alcance (stock >= stock_reservado - reservado_propio + cantidad);
+    devuelve cuántos productos se actualizaron.
+    """
+    def por_id(llave, valores):
+        return Case(
+            *[When(**{llave: producto_id}, then=Value(valores.get(producto_id, 0))) for producto_id in cantidades],
+            default=Value(0), output_field=IntegerField(),
+        )
+
+    alcanza = Q(pk__in=[])
+    for producto_id, cantidad in cantidades.items():
+        alcanza |= Q(
+            id=producto_id,
+            stock__gte=F('stock_reservado') + (cantidad - reservadas.get(producto_id, 0)),
+        )
+    actualizados = MODELOS_RESERVA[campo].objects.filter(alcanza, activo=True).update(
+        stock=F('stock') - por_id('id', cantidades),
+        stock_reservado=Greatest(F('stock_reservado') - por_id('id', reservadas), Value(0)),
+    )
+    ProductoCatalogo.objects.filter(tipo_producto=campo, producto_id__in=cantidades).update(
+        stock=F('stock') - por_id('producto_id', cantidades),
+        stock_reservado=Greatest(F('stock_reservado') - por_id('producto_id', reservadas), Value(0)),
+        fecha_actualizacion=timezone.now(),
+    )
+    return actualizados
+
+def crear_pedido(usuario, direccion_envio, notas=''):
+    """
+    Convierte el carrito activo del usuario en un Pedido y lo desactiva.
+    Lanza CarritoVacio o StockInsuficiente sin escribir nada.
+    """
+    with transaction.atomic():
+        carrito = Carrito.objects.select_for_update().filter(usuario=usuario, activo=True).first()
+        if carrito is None:
+            raise CarritoVacio()
+        renglones = list(carrito.items.values_list('alimento_id', 'accesorio_id', 'cantidad').order_by('id'))
+        if not renglones:
+            raise CarritoVacio()
+
+        pedidos = {campo: {} for campo in MODELOS_RESERVA}
+        for alimento_id, accesorio_id, cantidad in renglones:
+            campo, producto_id = ('alimento', alimento_id) if alimento_id else ('accesorio', accesorio_id)
+            pedidos[campo][producto_id] = pedidos[campo].get(producto_id, 0) + cantidad
+        reservadas = {campo: {} for campo in MODELOS_RESERVA}
+        for campo, producto_id, cantidad in carrito.reservas.values_list('tipo_producto', 'producto_id', 'cantidad'):
+            reservadas[campo][producto_id] = cantidad
+
+        # Bloquear los productos y validar el stock antes de escribir
+        productos = {}
+        for campo, cantidades in pedidos.items():
+            if not cantidades:
+                continue
+            productos[campo] = MODELOS_RESERVA[campo].objects.select_for_update().in_bulk(list(cantidades))
+            for producto_id, cantidad in cantidades.items():
+                producto = productos[campo].get(producto_id)
+                disponible = 0
+                if producto is not None and producto.activo:
+                    # Las reservas propias ya están contadas en stock_reservado
+                    disponible = producto.stock - producto.stock_reservado + reservadas[campo].get(producto_id, 0)
+                if cantidad > disponible:
+                    raise StockInsuficiente(producto, max(disponible, 0))
+            if _descontar_stock(campo, cantidades, reservadas[campo]) != len(cantidades):
+                raise StockInsuficiente(next(iter(productos[campo].values())), 0)
+        ReservaStock.objects.filter(carrito=carrito).delete()
+
+        detalles = []
+        for campo, cantidades in pedidos.items():
+            for producto_id, cantidad in cantidades.items():
+                producto = productos[campo][producto_id]
+                detalles.append(DetallePedido(
+                    cantidad=cantidad,
+                    precio_unitario=producto.precio,
+                    subtotal=(producto.precio * cantidad).quantize(CENTAVOS),
+                    categoria_id=producto.categoria_id,
+                    tipo_id=producto.tipo_id,
+                    **{f'{campo}_id': producto_id},
+                ))
+        subtotal = sum((detalle.subtotal for detalle in detalles), Decimal('0'))
+        iva = iva_de(subtotal)
+        pedido = Pedido.objects.create(
+            usuario=usuario,
+            numero_pedido=numero_pedido(),
+            subtotal=subtotal,
+            iva=iva,
+            total=subtotal + iva,
+            direccion_envio=direccion_envio,
+            notas=notas,
+        )
+        for detalle in detalles:
+            detalle.pedido = pedido
+        DetallePedido.objects.bulk_create(detalles)
+        Carrito.objects.filter(id=carrito.id).update(activo=False, fecha_actualizacion=Now())
+        trabajos.encolar(enviar_confirmacion, pedido_id=pedido.id)
+    invalidar_resumen(usuario.id)
+    return pedido
+
+
+# ==========================================
+# CAMBIOS DE ESTADO
+# ==========================================
+def estados_siguientes(estado):
+    """[(valor, etiqueta)] de los estados permitidos desde 'estado'"""
+    etiquetas = dict(Pedido.ESTADO_CHOICES)
+    return [(destino, etiquetas[destino]) for destino in TRANSICIONES.get(estado, ())]
+
+def cambiar_estado(pedido_ids, nuevo_estado, usuario=None):
+    """
+    Pasa los pedidos a 'nuevo_estado' cuando TRANSICIONES lo permite: lee los
+    estados actuales con una consulta (bloqueando las filas), aplica un UPDATE
+    condicional por estado de origen y guarda el historial con bulk_create.
+    Devuelve {'actualizados': [ids], 'omitidos': [{'id', 'estado', 'motivo'}]}.
+    """
+    if nuevo_estado not in TRANSICIONES:
+        raise TransicionInvalida(f'Estado desconocido: {nuevo_estado}')
+    pedido_ids = list(dict.fromkeys(int(pedido_id) for pedido_id in pedido_ids))
+    if len(pedido_ids) > MAX_PEDIDOS_POR_CAMBIO:
+        raise TransicionInvalida(f'Se pueden cambiar hasta {MAX_PEDIDOS_POR_CAMBIO} pedidos a la vez')
+
+    actualizados, omitidos, historial = [], [], []
+    with transaction.atomic():
+        actuales = dict(
+            Pedido.objects.select_for_update().filter(id__in=pedido_ids).values_list('id', 'estado')
+        )
+        por_origen = {}
+        for pedido_id in pedido_ids:
+            estado = actuales.get(pedido_id)
+            if estado is None:
+                omitidos.append({'id': pedido_id, 'estado': None, 'motivo': 'No existe'})
+            elif nuevo_estado not in TRANSICIONES.get(estado, ()):
+                motivo = 'Ya está en ese estado' if estado == nuevo_estado else f'No se puede pasar de {estado} a {nuevo_estado}'
+                omitidos.append({'id': pedido_id, 'estado': estado, 'motivo': motivo})
+            else:
+                por_origen.setdefault(estado, []).append(pedido_id)
+
+        ahora = timezone.now()
+        for origen, ids in por_origen.items():
+            Pedido.objects.filter(id__in=ids, estado=origen).update(estado=nuevo_estado)
+            actualizados += ids
+            historial += [
+                HistorialEstadoPedido(
+                    pedido_id=pedido_id, estado_anterior=origen, estado_nuevo=nuevo_estado,
+                    usuario=usuario, fecha=ahora,
+                )
+                for pedido_id in ids
+            ]
+        HistorialEstadoPedido.objects.bulk_create(historial, batch_size=1000)
+    return {'actualizados': actualizados, 'omitidos': omitidos}
+
+
+# ==========================================
+# TRABAJOS EN SEGUNDO PLANO (run_jobs)
+# ==========================================
+def enviar_confirmacion(pedido_id):
+    """Correo de confirmación del pedido al cliente"""
+    pedido = Pedido.objects.select_related('usuario').get(id=pedido_id)
+    if not pedido.usuario.email:
+        return
+    contexto = {'pedido': pedido, 'detalles': resolver_productos(pedido.detalles.all())}
+    send_mail(
+        f'Confirmación de tu pedido {pedido.numero_pedido}',
+        render_to_string('cliente/correos/confirmacion_pedido.txt', contexto),
+        None,
+        [pedido.usuario.email],
+    )
+
+def registrar_venta(pedido_id, metodo_pago, referencia_pago=''):
+    """Crea la Venta del pedido pagado; si ya existe no hace nada"""
+    Venta.objects.get_or_create(
+        pedido_id=pedido_id,
+        defaults={'metodo_pago': metodo_pago, 'referencia_pago': referencia_pago or None},
+    )
@@ -0,0 +1,43 @@
+# app_mascotas/productos.py
+"""
+Resolución en lote de los productos de renglones polimórficos.
+
+ItemCarrito y DetallePedido apuntan a su producto con una llave foránea por
+tipo (alimento, accesorio y, en pedidos, mascota). Acceder a cada una por
+separado cuesta una consulta por renglón; resolver_productos() agrupa los ids
+por tipo, trae cada tipo con un solo in_bulk() y deja los objetos en la caché
+de la llave foránea, así producto(), subtotal() y __str__ ya no consultan.
+"""
+CAMPOS_PRODUCTO = ('alimento', 'accesorio', 'mascota')
+
+
+def resolver_productos(lineas, relacionados=()):
+    """
+    Carga los productos de 'lineas' (cualquier iterable de renglones) con una
+    consulta por tipo y devuelve los renglones como lista. 'relacionados' son
+    campos para select_related() (p. ej. 'tipo', 'categoria'); se aplican solo
+    a los modelos que los tienen.
+    """
+    lineas = list(lineas)
+    if not lineas:
+        return lineas
+
+    campos = [
+        lineas[0]._meta.get_field(campo)
+        for campo in CAMPOS_PRODUCTO
+        if any(field.name == campo for field in lineas[0]._meta.fields)
+    ]
+    for campo in campos:
+        ids = {getattr(linea, campo.attname) for linea in lineas} - {None}
+        if not ids:
+            continue
+        modelo = campo.related_model
+        nombres = {field.name for field in modelo._meta.fields}
+        objetos = modelo.objects.select_related(
+            *[relacionado for relacionado in relacionados if relacionado in nombres]
+        ).in_bulk(ids)
+        for linea in lineas:
+            producto_id = getattr(linea, campo.attname)
+            if producto_id is not None and producto_id in objetos:
+                campo.set_cached_value(linea, objetos[producto_id])
+    return lineas
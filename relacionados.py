@@ -0,0 +1,243 @@
+# app_mascotas/relacionados.py
+"""
+Productos relacionados precalculados.
+
+Cada producto del catálogo se compara con los que comparten su categoría o
+su tipo y con precio cercano; el puntaje suma categoría, tipo, cercanía de
+precio y si el vecino es destacado. Los N mejores ids de ProductoCatalogo se
+guardan en RelacionadosProducto, así la página de detalle los trae con una
+sola consulta IN.
+
+Al cambiar la categoría, tipo, precio o publicación de un producto, su propia
+lista se recalcula al confirmar la transacción y actualizar_vecinos() se
+encola en trabajos para recalcular, fuera de la petición, los productos de
+sus grupos anteriores y nuevos dentro de la ventana de precio y los que lo
+tenían en su lista.
+"""
+import heapq
+from bisect import bisect_left
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+from django.db.models.functions import Abs
+
+from . import catalogo, trabajos
+from .models import ProductoCatalogo, RelacionadosProducto
+
+PESO_CATEGORIA = 3.0
+PESO_TIPO = 2.0
+PESO_PRECIO = 2.0
+PESO_DESTACADO = 0.5
+
+# Candidatos por grupo (categoría o tipo): los más cercanos en precio
+VENTANA_PRECIO = 40
+
+CAMPOS = ('id', 'tipo_producto', 'producto_id', 'categoria_id', 'tipo_id', 'precio', 'destacado')
+
+
+# ==========================================
+# PUNTAJE
+# ==========================================
+def cantidad_relacionados():
+    return getattr(settings, 'RELACIONADOS_CANTIDAD', 8)
+
+def puntaje(base, otro):
+    total = 0.0
+    if base['categoria_id'] and base['categoria_id'] == otro['categoria_id']:
+        total += PESO_CATEGORIA
+    if base['tipo_id'] == otro['tipo_id']:
+        total += PESO_TIPO
+    mayor = max(base['precio'], otro['precio'])
+    if mayor > 0:
+        total += PESO_PRECIO * float(1 - abs(base['precio'] - otro['precio']) / mayor)
+    if otro['destacado']:
+        total += PESO_DESTACADO
+    return total
+
+def mejores(base, candidatos, cantidad):
+    """Ids de los 'cantidad' candidatos con mayor puntaje (desempate por id)"""
+    puntajes = (
+        (puntaje(base, otro), -otro['id'], otro['id'])
+        for otro in candidatos if otro['id'] != base['id']
+    )
+    return [objeto_id for _puntaje, _desempate, objeto_id in heapq.nlargest(cantidad, puntajes)]
+
+
+# ==========================================
+# CÁLCULO EN LOTE
+# ==========================================
+def _cercanos(grupo, precios, precio):
+    """Ventana de filas del grupo (ordenado por precio) alrededor de 'precio'"""
+    posicion = bisect_left(precios, precio)
+    return grupo[max(0, posicion - VENTANA_PRECIO):posicion + VENTANA_PRECIO]
+
+def recalcular_todos(tamano_lote=1000):
+    """
+    Recalcula los relacionados de todo el catálogo publicado. Las filas se
+    agrupan por categoría y por tipo ordenadas por precio, así cada producto
+    solo se compara con una ventana de vecinos y no con todo el catálogo.
+    """
+    cantidad = cantidad_relacionados()
+    filas = list(catalogo.productos_publicados().order_by('precio', 'id').values(*CAMPOS))
+
+    grupos = {}
+    for fila in filas:
+        if fila['categoria_id']:
+            grupos.setdefault(('categoria', fila['categoria_id']), []).append(fila)
+        grupos.setdefault(('tipo', fila['tipo_id']), []).append(fila)
+    precios = {llave: [fila['precio'] for fila in grupo] for llave, grupo in grupos.items()}
+
+    RelacionadosProducto.objects.all().delete()
+    lote, total = [], 0
+    for fila in filas:
+        candidatos = {}
+        llaves = [('tipo', fila['tipo_id'])]
+        if fila['categoria_id']:
+            llaves.append(('categoria', fila['categoria_id']))
+        for llave in llaves:
+            for otro in _cercanos(grupos[llave], precios[llave], fila['precio']):
+                candidatos[otro['id']] = otro
+        lote.append(RelacionadosProducto(producto_id=fila['id'], vecinos=mejores(fila, candidatos.values(), cantidad)))
+        if len(lote) >= tamano_lote:
+            RelacionadosProducto.objects.bulk_create(lote)
+            total += len(lote)
+            lote = []
+    if lote:
+        RelacionadosProducto.objects.bulk_create(lote)
+        total += len(lote)
+    return total
+
+
+# ==========================================
+# RECÁLCULO INCREMENTAL
+# ==========================================
+def requiere_recalculo(instancia, estado_anterior):
+    """Solo cambios de categoría, tipo, precio o publicación mueven los relacionados"""
+    if estado_anterior is None:
+        return True
+    for campo, valor in estado_anterior.items():
+        actual = getattr(instancia, campo)
+        if campo == 'precio':
+            actual, valor = Decimal(str(actual)), Decimal(str(valor))
+        if actual != valor:
+            return True
+    return False
+
+def _grupos(fila):
+    """Filtros de los grupos (tipo y categoría) de una fila o estado anterior"""
+    filtros = [{'tipo_id': fila['tipo_id']}]
+    if fila.get('categoria_id'):
+        filtros.append({'categoria_id': fila['categoria_id']})
+    return filtros
+
+def _cercanos_en(filtro, precio, *campos):
+    """Los VENTANA_PRECIO * 2 productos publicados del grupo más cercanos a 'precio'"""
+    return (
+        catalogo.productos_publicados().filter(**filtro)
+        .annotate(distancia=Abs(F('precio') - precio))
+        .order_by('distancia', 'id')
+        .values(*campos)[:VENTANA_PRECIO * 2]
+    )
+
+def _guardar_vecinos(base):
+    """Recalcula y guarda los relacionados de la fila 'base' con dos consultas de candidatos"""
+    candidatos = {}
+    for filtro in _grupos(base):
+        candidatos.update((otro['id'], otro) for otro in _cercanos_en(filtro, base['precio'], *CAMPOS))
+    vecinos = mejores(base, candidatos.values(), cantidad_relacionados())
+    RelacionadosProducto.objects.update_or_create(producto_id=base['id'], defaults={'vecinos': vecinos})
+    return vecinos
+
+def recalcular_producto(tipo_producto, producto_id):
+    """Recalcula los relacionados de un producto con dos consultas de candidatos"""
+    base = (
+        ProductoCatalogo.objects
+        .filter(tipo_producto=tipo_producto, producto_id=producto_id, activo=True)
+        .values(*CAMPOS).first()
+    )
+    if base is None:
+        RelacionadosProducto.objects.filter(
+            producto__tipo_producto=tipo_producto, producto__producto_id=producto_id
+        ).delete()
+        return []
+    return _guardar_vecinos(base)
+
+def _que_incluyen(catalogo_id):
+    """Ids de los productos que tienen a 'catalogo_id' en su lista guardada"""
+    if connection.features.supports_json_field_contains:
+        return set(
+            RelacionadosProducto.objects.filter(vecinos__contains=[catalogo_id]).values_list('producto_id', flat=True)
+        )
+    # SQLite no tiene contains sobre JSON: se recorre la tabla (dentro del trabajo, no de la petición)
+    return {
+        producto_id
+        for producto_id, vecinos in RelacionadosProducto.objects.values_list('producto_id', 'vecinos').iterator()
+        if catalogo_id in vecinos
+    }
+
+def actualizar_vecinos(tipo_producto, producto_id, anterior=None, catalogo_id=None):
+    """
+    Trabajo encolado por las señales: recalcula los productos cuya lista
+    puede cambiar porque este producto cambió de grupo o de precio, se
+    publicó, se despublicó o se eliminó. 'anterior' trae categoria_id,
+    tipo_id y precio (texto) de antes del cambio; 'catalogo_id' identifica
+    al producto cuando su fila de catálogo ya no existe.
+    """
+    fila = (
+        ProductoCatalogo.objects.filter(tipo_producto=tipo_producto, producto_id=producto_id)
+        .values('activo', *CAMPOS).first()
+    )
+    if fila is not None:
+        catalogo_id = fila['id']
+    if catalogo_id is None:
+        return 0
+
+    ventanas = []
+    if fila is not None and fila['activo']:
+        ventanas += [(filtro, fila['precio']) for filtro in _grupos(fila)]
+    if anterior:
+        ventanas += [(filtro, Decimal(str(anterior['precio']))) for filtro in _grupos(anterior)]
+    afectados = _que_incluyen(catalogo_id)
+    for filtro, precio in ventanas:
+        afectados.update(_cercanos_en(filtro, precio, 'id').values_list('id', flat=True))
+    afectados.discard(catalogo_id)
+
+    filas = catalogo.productos_publicados().filter(id__in=afectados).values(*CAMPOS)
+    total = 0
+    for base in filas:
+        _guardar_vecinos(base)
+        total += 1
+    # Despublicados que aún lo listaban: su lista ya no se muestra, se borra
+    RelacionadosProducto.objects.filter(producto_id__in=afectados, producto__activo=False).delete()
+    return total
+
+def encolar_vecinos(tipo_producto, producto_id, anterior=None, catalogo_id=None):
+    """Encola actualizar_vecinos() en la transacción actual (argumentos en JSON)"""
+    if anterior:
+        anterior = {
+            'categoria_id': anterior.get('categoria_id'),
+            'tipo_id': anterior['tipo_id'],
+            'precio': str(anterior['precio']),
+        }
+    return trabajos.encolar(
+        actualizar_vecinos, tipo_producto=tipo_producto, producto_id=producto_id,
+        anterior=anterior, catalogo_id=catalogo_id,
+    )
+
+
+# ==========================================
+# CONSULTAS
+# ==========================================
+def relacionados_de(tipo_producto, producto_id):
+    """Filas de catálogo relacionadas con el producto, en orden de puntaje"""
+    vecinos = (
+        RelacionadosProducto.objects
+        .filter(producto__tipo_producto=tipo_producto, producto__producto_id=producto_id)
+        .values_list('vecinos', flat=True).first()
+    )
+    if not vecinos:
+        return []
+    filas = {fila.id: fila for fila in catalogo.productos_publicados().filter(id__in=vecinos)}
+    return [filas[vecino] for vecino in vecinos if vecino in filas]
@@ -0,0 +1,325 @@
+# app_mascotas/reportes_ventas.py
+"""
+Resúmenes de ventas para la página de reportes.
+
+ResumenVentas guarda, por día y por mes, los pedidos, unidades, subtotal,
+IVA y total de las ventas: en total y por método de pago, categoría, tipo y
+producto. La vista de reportes lee solo esa tabla, así un rango de varios
+años cuesta unas cuantas decenas de filas.
+
+actualizar() procesa solo las ventas nuevas desde la marca de agua
+(MarcaResumen: fecha_venta e id de Venta de la última incluida). Lee Venta y
+también PedidoArchivado (por venta_id), así una venta que se archiva antes de
+resumirse no se pierde. Cada lote suma sus
+ventas a los renglones diarios, recalcula a partir de los días los meses que
+tocó y mueve la marca en la misma transacción: un corte a la mitad no cuenta
+nada dos veces. Solo se toman ventas con más de REPORTES_MARGEN segundos,
+para que una transacción que confirma tarde no quede detrás de la marca.
+
+Categoría y tipo salen de la copia que guarda cada renglón al crear el
+pedido (DetallePedido.categoria/tipo), no del producto actual: reclasificar
+un producto no mueve sus ventas pasadas, ni siquiera con reconstruir(). Solo
+los renglones sin copia usan la clasificación actual del producto.
+
+reconstruir() borra los resúmenes y los recalcula desde cero, incluidas las
+ventas archivadas sin venta_id (anteriores a que se guardara); no debe correr
+a la vez que archivar_pedidos.
+"""
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Q, Sum
+from django.utils import timezone
+
+from .carrito import CENTAVOS
+from .models import (
+    Categoria, DetallePedido, DetallePedidoArchivado, MarcaResumen, PedidoArchivado, ResumenVentas, Tipo, Venta
+)
+from .productos import CAMPOS_PRODUCTO
+
+MARCA = 'ventas'
+CAMPOS_SUMA = ('pedidos', 'unidades', 'subtotal', 'iva', 'total')
+
+
+# ==========================================
+# ACUMULAR UN LOTE DE VENTAS
+# ==========================================
+def _productos(renglones):
+    """{(campo, id): {'nombre', 'categoria_id', 'tipo_id'}} con una consulta por tipo de producto"""
+    productos = {}
+    for campo in CAMPOS_PRODUCTO:
+        ids = {renglon[f'{campo}_id'] for renglon in renglones} - {None}
+        if not ids:
+            continue
+        modelo = DetallePedido._meta.get_field(campo).related_model
+        columnas = ['id', 'nombre', 'tipo_id']
+        if any(field.name == 'categoria' for field in modelo._meta.fields):
+            columnas.append('categoria_id')
+        for producto in modelo.objects.filter(id__in=ids).values(*columnas):
+            productos[campo, producto.pop('id')] = producto
+    return productos
+
+def _repartir(importe, pesos):
+    """
+    Reparte 'importe' en proporción a 'pesos' redondeando a centavos; el
+    residuo del redondeo va al último, así las partes suman exactamente.
+    """
+    base = sum(pesos, Decimal('0'))
+    partes = [(importe * peso / base).quantize(CENTAVOS) if base else Decimal('0') for peso in pesos[:-1]]
+    return partes + [importe - sum(partes, Decimal('0'))] if pesos else []
+
+def _acumular(ventas, modelo_detalle, suma=None):
+    """
+    Suma las ventas (dicts con pedido_id, fecha_venta, metodo_pago, subtotal,
+    iva, total) por (día, dimensión, clave). En categoría, tipo y producto un
+    pedido cuenta una vez por grupo aunque tenga varios renglones en él, y el
+    IVA y total del pedido se reparten entre sus renglones según su subtotal.
+    Si se pasa 'suma' acumula sobre ella.
+    """
+    renglones = {}
+    for renglon in modelo_detalle.objects.filter(pedido_id__in=[venta['pedido_id'] for venta in ventas]).values(
+        'pedido_id', 'alimento_id', 'accesorio_id', 'mascota_id', 'cantidad', 'subtotal', 'categoria_id', 'tipo_id'
+    ):
+        renglones.setdefault(renglon['pedido_id'], []).append(renglon)
+    todos = [renglon for lista in renglones.values() for renglon in lista]
+    productos = _productos(todos)
+    # Renglones sin copia de la clasificación: la del producto actual
+    for renglon in todos:
+        if renglon['tipo_id'] is None:
+            campo = next((campo for campo in CAMPOS_PRODUCTO if renglon[f'{campo}_id']), None)
+            producto = productos.get((campo, renglon[f'{campo}_id'])) if campo else None
+            if producto:
+                renglon['categoria_id'] = producto.get('categoria_id')
+                renglon['tipo_id'] = producto['tipo_id']
+    categorias = dict(Categoria.objects.filter(
+        id__in={renglon['categoria_id'] for renglon in todos} - {None}
+    ).values_list('id', 'nombre'))
+    tipos = dict(Tipo.objects.filter(
+        id__in={renglon['tipo_id'] for renglon in todos} - {None}
+    ).values_list('id', 'nombre'))
+    metodos = dict(Venta.METODO_PAGO_CHOICES)
+
+    suma = {} if suma is None else suma
+    def sumar(fecha, dimension, clave, etiqueta, pedidos, unidades, subtotal, iva, total):
+        fila = suma.setdefault((fecha, dimension, clave), {
+            'etiqueta': etiqueta, 'pedidos': 0, 'unidades': 0,
+            'subtotal': Decimal('0'), 'iva': Decimal('0'), 'total': Decimal('0'),
+        })
+        fila['pedidos'] += pedidos
+        fila['unidades'] += unidades
+        fila['subtotal'] += subtotal
+        fila['iva'] += iva
+        fila['total'] += total
+
+    for venta in ventas:
+        fecha = timezone.localdate(venta['fecha_venta'])
+        del_pedido = renglones.get(venta['pedido_id'], [])
+        unidades = sum(renglon['cantidad'] for renglon in del_pedido)
+        for dimension, clave, etiqueta in (
+            ('total', '', 'Total'),
+            ('metodo_pago', venta['metodo_pago'], metodos.get(venta['metodo_pago'], venta['metodo_pago'])),
+        ):
+            sumar(fecha, dimension, clave, etiqueta, 1, unidades, venta['subtotal'], venta['iva'], venta['total'])
+
+        pesos = [renglon['subtotal'] for renglon in del_pedido]
+        ivas = _repartir(venta['iva'], pesos)
+        totales_renglon = _repartir(venta['total'], pesos)
+        contados = set()
+        for renglon, iva, total in zip(del_pedido, ivas, totales_renglon):
+            campo = next((campo for campo in CAMPOS_PRODUCTO if renglon[f'{campo}_id']), None)
+            if campo is None:
+                continue
+            producto_id = renglon[f'{campo}_id']
+            producto = productos.get((campo, producto_id))
+            grupos = [('producto', f'{campo}:{producto_id}', producto['nombre'] if producto else f'{campo} {producto_id}')]
+            if renglon['categoria_id']:
+                grupos.append(('categoria', str(renglon['categoria_id']), categorias.get(renglon['categoria_id'], '')))
+            if renglon['tipo_id']:
+                grupos.append(('tipo', str(renglon['tipo_id']), tipos.get(renglon['tipo_id'], '')))
+            for dimension, clave, etiqueta in grupos:
+                nuevo = (dimension, clave) not in contados
+                contados.add((dimension, clave))
+                sumar(fecha, dimension, clave, etiqueta, int(nuevo), renglon['cantidad'], renglon['subtotal'], iva, total)
+    return suma
+
+
+# ==========================================
+# GUARDAR DÍAS Y MESES
+# ==========================================
+def _inicio_mes_siguiente(mes):
+    return (mes + timedelta(days=32)).replace(day=1)
+
+def _recalcular_meses(meses):
+    """Rehace los renglones mensuales de 'meses' (días 1) sumando sus renglones diarios"""
+    for mes in meses:
+        filas = (
+            ResumenVentas.objects.filter(periodo='dia', fecha__gte=mes, fecha__lt=_inicio_mes_siguiente(mes))
+            .values('dimension', 'clave')
+            .annotate(
+                ultima_etiqueta=Max('etiqueta'), suma_pedidos=Sum('pedidos'), suma_unidades=Sum('unidades'),
+                suma_subtotal=Sum('subtotal'), suma_iva=Sum('iva'), suma_total=Sum('total'),
+            )
+        )
+        ResumenVentas.objects.filter(periodo='mes', fecha=mes).delete()
+        ResumenVentas.objects.bulk_create([
+            ResumenVentas(
+                periodo='mes', fecha=mes, dimension=fila['dimension'], clave=fila['clave'],
+                etiqueta=fila['ultima_etiqueta'], **{campo: fila[f'suma_{campo}'] for campo in CAMPOS_SUMA},
+            )
+            for fila in filas
+        ], batch_size=500)
+
+def _guardar(suma):
+    """Suma los totales del lote a los renglones diarios y recalcula los meses afectados"""
+    if not suma:
+        return
+    existentes = {
+        (fila.fecha, fila.dimension, fila.clave): fila
+        for fila in ResumenVentas.objects.filter(periodo='dia', fecha__in={fecha for fecha, _d, _c in suma})
+    }
+    nuevos, cambiados = [], []
+    for (fecha, dimension, clave), valores in suma.items():
+        fila = existentes.get((fecha, dimension, clave))
+        if fila is None:
+            nuevos.append(ResumenVentas(periodo='dia', fecha=fecha, dimension=dimension, clave=clave, **valores))
+            continue
+        for campo in CAMPOS_SUMA:
+            setattr(fila, campo, getattr(fila, campo) + valores[campo])
+        fila.etiqueta = valores['etiqueta']
+        cambiados.append(fila)
+    ResumenVentas.objects.bulk_create(nuevos, batch_size=500)
+    ResumenVentas.objects.bulk_update(cambiados, CAMPOS_SUMA + ('etiqueta',), batch_size=500)
+    _recalcular_meses({fecha.replace(day=1) for fecha, _d, _c in suma})
+
+
+# ==========================================
+# ACTUALIZAR Y RECONSTRUIR
+# ==========================================
+def _nuevas(marca, hasta, campo_id):
+    """Condición para las ventas después de la marca y antes de 'hasta'"""
+    nuevas = Q(fecha_venta__lt=hasta)
+    if marca.fecha is not None:
+        nuevas &= Q(fecha_venta__gt=marca.fecha) | Q(fecha_venta=marca.fecha, **{f'{campo_id}__gt': marca.ultimo_id})
+    return nuevas
+
+def actualizar(tamano_lote=1000):
+    """
+    Procesa las ventas posteriores a la marca en lotes de 'tamano_lote', cada
+    uno en su propia transacción. Genera un dict por lote con las ventas
+    procesadas, la nueva marca y la duración.
+    """
+    hasta = timezone.now() - timedelta(seconds=getattr(settings, 'REPORTES_MARGEN', 300))
+    while True:
+        inicio = time.monotonic()
+        with transaction.atomic():
+            marca, _creada = MarcaResumen.objects.select_for_update().get_or_create(nombre=MARCA)
+            # Venta primero (bloqueando sus pedidos frente a archivar_pedidos) y
+            # después el archivo: una venta que se archiva entre las dos
+            # consultas aparece en ambas y se cuenta una sola vez.
+            recientes = list(
+                Venta.objects.select_for_update().filter(_nuevas(marca, hasta, 'id'))
+                .order_by('fecha_venta', 'id').values(
+                    'pedido_id', 'fecha_venta', 'metodo_pago', venta_id=F('id'),
+                    subtotal=F('pedido__subtotal'), iva=F('pedido__iva'), total=F('pedido__total'),
+                )[:tamano_lote]
+            )
+            archivadas = list(
+                PedidoArchivado.objects.filter(_nuevas(marca, hasta, 'venta_id'), venta_id__isnull=False)
+                .order_by('fecha_venta', 'venta_id').values(
+                    'venta_id', 'fecha_venta', 'metodo_pago', 'subtotal', 'iva', 'total', pedido_id=F('id'),
+                )[:tamano_lote]
+            )
+            vistas = {venta['venta_id'] for venta in recientes}
+            archivadas = [venta for venta in archivadas if venta['venta_id'] not in vistas]
+            ventas = sorted(
+                recientes + archivadas, key=lambda venta: (venta['fecha_venta'], venta['venta_id'])
+            )[:tamano_lote]
+            if not ventas:
+                return
+            incluidas = {venta['venta_id'] for venta in ventas}
+            suma = _acumular([venta for venta in recientes if venta['venta_id'] in incluidas], DetallePedido)
+            _guardar(_acumular(
+                [venta for venta in archivadas if venta['venta_id'] in incluidas], DetallePedidoArchivado, suma
+            ))
+            marca.fecha, marca.ultimo_id = ventas[-1]['fecha_venta'], ventas[-1]['venta_id']
+            marca.save()
+        yield {'ventas': len(ventas), 'marca': marca.fecha, 'segundos': time.monotonic() - inicio}
+
+def reconstruir(tamano_lote=1000):
+    """
+    Borra todos los resúmenes, suma las ventas archivadas sin venta_id y
+    después procesa las demás (Venta y archivo) desde el principio con actualizar().
+    Genera un dict por lote como actualizar().
+    """
+    with transaction.atomic():
+        MarcaResumen.objects.update_or_create(nombre=MARCA, defaults={'fecha': None, 'ultimo_id': 0})
+        ResumenVentas.objects.all().delete()
+
+    ultimo = 0
+    while True:
+        inicio = time.monotonic()
+        with transaction.atomic():
+            ventas = list(
+                PedidoArchivado.objects.filter(
+                    id__gt=ultimo, fecha_venta__isnull=False, venta_id__isnull=True
+                ).order_by('id').values(
+                    'id', 'fecha_venta', 'metodo_pago', 'subtotal', 'iva', 'total', pedido_id=F('id'),
+                )[:tamano_lote]
+            )
+            if not ventas:
+                break
+            _guardar(_acumular(ventas, DetallePedidoArchivado))
+        ultimo = ventas[-1]['id']
+        yield {'ventas': len(ventas), 'marca': None, 'segundos': time.monotonic() - inicio}
+    yield from actualizar(tamano_lote)
+
+
+# ==========================================
+# LECTURA (vista de reportes)
+# ==========================================
+def _con_ticket(fila):
+    fila['ticket_promedio'] = fila['total'] / fila['pedidos'] if fila['pedidos'] else Decimal('0')
+    return fila
+
+def _rango(periodo, desde, hasta):
+    if periodo == 'mes':
+        desde = desde.replace(day=1)
+    return ResumenVentas.objects.filter(periodo=periodo, fecha__gte=desde, fecha__lte=hasta)
+
+def totales(periodo, desde, hasta):
+    """Totales del rango (dimensión 'total')"""
+    fila = _rango(periodo, desde, hasta).filter(dimension='total').aggregate(
+        **{campo: Sum(campo) for campo in CAMPOS_SUMA}
+    )
+    return _con_ticket({campo: valor or 0 for campo, valor in fila.items()})
+
+def serie(periodo, desde, hasta):
+    """Un renglón por día o mes del rango (dimensión 'total')"""
+    return [
+        _con_ticket(fila) for fila in
+        _rango(periodo, desde, hasta).filter(dimension='total').order_by('fecha').values('fecha', *CAMPOS_SUMA)
+    ]
+
+def ranking(periodo, dimension, desde, hasta, limite=20):
+    """Los 'limite' grupos de 'dimension' con más venta en el rango"""
+    filas = (
+        _rango(periodo, desde, hasta).filter(dimension=dimension)
+        .values('clave')
+        .annotate(
+            ultima_etiqueta=Max('etiqueta'), suma_pedidos=Sum('pedidos'), suma_unidades=Sum('unidades'),
+            suma_subtotal=Sum('subtotal'), suma_iva=Sum('iva'), suma_total=Sum('total'),
+        )
+        .order_by('-suma_total')[:limite]
+    )
+    return [
+        _con_ticket({'clave': fila['clave'], 'etiqueta': fila['ultima_etiqueta'],
+                     **{campo: fila[f'suma_{campo}'] for campo in CAMPOS_SUMA}})
+        for fila in filas
+    ]
+
+def marca():
+    """Fecha de la última venta incluida en los resúmenes (None si nunca se actualizaron)"""
+    return MarcaResumen.objects.filter(nombre=MARCA).values_list('fecha', flat=True).first()
@@ -0,0 +1,176 @@
+# app_mascotas/reservas.py
+"""
+Reservas de stock por renglón del carrito.
+
+Agregar un producto al carrito aparta las unidades en ReservaStock durante
+RESERVA_STOCK_TTL segundos. Alimento, Accesorio y ProductoCatalogo guardan la
+suma de las reservas en stock_reservado, así el disponible (stock -
+stock_reservado) se lee de la misma fila del producto y los listados no
+necesitan una subconsulta por producto.
+
+stock_reservado solo se mueve con UPDATE ... SET stock_reservado =
+stock_reservado + n. Al reservar, el UPDATE lleva la condición
+stock >= stock_reservado + n: si otra petición se llevó las últimas unidades
+no actualiza ninguna fila y se lanza StockInsuficiente.
+
+Las reservas vencidas siguen contando hasta que liberar_vencidas() (comando
+liberar_reservas) las borra por lotes; reservar() libera antes las vencidas del
+mismo producto cuando no alcanza el stock.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Alimento, Accesorio, ProductoCatalogo, ReservaStock
+
+MODELOS_RESERVA = {'alimento': Alimento, 'accesorio': Accesorio}
+
+
+class StockInsuficiente(Exception):
+    """No hay unidades disponibles para la cantidad pedida"""
+
+    def __init__(self, producto, disponible):
+        self.producto = producto
+        self.disponible = disponible
+        super().__init__(f'Solo hay {disponible} unidades disponibles de {producto}')
+
+
+def vencimiento():
+    return timezone.now() + timedelta(seconds=getattr(settings, 'RESERVA_STOCK_TTL', 900))
+
+
+# ==========================================
+# CONTADORES
+# ==========================================
+def _restar(campo, cantidades):
+    """
+    Resta {producto_id: cantidad} de stock_reservado con un UPDATE por tabla
+    (producto y catálogo); nunca baja de cero.
+    """
+    for queryset, llave in (
+        (MODELOS_RESERVA[campo].objects.filter(id__in=cantidades), 'id'),
+        (ProductoCatalogo.objects.filter(tipo_producto=campo, producto_id__in=cantidades), 'producto_id'),
+    ):
+        delta = Case(
+            *[When(**{llave: producto_id}, then=Value(cantidad)) for producto_id, cantidad in cantidades.items()],
+            default=Value(0), output_field=IntegerField(),
+        )
+        extra = {'fecha_actualizacion': timezone.now()} if queryset.model is ProductoCatalogo else {}
+        queryset.update(stock_reservado=Greatest(F('stock_reservado') - delta, Value(0)), **extra)
+
+def _apartar(campo, producto_id, cantidad):
+    """UPDATE condicional: aparta 'cantidad' solo si alcanza el stock. Devuelve si lo hizo."""
+    apartado = MODELOS_RESERVA[campo].objects.filter(
+        id=producto_id, activo=True, stock__gte=F('stock_reservado') + cantidad
+    ).update(stock_reservado=F('stock_reservado') + cantidad)
+    if apartado:
+        ProductoCatalogo.objects.filter(tipo_producto=campo, producto_id=producto_id).update(
+            stock_reservado=F('stock_reservado') + cantidad, fecha_actualizacion=timezone.now()
+        )
+    return bool(apartado)
+
+
+# ==========================================
+# RESERVAR Y LIBERAR
+# ==========================================
+def reservar(carrito_id, campo, producto_id, cantidad):
+    """
+    Deja reservadas 'cantidad' unidades (la cantidad total del renglón, no un
+    incremento) y renueva el vencimiento. Con cantidad <= 0 libera la reserva.
+    Lanza StockInsuficiente sin cambiar nada si no hay unidades suficientes.
+    """
+    with transaction.atomic():
+        reserva = ReservaStock.objects.select_for_update().filter(
+            carrito_id=carrito_id, tipo_producto=campo, producto_id=producto_id
+        ).first()
+        actual = reserva.cantidad if reserva else 0
+        if cantidad <= 0:
+            if reserva:
+                liberar(ReservaStock.objects.filter(id=reserva.id))
+            return
+
+        delta = cantidad - actual
+        if delta > 0 and not _apartar(campo, producto_id, delta):
+            liberar(ReservaStock.objects.filter(
+                tipo_producto=campo, producto_id=producto_id, expira__lte=timezone.now()
+            ).exclude(carrito_id=carrito_id))
+            if not _apartar(campo, producto_id, delta):
+                producto = MODELOS_RESERVA[campo].objects.filter(id=producto_id).first()
+                raise StockInsuficiente(producto, actual + (producto.disponible if producto else 0))
+        elif delta < 0:
+            _restar(campo, {producto_id: -delta})
+
+        if reserva:
+            reserva.cantidad = cantidad
+            reserva.expira = vencimiento()
+            reserva.save(update_fields=['cantidad', 'expira'])
+        else:
+            ReservaStock.objects.create(
+                carrito_id=carrito_id, tipo_producto=campo, producto_id=producto_id,
+                cantidad=cantidad, expira=vencimiento(),
+            )
+
+def liberar(queryset):
+    """
+    Borra las reservas del queryset y devuelve sus unidades: un UPDATE por
+    tipo de producto (con Case por id) más el DELETE. Devuelve cuántas borró.
+    """
+    with transaction.atomic():
+        filas = list(queryset.select_for_update().values_list('id', 'tipo_producto', 'producto_id', 'cantidad'))
+        if not filas:
+            return 0
+        por_tipo = {}
+        for _id, campo, producto_id, cantidad in filas:
+            cantidades = por_tipo.setdefault(campo, {})
+            cantidades[producto_id] = cantidades.get(producto_id, 0) + cantidad
+        for campo, cantidades in por_tipo.items():
+            _restar(campo, cantidades)
+        ReservaStock.objects.filter(id__in=[fila[0] for fila in filas]).delete()
+    return len(filas)
+
+def liberar_vencidas(tamano_lote=1000):
+    """
+    Libera las reservas vencidas en lotes de 'tamano_lote', cada uno en su
+    propia transacción corta. Genera cuántas liberó en cada lote.
+    """
+    while True:
+        ids = list(
+            ReservaStock.objects.filter(expira__lte=timezone.now())
+            .order_by('expira').values_list('id', flat=True)[:tamano_lote]
+        )
+        if not ids:
+            return
+        yield liberar(ReservaStock.objects.filter(id__in=ids, expira__lte=timezone.now()))
+
+def reconciliar_reservados(corregir=True):
+    """
+    Recalcula stock_reservado desde ReservaStock (índice por producto) para
+    los productos cuyo contador no coincide, p. ej. tras borrar carritos
+    desde el admin. Devuelve {tipo_producto: productos_corregidos}.
+    """
+    corregidos = {}
+    for campo, modelo in MODELOS_RESERVA.items():
+        reales = Coalesce(Subquery(
+            ReservaStock.objects.filter(tipo_producto=campo, producto_id=OuterRef('id'))
+            .values('producto_id').annotate(total=Sum('cantidad')).values('total')
+        ), 0)
+        distintos = modelo.objects.annotate(real=reales).exclude(stock_reservado=F('real'))
+        if not corregir:
+            corregidos[campo] = distintos.count()
+            continue
+        with transaction.atomic():
+            ids = list(distintos.values_list('id', flat=True))
+            modelo.objects.filter(id__in=ids).update(stock_reservado=reales)
+            reales_catalogo = Coalesce(Subquery(
+                ReservaStock.objects.filter(tipo_producto=campo, producto_id=OuterRef('producto_id'))
+                .values('producto_id').annotate(total=Sum('cantidad')).values('total')
+            ), 0)
+            ProductoCatalogo.objects.filter(tipo_producto=campo, producto_id__in=ids).update(
+                stock_reservado=reales_catalogo, fecha_actualizacion=timezone.now()
+            )
+        corregidos[campo] = len(ids)
+    return corregidos
@@ -0,0 +1,209 @@
+# app_mascotas/signals.py
+"""
+Señales que mantienen sincronizadas las estructuras derivadas del catálogo.
+Se registran en AppMascotasConfig.ready().
+"""
+from decimal import Decimal
+
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.db import transaction
+from django.dispatch import receiver
+
+from . import autocompletado, busqueda, busqueda_difusa, cache_catalogo, carrito, catalogo, facetas, relacionados
+from .models import Categoria, Tipo, Alimento, Accesorio, Mascota, ProductoCatalogo
+
+PRODUCTOS = (Alimento, Accesorio, Mascota)
+
+# ==========================================
+# ESTADO ANTERIOR DE LOS PRODUCTOS
+# ==========================================
+# Campos cuyo valor anterior necesitan las facetas y los productos relacionados
+CAMPOS_SEGUIDOS = {
+    Alimento: facetas.CAMPOS_ESTADO,
+    Accesorio: facetas.CAMPOS_ESTADO,
+    Mascota: ('tipo_id', 'precio', 'estado'),
+}
+
+@receiver(pre_save, sender=Alimento, dispatch_uid='estado_anterior_alimento')
+@receiver(pre_save, sender=Accesorio, dispatch_uid='estado_anterior_accesorio')
+@receiver(pre_save, sender=Mascota, dispatch_uid='estado_anterior_mascota')
+def capturar_estado_anterior(sender, instance, raw=False, **kwargs):
+    """Guarda en la instancia los valores previos que usan las estructuras derivadas"""
+    instance._estado_anterior = None
+    if raw or instance.pk is None:
+        return
+    instance._estado_anterior = (
+        sender.objects.filter(pk=instance.pk).values(*CAMPOS_SEGUIDOS[sender]).first()
+    )
+
+# ==========================================
+# ÍNDICE DE BÚSQUEDA
+# ==========================================
+def producto_guardado(sender, instance, raw=False, **kwargs):
+    if not raw:
+        busqueda.indexar(instance)
+
+def producto_eliminado(sender, instance, **kwargs):
+    busqueda.desindexar(instance)
+
+for modelo in PRODUCTOS:
+    post_save.connect(producto_guardado, sender=modelo, dispatch_uid=f'busqueda_guardar_{modelo.__name__}')
+    post_delete.connect(producto_eliminado, sender=modelo, dispatch_uid=f'busqueda_eliminar_{modelo.__name__}')
+
+@receiver(post_save, sender=Categoria, dispatch_uid='busqueda_categoria')
+def categoria_guardada(sender, instance, created, raw=False, **kwargs):
+    """El nombre de la categoría forma parte de los documentos de sus productos"""
+    if not created and not raw:
+        busqueda.indexar_lote(instance.alimentos.all())
+        busqueda.indexar_lote(instance.accesorios.all())
+
+@receiver(post_save, sender=Tipo, dispatch_uid='busqueda_tipo')
+def tipo_guardado(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        busqueda.indexar_lote(instance.alimentos.all())
+        busqueda.indexar_lote(instance.accesorios.all())
+        busqueda.indexar_lote(instance.mascotas.all())
+
+# ==========================================
+# FACETAS DEL CATÁLOGO
+# ==========================================
+@receiver(post_save, sender=Alimento, dispatch_uid='facetas_guardar_alimento')
+@receiver(post_save, sender=Accesorio, dispatch_uid='facetas_guardar_accesorio')
+def faceta_producto_guardado(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    estado_anterior = None if created else getattr(instance, '_estado_anterior', None)
+    facetas.producto_guardado(instance, estado_anterior)
+
+@receiver(post_delete, sender=Alimento, dispatch_uid='facetas_eliminar_alimento')
+@receiver(post_delete, sender=Accesorio, dispatch_uid='facetas_eliminar_accesorio')
+def faceta_producto_eliminado(sender, instance, **kwargs):
+    facetas.producto_eliminado(instance)
+
+# ==========================================
+# AUTOCOMPLETADO
+# ==========================================
+def autocompletado_producto_guardado(sender, instance, raw=False, **kwargs):
+    if not raw:
+        autocompletado.producto_guardado(instance)
+
+def autocompletado_producto_eliminado(sender, instance, **kwargs):
+    autocompletado.producto_eliminado(instance)
+
+for modelo in PRODUCTOS:
+    post_save.connect(autocompletado_producto_guardado, sender=modelo, dispatch_uid=f'autocompletado_guardar_{modelo.__name__}')
+    post_delete.connect(autocompletado_producto_eliminado, sender=modelo, dispatch_uid=f'autocompletado_eliminar_{modelo.__name__}')
+
+@receiver(post_save, sender=Categoria, dispatch_uid='autocompletado_categoria_guardada')
+def autocompletado_categoria_guardada(sender, instance, raw=False, **kwargs):
+    if not raw:
+        autocompletado.categoria_guardada(instance)
+
+@receiver(post_delete, sender=Categoria, dispatch_uid='autocompletado_categoria_eliminada')
+def autocompletado_categoria_eliminada(sender, instance, **kwargs):
+    autocompletado.categoria_eliminada(instance)
+
+# ==========================================
+# CATÁLOGO UNIFICADO
+# ==========================================
+def catalogo_producto_guardado(sender, instance, raw=False, **kwargs):
+    if not raw:
+        catalogo.sincronizar(instance)
+
+def catalogo_producto_eliminado(sender, instance, **kwargs):
+    catalogo.eliminar(instance)
+
+for modelo in PRODUCTOS:
+    post_save.connect(catalogo_producto_guardado, sender=modelo, dispatch_uid=f'catalogo_guardar_{modelo.__name__}')
+    post_delete.connect(catalogo_producto_eliminado, sender=modelo, dispatch_uid=f'catalogo_eliminar_{modelo.__name__}')
+
+@receiver(post_save, sender=Categoria, dispatch_uid='catalogo_categoria')
+@receiver(post_save, sender=Tipo, dispatch_uid='catalogo_tipo')
+def catalogo_clasificacion_guardada(sender, instance, created, raw=False, **kwargs):
+    """El nombre de la categoría o tipo forma parte de la representación de sus productos"""
+    if not created and not raw:
+        catalogo.marcar_modificados(**{sender.__name__.lower(): instance})
+
+# ==========================================
+# CACHÉ DE FRAGMENTOS DEL CATÁLOGO
+# ==========================================
+def catalogo_modificado(sender, **kwargs):
+    cache_catalogo.invalidar_catalogo()
+
+for modelo in PRODUCTOS + (Categoria,):
+    post_save.connect(catalogo_modificado, sender=modelo, dispatch_uid=f'cache_guardar_{modelo.__name__}')
+    post_delete.connect(catalogo_modificado, sender=modelo, dispatch_uid=f'cache_eliminar_{modelo.__name__}')
+
+# ==========================================
+# VOCABULARIO DE BÚSQUEDA DIFUSA
+# ==========================================
+def vocabulario_guardado(sender, instance, raw=False, **kwargs):
+    if not raw:
+        busqueda_difusa.registrar_instancia(instance)
+
+for modelo in PRODUCTOS + (Categoria, Tipo):
+    post_save.connect(vocabulario_guardado, sender=modelo, dispatch_uid=f'vocabulario_guardar_{modelo.__name__}')
+
+# ==========================================
+# PRODUCTOS RELACIONADOS
+# ==========================================
+def relacionados_producto_guardado(sender, instance, created, raw=False, **kwargs):
+    """
+    Recalcula los relacionados del producto si cambió su categoría, tipo o
+    precio, y encola el recálculo de los productos de sus grupos viejos y nuevos
+    """
+    if raw:
+        return
+    estado_anterior = None if created else getattr(instance, '_estado_anterior', None)
+    if relacionados.requiere_recalculo(instance, estado_anterior):
+        tipo_producto, producto_id = busqueda.tipo_de(instance), instance.id
+        transaction.on_commit(lambda: relacionados.recalcular_producto(tipo_producto, producto_id))
+        relacionados.encolar_vecinos(tipo_producto, producto_id, estado_anterior)
+
+def relacionados_capturar_catalogo(sender, instance, **kwargs):
+    """Guarda el id de catálogo antes de que se borre su fila (lo necesita el trabajo)"""
+    instance._catalogo_id = (
+        ProductoCatalogo.objects.filter(tipo_producto=busqueda.tipo_de(instance), producto_id=instance.id)
+        .values_list('id', flat=True).first()
+    )
+
+def relacionados_producto_eliminado(sender, instance, **kwargs):
+    """Los productos que lo listaban o comparten su grupo se recalculan en un trabajo"""
+    catalogo_id = getattr(instance, '_catalogo_id', None)
+    if catalogo_id is None:
+        return
+    anterior = {
+        'categoria_id': getattr(instance, 'categoria_id', None), 'tipo_id': instance.tipo_id, 'precio': instance.precio,
+    }
+    relacionados.encolar_vecinos(busqueda.tipo_de(instance), instance.id, anterior, catalogo_id)
+
+for modelo in PRODUCTOS:
+    post_save.connect(relacionados_producto_guardado, sender=modelo, dispatch_uid=f'relacionados_guardar_{modelo.__name__}')
+    pre_delete.connect(relacionados_capturar_catalogo, sender=modelo, dispatch_uid=f'relacionados_capturar_{modelo.__name__}')
+    post_delete.connect(relacionados_producto_eliminado, sender=modelo, dispatch_uid=f'relacionados_eliminar_{modelo.__name__}')
+
+# ==========================================
+# RESUMEN DE LOS CARRITOS
+# ==========================================
+def carrito_precio_cambiado(sender, instance, created, raw=False, **kwargs):
+    """Un cambio de precio ajusta el subtotal y el resumen de los carritos que tienen el producto"""
+    if raw or created:
+        return
+    estado_anterior = getattr(instance, '_estado_anterior', None)
+    if estado_anterior is None:
+        return
+    diferencia = Decimal(str(instance.precio)) - Decimal(str(estado_anterior['precio']))
+    if diferencia:
+        campo = busqueda.tipo_de(instance)
+        carrito.repreciar_producto(campo, instance.id, diferencia)
+        carrito.invalidar_por_producto(campo, instance.id)
+
+def carrito_producto_eliminado(sender, instance, **kwargs):
+    """Antes del borrado en cascada de los renglones se descuentan de los carritos"""
+    campo = busqueda.tipo_de(instance)
+    carrito.quitar_producto(campo, instance.id)
+    carrito.invalidar_por_producto(campo, instance.id)
+
+for modelo in (Alimento, Accesorio):
+    post_save.connect(carrito_precio_cambiado, sender=modelo, dispatch_uid=f'carrito_precio_{modelo.__name__}')
+    pre_delete.connect(carrito_producto_eliminado, sender=modelo, dispatch_uid=f'carrito_eliminar_{modelo.__name__}')
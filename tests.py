@@ -1,3 +1,76 @@
-from django.test import TestCase
+import threading
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import connection
+from django.test import TransactionTestCase
+
+from . import carrito as servicio_carrito
+from .models import Usuario, Categoria, Tipo, Alimento, Carrito, ItemCarrito, ReservaStock
+
+
+class AgregarAlCarritoConcurrenteTests(TransactionTestCase):
+    """Varias peticiones simultáneas al mismo carrito no duplican ni pierden cantidades"""
+
+    PETICIONES = 8
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user('concurrente', 'concurrente@example.com', 'pass12345')
+        self.alimento = Alimento.objects.create(
+            nombre='Croquetas Premium',
+            categoria=Categoria.objects.create(nombre='Croquetas'),
+            tipo=Tipo.objects.create(nombre='Perro'),
+            precio=Decimal('120.50'),
+            stock=50,
+        )
+
+    def _agregar_en_paralelo(self):
+        """
+        Llama a carrito.agregar_item (lo que usa la vista agregar_al_carrito)
+        desde varios hilos; la vista convierte cualquier error en un mensaje y
+        un 302, así que se llama al servicio para que las excepciones lleguen
+        aquí. Devuelve los errores.
+        """
+        barrera = threading.Barrier(self.PETICIONES)
+        errores = []
+
+        def agregar():
+            try:
+                barrera.wait()
+                servicio_carrito.agregar_item(self.usuario, 'alimento', self.alimento.id, 1)
+            except Exception as error:
+                errores.append(error)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=agregar) for _ in range(self.PETICIONES)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return errores
+
+    def _comprobar_estado(self, cantidad):
+        """Un carrito, un renglón, totales y stock reservado iguales a 'cantidad'"""
+        carrito = Carrito.objects.get(usuario=self.usuario, activo=True)
+        item = ItemCarrito.objects.get(carrito=carrito)
+        self.assertEqual(item.cantidad, cantidad)
+        self.assertEqual(carrito.num_items, 1)
+        self.assertEqual(carrito.subtotal, self.alimento.precio * cantidad)
+        self.assertEqual(ReservaStock.objects.get(carrito=carrito).cantidad, cantidad)
+        self.alimento.refresh_from_db()
+        self.assertEqual(self.alimento.stock, 50)
+        self.assertEqual(self.alimento.stock_reservado, cantidad)
+
+    def test_peticiones_simultaneas_suman_en_un_solo_renglon(self):
+        errores = self._agregar_en_paralelo()
+
+        self.assertEqual(errores, [])
+        self._comprobar_estado(self.PETICIONES)
+
+    def test_segunda_ronda_actualiza_el_mismo_renglon(self):
+        self.assertEqual(self._agregar_en_paralelo(), [])
+        errores = self._agregar_en_paralelo()
+
+        self.assertEqual(errores, [])
+        self.assertEqual(Carrito.objects.filter(usuario=self.usuario, activo=True).count(), 1)
+        self._comprobar_estado(self.PETICIONES * 2)
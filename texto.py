@@ -0,0 +1,17 @@
+# app_mascotas/texto.py
+"""
+Normalización de texto compartida por los índices del catálogo.
+"""
+import re
+import unicodedata
+
+
+def normalizar(texto):
+    """Minúsculas, sin acentos y con los espacios colapsados: 'Siamés  Azul' -> 'siames azul'"""
+    texto = unicodedata.normalize('NFKD', str(texto or ''))
+    texto = ''.join(caracter for caracter in texto if not unicodedata.combining(caracter))
+    return re.sub(r'\s+', ' ', texto.lower()).strip()
+
+def palabras(texto):
+    """Palabras normalizadas del texto"""
+    return re.findall(r'\w+', normalizar(texto))
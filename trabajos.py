@@ -0,0 +1,127 @@
+# app_mascotas/trabajos.py
+"""
+Cola de trabajos persistente sobre la base de datos (sin broker externo).
+
+encolar() inserta una fila de Trabajo con la ruta de la función y sus
+argumentos (JSON). Como es un INSERT normal, si se llama dentro de la
+transacción del pedido el trabajo se guarda o se pierde junto con él.
+
+El comando run_jobs toma trabajos listos marcándolos 'en_proceso' con un
+plazo de bloqueo (SELECT ... FOR UPDATE SKIP LOCKED en PostgreSQL; en SQLite
+las transacciones IMMEDIATE ya serializan la toma), los ejecuta cada uno en
+su propia transacción y, si fallan, los reprograma con espera exponencial
+hasta agotar max_intentos. Un trabajo cuyo worker murió se retoma cuando vence
+bloqueado_hasta, así las tareas deben poder repetirse sin efectos dobles.
+"""
+import random
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Trabajo
+
+
+def ruta_de(funcion):
+    return f'{funcion.__module__}.{funcion.__qualname__}'
+
+def encolar(funcion, *, max_intentos=5, ejecutar_despues=None, **argumentos):
+    """Programa funcion(**argumentos); los argumentos deben ser serializables a JSON"""
+    return Trabajo.objects.create(
+        tarea=ruta_de(funcion),
+        argumentos=argumentos,
+        max_intentos=max_intentos,
+        ejecutar_despues=ejecutar_despues or timezone.now(),
+    )
+
+
+# ==========================================
+# EJECUCIÓN
+# ==========================================
+def espera_reintento(intentos):
+    """Espera exponencial con variación aleatoria para no reintentar todos a la vez"""
+    base = getattr(settings, 'TRABAJOS_REINTENTO_BASE', 30)
+    maximo = getattr(settings, 'TRABAJOS_REINTENTO_MAXIMO', 3600)
+    segundos = min(base * 2 ** max(intentos - 1, 0), maximo)
+    return timedelta(seconds=segundos * random.uniform(0.75, 1.25))
+
+def tomar(trabajador, cantidad=10):
+    """
+    Marca como 'en_proceso' hasta 'cantidad' trabajos listos (pendientes cuya
+    hora llegó o en proceso con el bloqueo vencido) y los devuelve.
+    """
+    ahora = timezone.now()
+    listos = (
+        Q(estado='pendiente', ejecutar_despues__lte=ahora)
+        | Q(estado='en_proceso', bloqueado_hasta__lt=ahora)
+    )
+    with transaction.atomic():
+        ids = list(
+            Trabajo.objects.select_for_update(skip_locked=True).filter(listos)
+            .order_by('ejecutar_despues').values_list('id', flat=True)[:cantidad]
+        )
+        if not ids:
+            return []
+        Trabajo.objects.filter(listos, id__in=ids).update(
+            estado='en_proceso',
+            trabajador=trabajador,
+            intentos=F('intentos') + 1,
+            bloqueado_hasta=ahora + timedelta(seconds=getattr(settings, 'TRABAJOS_BLOQUEO', 300)),
+            fecha_actualizacion=ahora,
+        )
+    return list(
+        Trabajo.objects.filter(id__in=ids, trabajador=trabajador, estado='en_proceso').order_by('ejecutar_despues')
+    )
+
+def ejecutar(trabajo):
+    """
+    Ejecuta el trabajo en su propia transacción. Si falla lo reprograma (o lo
+    marca 'fallido' al agotar los intentos). Devuelve True si terminó bien.
+    """
+    propio = Trabajo.objects.filter(id=trabajo.id, trabajador=trabajo.trabajador, estado='en_proceso')
+    try:
+        with transaction.atomic():
+            import_string(trabajo.tarea)(**trabajo.argumentos)
+    except Exception:
+        ahora = timezone.now()
+        if trabajo.intentos >= trabajo.max_intentos:
+            cambios = {'estado': 'fallido'}
+        else:
+            cambios = {'estado': 'pendiente', 'ejecutar_despues': ahora + espera_reintento(trabajo.intentos)}
+        propio.update(bloqueado_hasta=None, ultimo_error=traceback.format_exc(), fecha_actualizacion=ahora, **cambios)
+        trabajo.estado = cambios['estado']
+        return False
+    propio.update(estado='completado', bloqueado_hasta=None, ultimo_error='', fecha_actualizacion=timezone.now())
+    trabajo.estado = 'completado'
+    return True
+
+def trabajar(trabajador, tamano_lote=10, intervalo=1.0, una_vez=False, detener=None):
+    """
+    Ciclo de un worker: toma lotes y los ejecuta; sin trabajos espera
+    'intervalo' segundos (o termina si 'una_vez'). 'detener' es un
+    threading.Event opcional. Genera (trabajo, exito) por cada ejecución.
+    """
+    while detener is None or not detener.is_set():
+        trabajos = tomar(trabajador, tamano_lote)
+        if not trabajos:
+            if una_vez:
+                return
+            if detener is not None:
+                detener.wait(intervalo)
+            else:
+                time.sleep(intervalo)
+            continue
+        for trabajo in trabajos:
+            yield trabajo, ejecutar(trabajo)
+
+def purgar_completados(dias=None):
+    """Borra los trabajos completados hace más de 'dias' días; devuelve cuántos"""
+    if dias is None:
+        dias = getattr(settings, 'TRABAJOS_CONSERVAR_DIAS', 7)
+    limite = timezone.now() - timedelta(days=dias)
+    return Trabajo.objects.filter(estado='completado', fecha_actualizacion__lt=limite).delete()[0]
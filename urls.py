@@ -47,6 +47,7 @@ urlpatterns = [
     path('pedidos/', views.ver_pedidos_admin, name='ver_pedidos'),
 path('pedidos/<int:id>/', views.detalle_pedido_admin, name='detalle_pedido'),
 path('pedidos/cambiar-estado/<int:id>/', views.cambiar_estado_pedido, name='cambiar_estado_pedido'),
+path('pedidos/cambiar-estado/', views.cambiar_estado_pedidos, name='cambiar_estado_pedidos'),
 # AÑADE ESTA LÍNEA ↓↓↓
 path('pedidos/eliminar/<int:id>/', views.eliminar_pedido, name='eliminar_pedido'),
 
@@ -58,4 +59,7 @@ path('pedidos/eliminar/<int:id>/', views.eliminar_pedido, name='eliminar_pedido'
     
     # ============ REPORTES ============
     path('reportes/', views.reportes, name='reportes'),
+    
+    # ============ MONITOREO ============
+    path('monitoreo/busqueda/', views.monitoreo_busqueda, name='monitoreo_busqueda'),
 ]
\ No newline at end of file
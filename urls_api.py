@@ -0,0 +1,16 @@
+# app_mascotas/urls_api.py
+from django.urls import path
+from . import api
+
+app_name = 'api'
+
+urlpatterns = [
+    # ============ PRODUCTOS ============
+    path('productos/', api.lista_productos, name='lista_productos'),
+    path('productos/<str:tipo_producto>/<int:producto_id>/', api.detalle_producto, name='detalle_producto'),
+    
+    # ============ CATEGORÍAS ============
+    path('categorias/', api.lista_categorias, name='lista_categorias'),
+    path('categorias/<int:categoria_id>/productos/', api.productos_categoria, name='productos_categoria'),
+    path('categorias/<int:categoria_id>/tipos/<int:tipo_id>/productos/', api.productos_categoria, name='productos_categoria_tipo'),
+]
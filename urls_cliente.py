@@ -22,11 +22,13 @@ urlpatterns = [
     
     # ============ BÚSQUEDA ============
     path('buscar/', views_cliente.buscar_productos, name='buscar_productos'),
+    path('buscar/autocompletar/', views_cliente.autocompletar, name='autocompletar'),
     
     # ============ CARRITO DE COMPRAS ============
     path('carrito/', views_cliente.ver_carrito, name='ver_carrito'),
     path('carrito/agregar/', views_cliente.agregar_al_carrito, name='agregar_al_carrito'),
     path('carrito/actualizar/', views_cliente.actualizar_carrito, name='actualizar_carrito'),
+    path('carrito/actualizar-lote/', views_cliente.actualizar_carrito_lote, name='actualizar_carrito_lote'),
     path('carrito/eliminar/<int:item_id>/', views_cliente.eliminar_del_carrito, name='eliminar_del_carrito'),
     path('checkout/', views_cliente.checkout, name='checkout'),
     
@@ -1,23 +1,29 @@
 # app_mascotas/views.py
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404, JsonResponse
 from django.contrib import messages
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.views.decorators.http import require_POST
 from django.db.models import Q, Sum
 from decimal import Decimal
 import datetime
+import json
 import uuid
 
 from .models import (
     Usuario, Categoria, Tipo, Alimento, 
     Accesorio, Mascota, Carrito, ItemCarrito,
-    Pedido, DetallePedido, Venta
+    Pedido, DetallePedido, Venta, PedidoArchivado, ResumenVentas
 )
 from .forms import (
     RegistroForm, LoginForm, CategoriaForm, TipoForm,
     AlimentoForm, AccesorioForm, MascotaForm, 
-    UsuarioForm, PedidoForm, VentaForm, BusquedaForm, FiltroAlimentosForm
+    UsuarioForm, PedidoForm, VentaForm, BusquedaForm, FiltroAlimentosForm, FiltroReportesForm
 )
+from . import archivo_pedidos, cache_busqueda, pedidos as servicio_pedidos, reportes_ventas
+from .paginacion import paginar_keyset
+from .productos import resolver_productos
 
 # ==========================================
 # FUNCIONES DE AYUDA
@@ -45,7 +51,7 @@ def inicio_administracion(request):
     total_usuarios = Usuario.objects.count()
     total_productos = Alimento.objects.count() + Accesorio.objects.count()
     total_mascotas = Mascota.objects.count()
-    total_pedidos = Pedido.objects.count()
+    total_pedidos = Pedido.objects.count() + PedidoArchivado.objects.count()
     
     context = {
         'total_usuarios': total_usuarios,
@@ -504,9 +510,10 @@ def eliminar_mascota(request, id):
 @user_passes_test(es_administrador)
 def ver_pedidos_admin(request):
     """Ver todos los pedidos"""
-    pedidos = Pedido.objects.all().order_by('-fecha_pedido')
+    pedidos = Pedido.objects.select_related('usuario').order_by('-fecha_pedido')
     context = {
         'pedidos': pedidos,
+        'estados': Pedido.ESTADO_CHOICES,  # Destinos del cambio en bloque; se validan en pedidos.TRANSICIONES
         'titulo': 'Pedidos - Administración',
     }
     return render(request, 'administracion/pedido/ver_pedidos.html', context)
@@ -518,6 +525,7 @@ def detalle_pedido_admin(request, id):
     pedido = get_object_or_404(Pedido, id=id)
     context = {
         'pedido': pedido,
+        'detalles': resolver_productos(pedido.detalles.all(), relacionados=('tipo', 'categoria')),
         'titulo': f'Pedido {pedido.numero_pedido}',
     }
     return render(request, 'administracion/pedido/detalle_pedido.html', context)
@@ -525,17 +533,60 @@ def detalle_pedido_admin(request, id):
 @login_required
 @user_passes_test(es_administrador)
 def cambiar_estado_pedido(request, id):
-    """Cambiar estado de pedido"""
+    """Cambiar estado de pedido (solo a los estados que permite pedidos.TRANSICIONES)"""
     pedido = get_object_or_404(Pedido, id=id)
     
     if request.method == 'POST':
-        nuevo_estado = request.POST.get('estado')
-        if nuevo_estado in dict(Pedido.ESTADO_CHOICES).keys():
-            pedido.estado = nuevo_estado
-            pedido.save()
-            messages.success(request, f'Estado del pedido actualizado')
+        try:
+            resultado = servicio_pedidos.cambiar_estado([pedido.id], request.POST.get('estado'), request.user)
+        except servicio_pedidos.TransicionInvalida as e:
+            messages.error(request, str(e))
+        else:
+            if resultado['actualizados']:
+                messages.success(request, 'Estado del pedido actualizado')
+            else:
+                messages.warning(request, resultado['omitidos'][0]['motivo'])
+        return redirect('administracion:detalle_pedido', id=id)
     
-    return redirect('administracion:detalle_pedido', id=id)
+    context = {
+        'pedido': pedido,
+        'estados': servicio_pedidos.estados_siguientes(pedido.estado),
+        'titulo': f'Cambiar estado - Pedido {pedido.numero_pedido}',
+    }
+    return render(request, 'administracion/pedido/cambiar_estado.html', context)
+
+@login_required
+@user_passes_test(es_administrador)
+@require_POST
+def cambiar_estado_pedidos(request):
+    """
+    Cambio de estado en bloque. Acepta JSON {"pedidos": [ids], "estado": "enviado"}
+    (responde JSON con actualizados y omitidos) o el formulario de la lista
+    de pedidos (campos 'pedidos' y 'estado'; redirige con un mensaje).
+    """
+    es_json = request.content_type == 'application/json'
+    try:
+        if es_json:
+            datos = json.loads(request.body or b'{}')
+            pedido_ids, estado = datos['pedidos'], datos['estado']
+        else:
+            pedido_ids, estado = request.POST.getlist('pedidos'), request.POST.get('estado')
+        resultado = servicio_pedidos.cambiar_estado(pedido_ids, estado, request.user)
+    except (ValueError, TypeError, KeyError, servicio_pedidos.TransicionInvalida) as e:
+        if es_json:
+            return JsonResponse({'error': str(e) or 'Formato inválido'}, status=400)
+        messages.error(request, str(e) or 'Datos inválidos')
+        return redirect('administracion:ver_pedidos')
+    
+    if es_json:
+        return JsonResponse(resultado)
+    if resultado['actualizados']:
+        messages.success(request, f"{len(resultado['actualizados'])} pedidos pasaron a {estado}")
+    if resultado['omitidos']:
+        messages.warning(request, f"{len(resultado['omitidos'])} pedidos omitidos: " + ', '.join(
+            f"#{omitido['id']} ({omitido['motivo']})" for omitido in resultado['omitidos'][:20]
+        ))
+    return redirect('administracion:ver_pedidos')
 
 @login_required
 @user_passes_test(es_administrador)
@@ -558,10 +609,11 @@ def eliminar_pedido(request, id):
 @login_required
 @user_passes_test(es_administrador)
 def ver_ventas(request):
-    """Ver todas las ventas"""
-    ventas = Venta.objects.all().order_by('-fecha_venta')
+    """Ver todas las ventas, incluidas las de pedidos archivados (página por cursor)"""
+    pagina = paginar_keyset(request, archivo_pedidos.ventas(), archivo_pedidos.ORDEN_VENTAS)
     context = {
-        'ventas': ventas,
+        'ventas': archivo_pedidos.como_ventas(pagina),
+        'pagina': pagina,
         'titulo': 'Ventas - Administración',
     }
     return render(request, 'administracion/venta/ver_ventas.html', context)
@@ -569,8 +621,10 @@ def ver_ventas(request):
 @login_required
 @user_passes_test(es_administrador)
 def detalle_venta(request, id):
-    """Ver detalle de venta"""
-    venta = get_object_or_404(Venta, id=id)
+    """Ver detalle de venta (reciente o de un pedido archivado)"""
+    venta = archivo_pedidos.buscar_venta(id)
+    if venta is None:
+        raise Http404('Venta no encontrada')
     context = {
         'venta': venta,
         'titulo': f'Venta #{venta.id}',
@@ -609,12 +663,30 @@ def agregar_venta(request, pedido_id=None):
 @login_required
 @user_passes_test(es_administrador)
 def reportes(request):
-    """Página de reportes"""
-    context = {
+    """Página de reportes: solo lee los resúmenes de reportes_ventas (comando actualizar_resumenes)"""
+    form_filtros = FiltroReportesForm(request.GET or None)
+    periodo, dimension, desde, hasta = form_filtros.valores()
+    context = {
+        'form_filtros': form_filtros,
+        'periodo': periodo,
+        'desde': desde,
+        'hasta': hasta,
+        'dimension': dict(ResumenVentas.DIMENSION_CHOICES)[dimension],
+        'totales': reportes_ventas.totales(periodo, desde, hasta),
+        'serie': reportes_ventas.serie(periodo, desde, hasta),
+        'ranking': reportes_ventas.ranking(periodo, dimension, desde, hasta),
+        'actualizado_hasta': reportes_ventas.marca(),
         'titulo': 'Reportes - Administración',
     }
     return render(request, 'administracion/reportes.html', context)
 
+# ============ MONITOREO ============
+@login_required
+@user_passes_test(es_administrador)
+def monitoreo_busqueda(request):
+    """Contadores de la caché de búsquedas de este proceso (JSON)"""
+    return JsonResponse(cache_busqueda.estadisticas())
+
 # ==========================================
 # VISTAS DEL CLIENTE (las mueve a otro archivo)
 # ==========================================
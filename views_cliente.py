@@ -1,21 +1,32 @@
 # app_mascotas/views_cliente.py
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404, JsonResponse
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.urls import reverse
+from django.views.decorators.http import require_GET, require_POST
 from django.contrib import messages
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
+from django.db.models import Count, Prefetch, Sum, prefetch_related_objects
 from decimal import Decimal
-import datetime
+import json
 import uuid
+from urllib.parse import quote
 
 from .models import (
     Usuario, Categoria, Tipo, Alimento, 
-    Accesorio, Mascota, Carrito, ItemCarrito,
-    Pedido, DetallePedido, Venta
+    Accesorio, Mascota, Carrito,
+    Pedido, DetallePedido, Venta, PedidoArchivado, DetallePedidoArchivado
 )
 from .forms import (
-    RegistroForm, LoginForm, BusquedaForm, FiltroAlimentosForm
+    RegistroForm, LoginForm, BusquedaForm, FiltroAlimentosForm, FiltroPedidosForm
 )
+from . import autocompletado, cache_busqueda, cache_catalogo, carrito as servicio_carrito, catalogo, facetas, relacionados, reservas, trabajos
+from . import archivo_pedidos, pedidos as servicio_pedidos
+from .idempotencia import idempotente, nueva_clave
+from .paginacion import paginar_keyset
+from .productos import resolver_productos
 
 # ==========================================
 # FUNCIONES DE AYUDA
@@ -27,77 +38,38 @@ def calcular_iva(subtotal, porcentaje_iva=0.16):
 # ==========================================
 # VISTAS PÚBLICAS
 # ==========================================
-def index_cliente(request):
-    """Página de inicio para clientes"""
-    alimentos_destacados = Alimento.objects.filter(destacado=True, activo=True)[:8]
-    accesorios_destacados = Accesorio.objects.filter(destacado=True, activo=True)[:8]
-    mascotas_disponibles = Mascota.objects.filter(estado='disponible')[:6]
-    
+def _render_catalogo_inicio():
+    """Categorías y destacados de la página de inicio; no depende del usuario"""
     context = {
-        'alimentos_destacados': alimentos_destacados,
-        'accesorios_destacados': accesorios_destacados,
-        'mascotas_disponibles': mascotas_disponibles,
-        'titulo': 'Inicio - Chofys Pet\'s',
+        'categorias': Categoria.objects.all(),
+        'alimentos': Alimento.objects.filter(destacado=True, activo=True)[:8],
+        'accesorios': Accesorio.objects.filter(destacado=True, activo=True)[:8],
+        'mascotas': Mascota.objects.filter(estado='disponible')[:6],
     }
-    return render(request, 'cliente/index.html', context)  # ← AQUÍ
+    return render_to_string('cliente/fragmentos/catalogo_inicio.html', context)
 
-def buscar_productos(request):
-    """Búsqueda de productos"""
-    query = request.GET.get('q', '')
-    resultados = []
-    
-    if query:
-        # Buscar en alimentos
-        alimentos = Alimento.objects.filter(
-            Q(nombre__icontains=query) |
-            Q(descripcion__icontains=query) |
-            Q(categoria__nombre__icontains=query),
-            activo=True
-        )
-        
-        # Buscar en accesorios
-        accesorios = Accesorio.objects.filter(
-            Q(nombre__icontains=query) |
-            Q(descripcion__icontains=query) |
-            Q(categoria__nombre__icontains=query),
-            activo=True
-        )
-        
-        # Buscar en mascotas
-        mascotas = Mascota.objects.filter(
-            Q(nombre__icontains=query) |
-            Q(raza__icontains=query) |
-            Q(descripcion__icontains=query),
-            estado='disponible'
-        )
-        
-        # Agregar un campo para identificar tipo
-        for alimento in alimentos:
-            alimento.tipo_producto = 'alimento'
-        for accesorio in accesorios:
-            accesorio.tipo_producto = 'accesorio'
-        for mascota in mascotas:
-            mascota.tipo_producto = 'mascota'
-        
-        resultados = list(alimentos) + list(accesorios) + list(mascotas)
+def index_cliente(request):
+    """Página de inicio para clientes"""
+    # El fragmento del catálogo sale de caché; el navbar (carrito, usuario) se renderiza por visita
+    fragmento_catalogo = cache_catalogo.fragmento('inicio', _render_catalogo_inicio)
     
     context = {
-        'query': query,
-        'resultados': resultados,
-        'titulo': f'Resultados para "{query}"' if query else 'Búsqueda de productos',
+        'fragmento_catalogo': mark_safe(fragmento_catalogo),
+        'titulo': 'Inicio - Chofys Pet\'s',
     }
-    return render(request, 'cliente/producto/busqueda.html', context)
+    return render(request, 'cliente/index.html', context)
 
 def lista_productos_categoria(request, categoria_id):
     """Listar productos por categoría"""
     categoria = get_object_or_404(Categoria, id=categoria_id)
     
-    alimentos = Alimento.objects.filter(activo=True, categoria=categoria)
-    accesorios = Accesorio.objects.filter(activo=True, categoria=categoria)
+    # Alimentos y accesorios de la categoría en una sola consulta al catálogo
+    productos = catalogo.productos_publicados().filter(categoria=categoria)
+    pagina = paginar_keyset(request, productos, ('nombre', 'id'))
     
     context = {
-        'alimentos': alimentos,
-        'accesorios': accesorios,
+        'productos': pagina.objetos,
+        'pagina': pagina,
         'categoria': categoria,
         'titulo': f'{categoria.nombre} - Chofys Pet\'s',
     }
@@ -109,12 +81,12 @@ def lista_productos_categoria_tipo(request, categoria_id, tipo_id):
     categoria = get_object_or_404(Categoria, id=categoria_id)
     tipo = get_object_or_404(Tipo, id=tipo_id)
     
-    alimentos = Alimento.objects.filter(activo=True, categoria=categoria, tipo=tipo)
-    accesorios = Accesorio.objects.filter(activo=True, categoria=categoria, tipo=tipo)
+    productos = catalogo.productos_publicados().filter(categoria=categoria, tipo=tipo)
+    pagina = paginar_keyset(request, productos, ('nombre', 'id'))
     
     context = {
-        'alimentos': alimentos,
-        'accesorios': accesorios,
+        'productos': pagina.objetos,
+        'pagina': pagina,
         'categoria': categoria,
         'tipo': tipo,
         'titulo': f'{categoria.nombre} - {tipo.nombre} - Chofys Pet\'s',
@@ -135,6 +107,7 @@ def detalle_producto(request, tipo_producto, producto_id):
     context = {
         'producto': producto,
         'tipo_producto': tipo_producto,  # ← IMPORTANTE: pasar esto
+        'relacionados': relacionados.relacionados_de(tipo_producto, producto.id),
         'titulo': f'{producto.nombre} - Chofys Pet\'s',
     }
     return render(request, 'cliente/producto/detalle.html', context)
@@ -142,6 +115,14 @@ def detalle_producto(request, tipo_producto, producto_id):
 # ==========================================
 # AUTENTICACIÓN
 # ==========================================
+def _fusionar_carrito_invitado(request, usuario, respuesta):
+    """Pasa el carrito de la cookie al Carrito del usuario y borra la cookie"""
+    contenido = servicio_carrito.leer_carrito_invitado(request)
+    if contenido:
+        servicio_carrito.fusionar_carrito_invitado(usuario, contenido)
+        servicio_carrito.guardar_carrito_invitado(respuesta, {})
+    return respuesta
+
 def registro_cliente(request):
     """Registro de nuevo usuario"""
     if request.method == 'POST':
@@ -150,7 +131,7 @@ def registro_cliente(request):
             user = form.save()
             login(request, user)
             messages.success(request, '¡Registro exitoso! Bienvenido a Chofys Pet\'s')
-            return redirect('cliente:index_cliente')
+            return _fusionar_carrito_invitado(request, user, redirect('cliente:index_cliente'))
     else:
         form = RegistroForm()
     
@@ -182,9 +163,10 @@ def login_cliente(request):
                 
                 # Redirigir según el ROL del usuario
                 if user.rol in ['admin', 'empleado']:
-                    return redirect('administracion:inicio')  # ← Admin va al panel
+                    respuesta = redirect('administracion:inicio')  # ← Admin va al panel
                 else:
-                    return redirect('cliente:index_cliente')  # ← Cliente va a tienda
+                    respuesta = redirect('cliente:index_cliente')  # ← Cliente va a tienda
+                return _fusionar_carrito_invitado(request, user, respuesta)
             else:
                 messages.error(request, 'Usuario o contraseña incorrectos')
     else:
@@ -229,19 +211,23 @@ def perfil_usuario(request):
 # ==========================================
 # CARRITO DE COMPRAS
 # ==========================================
-@login_required
 def ver_carrito(request):
-    """Ver carrito de compras"""
-    carrito, created = Carrito.objects.get_or_create(
-        usuario=request.user, 
-        activo=True
-    )
-    
-    # Obtener items del carrito
-    items_carrito = carrito.items.all()
+    """Ver carrito de compras (los invitados lo ven desde su cookie)"""
+    if request.user.is_authenticated:
+        carrito, created = Carrito.objects.get_or_create(
+            usuario=request.user, 
+            activo=True
+        )
+        
+        # Obtener items del carrito con sus productos (una consulta por tipo)
+        items_carrito = resolver_productos(carrito.items.all())
+        total_carrito = carrito.total()
+    else:
+        carrito = None
+        items_carrito = servicio_carrito.items_invitado(servicio_carrito.leer_carrito_invitado(request))
+        total_carrito = sum((item.subtotal() for item in items_carrito), Decimal('0'))
     
     # Calcular totales
-    total_carrito = carrito.total() if hasattr(carrito, 'total') else 0
     iva = calcular_iva(total_carrito)
     total_con_iva = total_carrito + iva
     
@@ -262,7 +248,26 @@ def ver_carrito(request):
     }
     return render(request, 'cliente/carrito/ver_carrito.html', context)
 
-@login_required
+def _agregar_invitado(request, tipo_producto, producto_id, cantidad):
+    """Agrega al carrito de la cookie; solo lee el producto, no escribe nada"""
+    if tipo_producto == 'mascota':
+        messages.info(request, 'Para adoptar mascotas, contacta con el vendedor')
+        return redirect('cliente:detalle_producto', tipo_producto='mascota', producto_id=producto_id)
+    if tipo_producto not in servicio_carrito.MODELOS_ITEM:
+        messages.error(request, 'Tipo de producto no válido')
+        return redirect('cliente:ver_carrito')
+    
+    producto = get_object_or_404(servicio_carrito.MODELOS_ITEM[tipo_producto], id=producto_id, activo=True)
+    contenido = servicio_carrito.leer_carrito_invitado(request)
+    llave = (tipo_producto, producto.id)
+    if contenido.get(llave, 0) + cantidad > producto.disponible:
+        # La reserva se hace al fusionar; aquí solo se avisa
+        messages.warning(request, f'Solo quedan {producto.disponible} unidades disponibles de {producto.nombre}')
+        return redirect('cliente:ver_carrito')
+    contenido[llave] = min(contenido.get(llave, 0) + cantidad, servicio_carrito.MAX_CANTIDAD_INVITADO)
+    messages.success(request, f'¡{producto.nombre} agregado al carrito!')
+    return servicio_carrito.guardar_carrito_invitado(redirect('cliente:ver_carrito'), contenido)
+
 def agregar_al_carrito(request):
     """Agregar producto al carrito"""
     if request.method == 'POST':
@@ -274,26 +279,19 @@ def agregar_al_carrito(request):
             messages.error(request, 'Datos incompletos')
             return redirect('cliente:ver_carrito')
         
-        carrito, created = Carrito.objects.get_or_create(
-            usuario=request.user, 
-            activo=True
-        )
+        if cantidad < 1 or not producto_id.isdigit():
+            messages.error(request, 'Datos incompletos')
+            return redirect('cliente:ver_carrito')
+        
+        if not request.user.is_authenticated:
+            return _agregar_invitado(request, tipo_producto, int(producto_id), cantidad)
         
         try:
-            if tipo_producto == 'alimento':
-                producto = get_object_or_404(Alimento, id=producto_id, activo=True)
-                item, created = ItemCarrito.objects.get_or_create(
-                    carrito=carrito,
-                    alimento=producto,
-                    defaults={'cantidad': cantidad}
-                )
-            elif tipo_producto == 'accesorio':
-                producto = get_object_or_404(Accesorio, id=producto_id, activo=True)
-                item, created = ItemCarrito.objects.get_or_create(
-                    carrito=carrito,
-                    accesorio=producto,
-                    defaults={'cantidad': cantidad}
-                )
+            if tipo_producto in ('alimento', 'accesorio'):
+                modelo = Alimento if tipo_producto == 'alimento' else Accesorio
+                producto = get_object_or_404(modelo, id=producto_id, activo=True)
+                # Un solo INSERT ... ON CONFLICT: sin duplicados ni cantidades perdidas
+                servicio_carrito.agregar_item(request.user, tipo_producto, producto.id, cantidad)
             elif tipo_producto == 'mascota':
                 producto = get_object_or_404(Mascota, id=producto_id, estado='disponible')
                 # Para mascotas necesitas un modelo diferente o ajustar ItemCarrito
@@ -303,101 +301,161 @@ def agregar_al_carrito(request):
                 messages.error(request, 'Tipo de producto no válido')
                 return redirect('cliente:ver_carrito')
             
-            if not created:
-                item.cantidad += cantidad
-                item.save()
-            
             messages.success(request, f'¡{producto.nombre} agregado al carrito!')
+        except reservas.StockInsuficiente as e:
+            messages.warning(request, str(e))
         except Exception as e:
             messages.error(request, f'Error al agregar al carrito: {str(e)}')
     
     return redirect('cliente:ver_carrito')
 
-@login_required
 def actualizar_carrito(request):
     """Actualizar cantidad en carrito"""
     if request.method == 'POST':
         item_id = request.POST.get('item_id')
         cantidad = int(request.POST.get('cantidad', 1))
         
+        if not request.user.is_authenticated:
+            contenido = servicio_carrito.leer_carrito_invitado(request)
+            llave = servicio_carrito.llave_item_invitado(item_id) if str(item_id).isdigit() else None
+            if llave in contenido:
+                if cantidad > 0:
+                    contenido[llave] = min(cantidad, servicio_carrito.MAX_CANTIDAD_INVITADO)
+                    messages.success(request, 'Carrito actualizado')
+                else:
+                    del contenido[llave]
+                    messages.success(request, 'Producto eliminado del carrito')
+            return servicio_carrito.guardar_carrito_invitado(redirect('cliente:ver_carrito'), contenido)
+        
         try:
-            item = get_object_or_404(ItemCarrito, id=item_id, carrito__usuario=request.user)
-            
-            if cantidad > 0:
-                item.cantidad = cantidad
-                item.save()
+            restantes, eliminados = servicio_carrito.actualizar_renglones(request.user, {int(item_id): cantidad})
+            if restantes:
                 messages.success(request, 'Carrito actualizado')
-            else:
-                item.delete()
+            elif eliminados:
                 messages.success(request, 'Producto eliminado del carrito')
+            else:
+                messages.error(request, 'Error al actualizar el carrito')
+        except reservas.StockInsuficiente as e:
+            messages.warning(request, str(e))
         except:
             messages.error(request, 'Error al actualizar el carrito')
     
     return redirect('cliente:ver_carrito')
 
-@login_required
 def eliminar_del_carrito(request, item_id):
     """Eliminar producto del carrito"""
+    if not request.user.is_authenticated:
+        contenido = servicio_carrito.leer_carrito_invitado(request)
+        if contenido.pop(servicio_carrito.llave_item_invitado(item_id), None):
+            messages.success(request, 'Producto eliminado del carrito')
+        return servicio_carrito.guardar_carrito_invitado(redirect('cliente:ver_carrito'), contenido)
+    
     try:
-        item = get_object_or_404(ItemCarrito, id=item_id, carrito__usuario=request.user)
-        item.delete()
-        messages.success(request, 'Producto eliminado del carrito')
+        _restantes, eliminados = servicio_carrito.actualizar_renglones(request.user, {item_id: 0})
+        if eliminados:
+            messages.success(request, 'Producto eliminado del carrito')
+        else:
+            messages.error(request, 'Error al eliminar del carrito')
     except:
         messages.error(request, 'Error al eliminar del carrito')
     
     return redirect('cliente:ver_carrito')
 
+MAX_CAMBIOS_LOTE = 100
+
+def _leer_cambios_lote(request):
+    """{item_id: cantidad} del cuerpo JSON {"items": [{"item_id": 1, "cantidad": 2}, ...]}"""
+    try:
+        datos = json.loads(request.body or b'{}')
+        cambios = {int(cambio['item_id']): int(cambio['cantidad']) for cambio in datos['items']}
+    except (ValueError, TypeError, KeyError):
+        return None
+    if len(cambios) > MAX_CAMBIOS_LOTE:
+        return None
+    return cambios
+
+def _renglon_json(item):
+    return {'item_id': item.id, 'cantidad': item.cantidad, 'subtotal': item.subtotal()}
+
+@require_POST
+def actualizar_carrito_lote(request):
+    """
+    Aplica varios cambios de cantidad a la vez (cantidad 0 elimina el renglón)
+    y responde con los renglones y los totales nuevos en JSON, para que la
+    página del carrito se actualice sin recargar.
+    """
+    cambios = _leer_cambios_lote(request)
+    if cambios is None:
+        return JsonResponse({'error': 'Formato inválido: se espera {"items": [{"item_id", "cantidad"}]}'}, status=400)
+    
+    if request.user.is_authenticated:
+        try:
+            restantes, eliminados = servicio_carrito.actualizar_renglones(request.user, cambios)
+        except reservas.StockInsuficiente as e:
+            return JsonResponse({'error': str(e), 'disponible': e.disponible}, status=409)
+        resumen = servicio_carrito.resumen_carrito(request.user.id)
+        return JsonResponse({
+            'items': [_renglon_json(item) for item in restantes],
+            'eliminados': eliminados,
+            'carrito': resumen,
+        })
+    
+    # Invitados: los cambios se aplican a la cookie
+    contenido = servicio_carrito.leer_carrito_invitado(request)
+    eliminados = []
+    for item_id, cantidad in cambios.items():
+        llave = servicio_carrito.llave_item_invitado(item_id) if item_id >= 0 else None
+        if llave not in contenido:
+            continue
+        if cantidad > 0:
+            contenido[llave] = min(cantidad, servicio_carrito.MAX_CANTIDAD_INVITADO)
+        else:
+            del contenido[llave]
+            eliminados.append(item_id)
+    items = servicio_carrito.items_invitado(contenido)
+    subtotal = sum((item.subtotal() for item in items), Decimal('0')).quantize(servicio_carrito.CENTAVOS)
+    iva = servicio_carrito.iva_de(subtotal)
+    respuesta = JsonResponse({
+        'items': [_renglon_json(item) for item in items if item.id in cambios],
+        'eliminados': eliminados,
+        'carrito': {'total_items': len(items), 'subtotal': subtotal, 'iva': iva, 'total': subtotal + iva},
+    })
+    return servicio_carrito.guardar_carrito_invitado(respuesta, contenido)
+
 # ==========================================
 # CHECKOUT Y PEDIDOS
 # ==========================================
 @login_required
+@idempotente('checkout')
 def checkout(request):
     """Página de checkout"""
-    carrito = get_object_or_404(Carrito, usuario=request.user, activo=True)
-    
-    # Obtener items del carrito como lista
-    items_carrito = carrito.items.all()
-    
-    if items_carrito.count() == 0:
-        messages.error(request, 'Tu carrito está vacío')
-        return redirect('cliente:ver_carrito')
-    
     if request.method == 'POST':
-        # Crear pedido
+        # Crear pedido: una transacción con stock, número y renglones (pedidos.py);
+        # el servicio bloquea el carrito, así que aquí no se lee antes
         try:
-            pedido = Pedido.objects.create(
-                usuario=request.user,
-                numero_pedido=f"PED-{datetime.datetime.now().strftime('%Y%m%d')}-{Pedido.objects.count() + 1:04d}",
-                subtotal=carrito.total(),
-                iva=calcular_iva(carrito.total()),
-                total=carrito.total() + calcular_iva(carrito.total()),
+            pedido = servicio_pedidos.crear_pedido(
+                request.user,
                 direccion_envio=request.POST.get('direccion', ''),
-                notas=request.POST.get('notas', '')
+                notas=request.POST.get('notas', ''),
             )
-            
-            # Crear detalles del pedido
-            for item in items_carrito:  # Usar items_carrito aquí
-                producto = item.producto()
-                if producto:
-                    DetallePedido.objects.create(
-                        pedido=pedido,
-                        alimento=item.alimento,
-                        accesorio=item.accesorio,
-                        cantidad=item.cantidad,
-                        precio_unitario=producto.precio,
-                        subtotal=item.subtotal()
-                    )
-            
-            # Desactivar carrito y crear uno nuevo
-            carrito.activo = False
-            carrito.save()
-            
-            # Redirigir a confirmación
             return redirect('cliente:confirmacion_pedido', pedido_id=pedido.id)
-            
+        except reservas.StockInsuficiente as e:
+            messages.warning(request, str(e))
+            return redirect('cliente:ver_carrito')
+        except servicio_pedidos.CarritoVacio:
+            messages.error(request, 'Tu carrito está vacío')
+            return redirect('cliente:ver_carrito')
         except Exception as e:
             messages.error(request, f'Error al crear el pedido: {str(e)}')
     
+    carrito = get_object_or_404(Carrito, usuario=request.user, activo=True)
+    # Obtener items del carrito como lista, con sus productos ya cargados
+    items_carrito = resolver_productos(carrito.items.all())
+    
+    if not items_carrito:
+        messages.error(request, 'Tu carrito está vacío')
+        return redirect('cliente:ver_carrito')
+    
     # Calcular totales
     total_carrito = carrito.total()
     iva = calcular_iva(total_carrito)
@@ -416,23 +474,40 @@ def checkout(request):
         'total_con_iva': total_con_iva,
         'direccion_default': direccion_default,
         'telefono_default': telefono_default,
+        'clave_idempotencia': nueva_clave(),  # Un doble envío del formulario no duplica el pedido
         'titulo': 'Checkout',
     }
     return render(request, 'cliente/carrito/checkout.html', context)
 
+MIS_PEDIDOS_POR_PAGINA = 10
+MINIATURAS_POR_PEDIDO = 3
+
 # En views_cliente.py, función mis_pedidos
 @login_required
 def mis_pedidos(request):
     """Ver historial de pedidos del usuario"""
-    pedidos = Pedido.objects.filter(usuario=request.user).order_by('-fecha_pedido')
-    
-    # DEBUG: Ver qué datos tienen los pedidos
-    for pedido in pedidos:
-        print(f"Pedido ID: {pedido.id}, Número: {pedido.numero_pedido}")
-        print(f"Atributos: {dir(pedido)}")
+    form_filtros = FiltroPedidosForm(request.GET or None)
+    # Pedidos recientes y archivados: mismos campos, ids únicos entre ambas tablas
+    pedidos = [
+        form_filtros.filtrar(queryset).annotate(num_lineas=Count('detalles'), num_unidades=Sum('detalles__cantidad'))
+        for queryset in archivo_pedidos.historial_de(request.user)
+    ]
+    # Página por cursor sobre el índice (usuario, fecha_pedido, id) de cada tabla: mismo costo en cualquier página
+    pagina = paginar_keyset(request, pedidos, ('-fecha_pedido', '-id'), tamano=MIS_PEDIDOS_POR_PAGINA)
+    
+    # Renglones de la página con una consulta por tabla y sus productos (miniaturas) con una por tipo
+    for modelo, modelo_detalle in ((Pedido, DetallePedido), (PedidoArchivado, DetallePedidoArchivado)):
+        del_modelo = [pedido for pedido in pagina if isinstance(pedido, modelo)]
+        prefetch_related_objects(del_modelo, Prefetch('detalles', queryset=modelo_detalle.objects.order_by('id')))
+        resolver_productos(detalle for pedido in del_modelo for detalle in pedido.detalles.all())
+    for pedido in pagina:
+        productos = [detalle.producto() for detalle in pedido.detalles.all()]
+        pedido.miniaturas = [producto for producto in productos if producto and producto.imagen][:MINIATURAS_POR_PEDIDO]
     
     context = {
-        'pedidos': pedidos,
+        'pedidos': pagina,
+        'pagina': pagina,
+        'form_filtros': form_filtros,
         'titulo': 'Mis Pedidos',
     }
     return render(request, 'cliente/usuario/mis_pedidos.html', context)
@@ -440,11 +515,14 @@ def mis_pedidos(request):
 # En views_cliente.py, función detalle_mi_pedido
 @login_required
 def detalle_mi_pedido(request, pedido_id):
-    """Ver detalle de un pedido del usuario"""
-    pedido = get_object_or_404(Pedido, id=pedido_id, usuario=request.user)
+    """Ver detalle de un pedido del usuario (reciente o archivado)"""
+    pedido = archivo_pedidos.buscar_pedido(id=pedido_id, usuario=request.user)
+    if pedido is None:
+        raise Http404('Pedido no encontrado')
     
     context = {
         'pedido': pedido,
+        'detalles': resolver_productos(pedido.detalles.all()),
         'titulo': f'Pedido {pedido.numero_pedido}',
     }
     return render(request, 'cliente/pedido/detalle_pedido.html', context)
@@ -464,53 +542,61 @@ def confirmacion_pedido(request, pedido_id):
 # BÚSQUEDA
 # ==========================================
 def buscar_productos(request):
-    """Búsqueda de productos"""
-    query = request.GET.get('q', '')
+    """Búsqueda de productos con el índice de texto completo"""
+    query = request.GET.get('q', '').strip()
     resultados = []
+    consulta_corregida = None
     
     if query:
-        # Buscar en alimentos
-        alimentos = Alimento.objects.filter(
-            Q(nombre__icontains=query) |
-            Q(descripcion__icontains=query) |
-            Q(categoria__nombre__icontains=query),
-            activo=True
-        )
-        
-        # Buscar en accesorios
-        accesorios = Accesorio.objects.filter(
-            Q(nombre__icontains=query) |
-            Q(descripcion__icontains=query) |
-            Q(categoria__nombre__icontains=query),
-            activo=True
-        )
-        
-        # Buscar en mascotas
-        mascotas = Mascota.objects.filter(
-            Q(nombre__icontains=query) |
-            Q(raza__icontains=query) |
-            Q(descripcion__icontains=query),
-            estado='disponible'
-        )
-        
-        resultados = list(alimentos) + list(accesorios) + list(mascotas)
+        # Pares (tipo, id) ordenados por relevancia, desde la caché de búsquedas;
+        # precios y existencias se leen del catálogo en cada visita
+        encontrados, consulta_corregida = cache_busqueda.buscar(query)
+        resultados = catalogo.cargar(encontrados)
     
     context = {
         'query': query,
         'resultados': resultados,
-        'titulo': f'Resultados para "{query}"',
+        'consulta_corregida': consulta_corregida,
+        'titulo': f'Resultados para "{query}"' if query else 'Búsqueda de productos',
     }
     return render(request, 'cliente/producto/busqueda.html', context)
 
+def _url_sugerencia(sugerencia):
+    if sugerencia['tipo'] == 'categoria':
+        return reverse('cliente:lista_categoria', args=[sugerencia['id']])
+    if sugerencia['tipo'] == 'raza':
+        return f"{reverse('cliente:buscar_productos')}?q={quote(sugerencia['texto'])}"
+    return reverse('cliente:detalle_producto', args=[sugerencia['tipo'], sugerencia['id']])
+
+@require_GET
+def autocompletar(request):
+    """Sugerencias del buscador en JSON, servidas desde el índice en memoria"""
+    sugerencias = autocompletado.sugerir(request.GET.get('q', ''))
+    return JsonResponse({
+        'sugerencias': [
+            {'texto': sugerencia['texto'], 'tipo': sugerencia['tipo'], 'url': _url_sugerencia(sugerencia)}
+            for sugerencia in sugerencias
+        ]
+    })
+
 # ==========================================
 # FUNCIONES PARA URLs FALTANTES (temporales)
 # ==========================================
+@idempotente('procesar_pago')
 def procesar_pago(request):
     """Procesar pago (simulado) - Función temporal"""
     if request.method == 'POST':
         pedido_id = request.POST.get('pedido_id')
         try:
             pedido = get_object_or_404(Pedido, id=pedido_id, usuario=request.user)
+            metodo_pago = request.POST.get('metodo_pago', 'tarjeta')
+            if metodo_pago not in dict(Venta.METODO_PAGO_CHOICES):
+                metodo_pago = 'tarjeta'
+            # La Venta la crea run_jobs; aquí solo se encola
+            trabajos.encolar(
+                servicio_pedidos.registrar_venta, pedido_id=pedido.id, metodo_pago=metodo_pago,
+                referencia_pago=request.POST.get('referencia_pago', ''),
+            )
             messages.success(request, '¡Pago procesado exitosamente!')
             return redirect('cliente:confirmacion_pedido', pedido_id=pedido.id)
         except:
@@ -536,8 +622,13 @@ def vista_mascotas(request):
         tipo = None
         tipos_filtrados = Tipo.objects.all()
     
+    pagina = paginar_keyset(
+        request, mascotas.select_related('tipo'), ('-fecha_creacion', '-id')
+    )
+    
     context = {
-        'mascotas': mascotas,
+        'mascotas': pagina.objetos,
+        'pagina': pagina,
         'tipos': tipos_filtrados,
         'tipo_seleccionado': tipo,
         'titulo': 'Mascotas - Chofys Pet\'s',
@@ -547,26 +638,25 @@ def vista_mascotas(request):
 
 def vista_alimentos(request):
     """Página de alimentos - Muestra solo alimentos"""
-    alimentos = Alimento.objects.filter(activo=True)
-    
-    # Obtener categorías y tipos disponibles
-    categorias = Categoria.objects.filter(alimentos__isnull=False).distinct()
-    tipos = Tipo.objects.filter(alimentos__isnull=False).distinct()
+    # Categorías, tipos y rango de precios desde la tabla de facetas
+    resumen = facetas.facetas_de('alimento')
     
     # Aplicar filtros si existen
-    categoria_id = request.GET.get('categoria')
-    tipo_id = request.GET.get('tipo')
-    
-    if categoria_id:
-        alimentos = alimentos.filter(categoria_id=categoria_id)
+    form_filtros = FiltroAlimentosForm(request.GET or None)
+    alimentos = form_filtros.filtrar(Alimento.objects.filter(activo=True))
     
-    if tipo_id:
-        alimentos = alimentos.filter(tipo_id=tipo_id)
+    pagina = paginar_keyset(
+        request, alimentos.select_related('categoria', 'tipo'), ('nombre', 'id')
+    )
     
     context = {
-        'alimentos': alimentos,
-        'categorias': categorias,
-        'tipos': tipos,
+        'alimentos': pagina.objetos,
+        'pagina': pagina,
+        'categorias': resumen['categorias'],
+        'tipos': resumen['tipos'],
+        'precio_min': resumen['precio_min'],
+        'precio_max': resumen['precio_max'],
+        'form_filtros': form_filtros,
         'titulo': 'Alimentos - Chofys Pet\'s',
     }
     return render(request, 'cliente/producto/alimentos.html', context)
@@ -574,26 +664,25 @@ def vista_alimentos(request):
 
 def vista_accesorios(request):
     """Página de accesorios - Muestra solo accesorios"""
-    accesorios = Accesorio.objects.filter(activo=True)
-    
-    # Obtener categorías y tipos disponibles
-    categorias = Categoria.objects.filter(accesorios__isnull=False).distinct()
-    tipos = Tipo.objects.filter(accesorios__isnull=False).distinct()
+    # Categorías, tipos y rango de precios desde la tabla de facetas
+    resumen = facetas.facetas_de('accesorio')
     
     # Aplicar filtros si existen
-    categoria_id = request.GET.get('categoria')
-    tipo_id = request.GET.get('tipo')
+    form_filtros = FiltroAlimentosForm(request.GET or None)
+    accesorios = form_filtros.filtrar(Accesorio.objects.filter(activo=True))
     
-    if categoria_id:
-        accesorios = accesorios.filter(categoria_id=categoria_id)
-    
-    if tipo_id:
-        accesorios = accesorios.filter(tipo_id=tipo_id)
+    pagina = paginar_keyset(
+        request, accesorios.select_related('categoria', 'tipo'), ('nombre', 'id')
+    )
     
     context = {
-        'accesorios': accesorios,
-        'categorias': categorias,
-        'tipos': tipos,
+        'accesorios': pagina.objetos,
+        'pagina': pagina,
+        'categorias': resumen['categorias'],
+        'tipos': resumen['tipos'],
+        'precio_min': resumen['precio_min'],
+        'precio_max': resumen['precio_max'],
+        'form_filtros': form_filtros,
         'titulo': 'Accesorios - Chofys Pet\'s',
     }
     return render(request, 'cliente/producto/accesorios.html', context)
\ No newline at end of file